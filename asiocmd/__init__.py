@@ -1,7 +1,13 @@
 from .cmd import Cmd
-from .async_cmd import AsyncCmd
 from .decorators import command, async_command, command_helper, async_command_helper
 
 __all__ = ("Cmd", "AsyncCmd",
            "command", "command_helper",
-           "async_command", "async_command_helper")
\ No newline at end of file
+           "async_command", "async_command_helper")
+
+def __getattr__(name: str):
+    # AsyncCmd is imported on first access, sparing asyncio to programs using Cmd alone
+    if name == "AsyncCmd":
+        from .async_cmd import AsyncCmd
+        return AsyncCmd
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,222 @@
+"""Typed argument binding derived from command signatures.
+
+Commands declared with typed=True receive their arguments already split and
+converted according to their signature, instead of the raw argument string:
+
+    @command(typed=True)
+    def resize(self, name: str, width: int, height: int = 0, *, force: bool = False): ...
+
+accepts "resize disk0 100 --force" or "resize disk0 --width=100". Positional
+parameters are filled in order, and may also be given as --name options;
+keyword-only parameters are options, with booleans as flags (--force and
+--no-force); *args collects the remaining words and **kwargs any unknown
+--name=value options. Values are converted with the annotation of their
+parameter: any callable taking a string (int, float, Path, ...), bool, Enum
+subclasses, Literal choices and optional (X | None) forms of these.
+
+The parser of a command is built once, when its class is registered, and
+kept in its dispatch record.
+"""
+
+import enum
+import inspect
+import types
+import typing
+from typing import Any, Callable
+
+from asiocmd.parsing import ArgumentError, split_argv
+
+__all__ = ("ArgumentError", "SignatureParser")
+
+_TRUE: frozenset[str] = frozenset(("1", "true", "yes", "on", "y"))
+_FALSE: frozenset[str] = frozenset(("0", "false", "no", "off", "n"))
+
+def _parse_bool(value: str) -> bool:
+    lowered: str = value.lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(value)
+
+def _converter(annotation: Any) -> tuple[Callable[[str], Any], bool]:
+    """
+    Return the function converting a word to 'annotation', and whether the
+    annotation is a boolean (making the parameter a flag when it is an option).
+    """
+    if annotation is inspect.Parameter.empty or annotation is Any or annotation is str:
+        return str, False
+    origin: Any = typing.get_origin(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        members: list[Any] = [member for member in typing.get_args(annotation) if member is not type(None)]
+        return _converter(members[0]) if len(members) == 1 else (str, False)
+    if origin is typing.Literal:
+        choices: dict[str, Any] = {str(choice): choice for choice in typing.get_args(annotation)}
+        def choose(value: str) -> Any:
+            return choices[value]
+        return choose, False
+    if annotation is bool:
+        return _parse_bool, True
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        members_by_name: dict[str, Any] = {member.name.lower(): member for member in annotation}
+        def member(value: str) -> Any:
+            found = members_by_name.get(value.lower())
+            return found if found is not None else annotation(value)
+        return member, False
+    if origin is None and callable(annotation):
+        return annotation, False
+    return str, False
+
+class _Parameter:
+    __slots__ = ('name', 'kind', 'convert', 'is_flag', 'required', 'default')
+
+    def __init__(self, parameter: inspect.Parameter, annotation: Any):
+        self.name: str = parameter.name
+        self.kind = parameter.kind
+        self.convert, self.is_flag = _converter(annotation)
+        self.required: bool = parameter.default is inspect.Parameter.empty
+        self.default: Any = parameter.default
+
+    @property
+    def option(self) -> str:
+        return f"--{self.name.replace('_', '-')}"
+
+class SignatureParser:
+    """
+    Converter of argument strings to the positional and keyword arguments of
+    the function 'function', ignoring its first 'skip' parameters (such as
+    self) and its last 'skip_last' ones (such as the upstream of pipe commands).
+    """
+
+    __slots__ = ('name', 'usage', '_positional', '_variadic', '_options', '_var_keyword')
+
+    def __init__(self, name: str, function: Callable[..., Any], skip: int = 1, skip_last: int = 0):
+        self.name = name
+        try:
+            annotations: dict[str, Any] = inspect.get_annotations(function, eval_str=True)
+        except Exception:   # Unresolvable forward references: fall back on strings
+            annotations = {}
+        parameters: list[inspect.Parameter] = list(inspect.signature(function).parameters.values())
+        parameters = parameters[skip:len(parameters) - skip_last]
+
+        self._positional: list[_Parameter] = []
+        self._variadic: _Parameter|None = None
+        self._options: dict[str, _Parameter] = {}   # By option name, including positional parameters
+        self._var_keyword: _Parameter|None = None
+        for parameter in parameters:
+            spec = _Parameter(parameter, annotations.get(parameter.name, inspect.Parameter.empty))
+            if parameter.kind is inspect.Parameter.VAR_POSITIONAL:
+                self._variadic = spec
+            elif parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                self._var_keyword = spec
+            else:
+                if parameter.kind is not inspect.Parameter.KEYWORD_ONLY:
+                    self._positional.append(spec)
+                if parameter.kind is not inspect.Parameter.POSITIONAL_ONLY:
+                    self._options[spec.option] = spec
+        self.usage: str = self._usage()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.usage.strip()}>"
+
+    def _usage(self) -> str:
+        words: list[str] = [self.name]
+        for spec in self._positional:
+            words.append(f"<{spec.name}>" if spec.required else f"[{spec.name}]")
+        if self._variadic is not None:
+            words.append(f"[{self._variadic.name}...]")
+        for option, spec in self._options.items():
+            if spec.kind is not inspect.Parameter.KEYWORD_ONLY:
+                continue
+            word: str = option if spec.is_flag else f"{option} {spec.name.upper()}"
+            words.append(f"<{word}>" if spec.required else f"[{word}]")
+        if self._var_keyword is not None:
+            words.append("[--NAME=VALUE...]")
+        return f"Usage: {' '.join(words)}\n"
+
+    def _convert(self, spec: _Parameter, value: str) -> Any:
+        try:
+            return spec.convert(value)
+        except (ValueError, TypeError, KeyError):
+            raise ArgumentError(f"Invalid value for {spec.name}: {value!r}", self.usage) from None
+
+    def parse(self, arg: str) -> tuple[tuple[Any, ...], dict[str, Any]]:
+        """
+        Return the positional and keyword arguments for the argument string
+        'arg'. Positional parameters are always passed positionally, with
+        their defaults filled in. Raises ArgumentError if 'arg' does not
+        match the signature.
+        """
+        try:
+            words: tuple[str, ...] = split_argv(arg)
+        except ValueError as exc:
+            raise ArgumentError(str(exc), self.usage) from None
+
+        positional: list[str] = []
+        values: dict[str, Any] = {}
+        extra: dict[str, Any] = {}
+        word_iter = iter(words)
+        for word in word_iter:
+            if word == "--":    # Everything after is positional
+                positional.extend(word_iter)
+                break
+            if not word.startswith("--"):
+                positional.append(word)
+                continue
+            option, has_value, value = word.partition("=")
+            spec: _Parameter|None = self._options.get(option)
+            if spec is None and option.startswith("--no-") and not has_value:
+                negated: _Parameter|None = self._options.get(f"--{option[5:]}")
+                if negated is not None and negated.is_flag:
+                    values[negated.name] = False
+                    continue
+            if spec is None:
+                if self._var_keyword is None or not has_value:
+                    raise ArgumentError(f"Unknown option: {option}", self.usage)
+                extra[option[2:].replace("-", "_")] = self._convert(self._var_keyword, value)
+                continue
+            if spec.name in values:
+                raise ArgumentError(f"Duplicate option: {option}", self.usage)
+            if not has_value:
+                if spec.is_flag:
+                    values[spec.name] = True
+                    continue
+                value = next(word_iter, None)
+                if value is None:
+                    raise ArgumentError(f"Option {option} requires a value", self.usage)
+            values[spec.name] = self._convert(spec, value)
+
+        args: list[Any] = []
+        consumed: int = 0
+        for spec in self._positional:
+            if spec.name in values:
+                args.append(values.pop(spec.name))
+            elif consumed < len(positional):
+                args.append(self._convert(spec, positional[consumed]))
+                consumed += 1
+            elif spec.required:
+                raise ArgumentError(f"Missing argument: {spec.name}", self.usage)
+            else:
+                args.append(spec.default)
+        if consumed < len(positional):
+            if self._variadic is None:
+                raise ArgumentError(f"Unexpected argument: {positional[consumed]}", self.usage)
+            args.extend(self._convert(self._variadic, word) for word in positional[consumed:])
+
+        for spec in self._options.values():
+            if spec.kind is inspect.Parameter.KEYWORD_ONLY and spec.required and spec.name not in values:
+                raise ArgumentError(f"Missing option: {spec.option}", self.usage)
+        values.update(extra)
+        return tuple(args), values
+
+    def adapt(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wrap 'method' into a callable taking an argument string (followed by
+        any arguments passed through, such as a pipeline's upstream) and
+        calling 'method' with the parsed arguments.
+        """
+        parse = self.parse
+        def call(arg: str, *passed: Any) -> Any:
+            args, kwargs = parse(arg)
+            return method(*args, *passed, **kwargs)
+        return call
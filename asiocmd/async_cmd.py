@@ -1,13 +1,123 @@
+import asyncio
+import contextvars
 import inspect
-from typing import Any, Callable, NoReturn, TextIO
-import readline
+import os
+import signal
+import stat
+import threading
+import time
+from concurrent.futures import CancelledError as FutureCancelledError, Executor
+from contextlib import contextmanager
+from functools import partial
+from typing import (TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Final, Iterable, Iterator, NoReturn,
+                    TextIO)
 
 from asiocmd.cmd import Cmd
 from asiocmd.decorators import async_command
+from asiocmd.output import AsyncOutputBuffer
+from asiocmd.parsing import ArgumentError
+from asiocmd.registry import DispatchRecord
 from asiocmd.typing import CmdMethod
 
+# Modules of optional features are imported by the methods using them
+if TYPE_CHECKING:
+    from asiocmd.batching import Batcher
+    from asiocmd.jobs import Job, JobPool
+    from asiocmd.readers import InputReader, StreamInputReader
+    from asiocmd.script import CommandResult
+    from asiocmd.stats import StatsSink
+
 __all__ = ("AsyncCmd",)
 
+# Markers passed through the queues between pipeline stages
+_PIPE_END: Final[object] = object()
+
+class _PipeError:
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+class _PipeClosed(Exception):
+    # Raised in the worker threads of a pipeline once it is torn down
+    pass
+
+class _StageBridge:
+    """
+    Access to the queues of a pipeline from the worker threads running its
+    synchronous pipe stages. close() stops every thread waiting on the loop.
+    """
+
+    __slots__ = ('loop', '_pending', '_closed', '_lock')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._pending: set[Any] = set()
+        self._closed: bool = False
+        self._lock = threading.Lock()
+
+    def call(self, coroutine: Awaitable[Any]) -> Any:
+        """
+        Run 'coroutine' on the loop and return its result, from a worker
+        thread. Raises _PipeClosed if the pipeline is torn down meanwhile.
+        """
+        with self._lock:
+            if self._closed:
+                coroutine.close()   # type: ignore[attr-defined]
+                raise _PipeClosed
+            future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)     # type: ignore[arg-type]
+            self._pending.add(future)
+        try:
+            return future.result()
+        except FutureCancelledError:
+            raise _PipeClosed from None
+        finally:
+            with self._lock:
+                self._pending.discard(future)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            for future in self._pending:
+                future.cancel()
+
+class _InterruptRouter:
+    """
+    Routes SIGINT to the innermost acmdloop() running with cancel_on_interrupt.
+    The process-wide handler is installed by the first such loop and the
+    previous one restored when the last loop ends, whatever their order.
+    """
+
+    __slots__ = ('targets', 'previous')
+
+    def __init__(self):
+        self.targets: list[tuple["AsyncCmd", asyncio.Task | None]] = []
+        self.previous: Any = None
+
+    def add(self, target: tuple["AsyncCmd", asyncio.Task | None]) -> bool:
+        if not self.targets:
+            previous = signal.getsignal(signal.SIGINT)
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGINT, self.dispatch)
+            except (NotImplementedError, RuntimeError):    # Unsupported by the platform or event loop
+                return False
+            self.previous = previous
+        self.targets.append(target)
+        return True
+
+    def remove(self, target: tuple["AsyncCmd", asyncio.Task | None]) -> None:
+        self.targets.remove(target)
+        if not self.targets:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGINT)
+            signal.signal(signal.SIGINT, self.previous)
+            self.previous = None
+
+    def dispatch(self) -> None:
+        cmd, loop_task = self.targets[-1]
+        cmd._interrupt(loop_task)
+
+_interrupts: Final[_InterruptRouter] = _InterruptRouter()
+
 class AsyncCmd(Cmd):
     """
     Async+Sync implementation of `Cmd`
@@ -15,9 +125,22 @@ class AsyncCmd(Cmd):
 
     __slots__ = (
         'apreloop_first', 'aprecmd_first',
-        'apostloop_first', 'apostcmd_first'
+        'apostloop_first', 'apostcmd_first',
+        '_jobs', '_queue_event', '_pending_read', '_ahead_queued', '_stream_reader',
+        '_executor', '_process_executor', '_owned_executors',
+        'command_timeout', 'cancel_on_interrupt', '_command_task', '_interrupt_pending', '_interruptible'
         )
 
+    output_class: type[AsyncOutputBuffer] = AsyncOutputBuffer
+
+    # Run every synchronous command declared by the class in a worker thread,
+    # as if declared with @command(blocking=True)
+    blocking_commands: bool = False
+
+    # Chunks buffered between two stages of a pipeline
+    pipe_buffer: int = 64
+    stdout: AsyncOutputBuffer
+
     @staticmethod
     def check_async(method: Callable) -> bool:
         return inspect.iscoroutinefunction(inspect.unwrap(method))
@@ -36,14 +159,71 @@ class AsyncCmd(Cmd):
                  apreloop_first: bool = False,
                  apostloop_first: bool = False,
                  apostcmd_first: bool = False,
-                 aprecmd_first: bool = False):
+                 aprecmd_first: bool = False,
+                 max_jobs: int | None = None,
+                 stats: "StatsSink | None" = None,
+                 profiling: bool = False,
+                 executor: Executor | None = None,
+                 process_executor: Executor | None = None,
+                 command_timeout: float | None = None,
+                 cancel_on_interrupt: bool = True):
+        """
+        Instantiate an asynchronous line-oriented interpreter framework.
+
+        If 'max_jobs' is given, commands declared with
+        `@async_command(background=True)` are scheduled as background jobs,
+        at most 'max_jobs' of which run at once, and the built-in commands
+        'jobs', 'wait' and 'cancel' are registered.
+        If a 'stats' sink is given, command timings are reported to it
+        (see `Cmd.__init__`); background jobs are timed until they finish.
+
+        Blocking commands (see 'blocking_commands') and run_blocking() use
+        'executor', and commands declared with process=True and
+        run_cpu_bound() use 'process_executor'. When not given, a thread or
+        process pool is created on first use and shut down when acmdloop() or
+        arun_script() returns, or by aclose() when commands are run otherwise.
+
+        Awaited commands are given up on after their own timeout (see the
+        decorators) or else 'command_timeout' seconds, if set. With
+        'cancel_on_interrupt', Ctrl-C during acmdloop() cancels the running
+        command and returns to the prompt; at the prompt, it still raises
+        KeyboardInterrupt. See the cmdtimeout() and cmdcancelled() hooks.
+        """
         # Flags to determine whether async or sync hook methods need to be executed first
         self.apreloop_first = apreloop_first
         self.aprecmd_first = aprecmd_first
         self.apostcmd_first = apostcmd_first
         self.apostloop_first = apostloop_first
 
-        super().__init__(completekey, prompt, stdin, stdout, use_raw_input, intro, ruler, doc_header, misc_header, undoc_header)
+        super().__init__(completekey, prompt, stdin, stdout, use_raw_input, intro, ruler, doc_header, misc_header, undoc_header,
+                         stats=stats, profiling=profiling)
+
+        # Set whenever lines are queued, to wake up an acmdloop() waiting for input
+        self._queue_event: asyncio.Event = asyncio.Event()
+        self._pending_read: asyncio.Future | None = None
+        self._ahead_queued: bool = False    # Whether the line read ahead by _ready_line() was queued
+        self._stream_reader: StreamInputReader | None = None   # Reading stdin ahead of the commands
+
+        # Worker pools for blocking and CPU-bound work
+        self._executor: Executor | None = executor
+        self._process_executor: Executor | None = process_executor
+        self._owned_executors: list[Executor] = []
+
+        # Timeouts and cancellation
+        self.command_timeout: float | None = command_timeout
+        self.cancel_on_interrupt: bool = cancel_on_interrupt
+        self._command_task: asyncio.Task | None = None
+        self._interrupt_pending: bool = False
+        self._interruptible: bool = False   # SIGINT handler installed
+
+        # Concurrent dispatch mode
+        self._jobs: JobPool | None = None
+        if max_jobs is not None:
+            from asiocmd.jobs import JobPool
+            self._jobs = JobPool(max_jobs)
+            self._register_builtin("jobs", self._jobs_command)
+            self._register_builtin("wait", self._wait_command)
+            self._register_builtin("cancel", self._cancel_command)
 
     # Asynchronous hook methods
     async def aprecmd(self, line: str):
@@ -93,16 +273,133 @@ class AsyncCmd(Cmd):
         return await self.apostcmd(stop, line)
 
     async def _postloop_wrapper(self) -> None:
-        if self.apostloop_first:
-            await self.apostloop()
-            return self.postloop()
-        self.postloop()
-        return await self.apostloop()
+        if self._jobs is not None:
+            await self._jobs.drain()
+        try:
+            if self.apostloop_first:
+                await self.apostloop()
+                return self.postloop()
+            self.postloop()
+            return await self.apostloop()
+        finally:
+            self._shutdown_executors()
     
     # Synchronous command loop strictly not allowed
     def cmdloop(self) -> NoReturn:
         raise NotImplementedError(f"{self.__class__.__name__} does not allow synchronous command loop")
 
+    def enqueue(self, line: str) -> None:
+        """
+        Queue 'line' to be executed by the command loop. A running acmdloop()
+        picks it up immediately, even while it is waiting for input.
+        """
+        self.cmdqueue.append(line)
+        self._queue_event.set()
+
+    def enqueue_many(self, lines: Iterable[str]) -> None:
+        """
+        Queue every line in 'lines', in order, like enqueue().
+        """
+        self.cmdqueue.extend(lines)
+        self._queue_event.set()
+
+    async def _next_line(self, reader: "InputReader") -> str:
+        # Wait for whichever comes first, a queued line or a line of input.
+        # A read that loses the race is kept pending for the next call.
+        while not self.cmdqueue:
+            if self._pending_read is None:
+                if reader.immediate:
+                    line = await reader.readline(self.prompt)
+                    return 'EOF' if line is None else line
+                self._pending_read = asyncio.ensure_future(reader.readline(self.prompt))
+            
+            self._queue_event.clear()
+            queued = asyncio.ensure_future(self._queue_event.wait())
+            try:
+                await asyncio.wait((self._pending_read, queued), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                queued.cancel()
+            
+            if self._pending_read.done():
+                read, self._pending_read = self._pending_read, None
+                line = read.result()
+                return 'EOF' if line is None else line
+        return self.cmdqueue.popleft()
+
+    async def _ready_line(self, reader: "InputReader") -> str | None:
+        # The next line if it is available without waiting, otherwise None.
+        # A read that has not completed is kept pending for _next_line().
+        self._ahead_queued = bool(self.cmdqueue)
+        if self.cmdqueue:
+            return self.cmdqueue.popleft()
+        if not reader.lookahead:
+            return None
+        try:
+            if reader.immediate:
+                line = await reader.readline(self.prompt)
+                return 'EOF' if line is None else line
+            if self._pending_read is None:
+                self._pending_read = asyncio.ensure_future(reader.readline(self.prompt))
+                await asyncio.sleep(0)
+            if not self._pending_read.done():
+                return None
+            read, self._pending_read = self._pending_read, None
+            line = read.result()
+        except EOFError:    # Raised again by the next read, ending the loop
+            return None
+        return 'EOF' if line is None else line
+
+    @contextmanager
+    def pause_input(self) -> Iterator[None]:
+        """
+        Stop acmdloop() from reading stdin ahead of the commands within the
+        block, so that input() and stdin.readline() get the next lines of input.
+        Synchronous commands other than generators run paused; asynchronous
+        commands prompting for input should read it in the block, through
+        run_blocking().
+        Only stdin read from a pipe or socket is read ahead, otherwise this
+        does nothing.
+        """
+        if self._stream_reader is None:
+            yield
+            return
+        with self._stream_reader.paused() as stream:
+            if stream is None:
+                yield
+                return
+            stdin, self.stdin = self.stdin, stream
+            try:
+                yield
+            finally:
+                self.stdin = stdin
+
+    def make_input_reader(self) -> "InputReader":
+        """
+        Return the input backend used by acmdloop().
+
+        With use_rawinput, lines are read through input() in a worker thread so
+        that readline editing and completion keep working. Pipes and sockets are
+        read through `loop.connect_read_pipe`, other file descriptors (TTYs,
+        regular files) in a worker thread, and in-memory streams directly.
+        If stdin is an `asyncio.StreamReader` (such as a network connection),
+        it is read directly and the loop ends once it has been exhausted.
+        This may be overridden to supply a custom `InputReader`.
+        """
+        from asiocmd.readers import BlockingInputReader, StreamInputReader, ThreadInputReader
+        if isinstance(self.stdin, asyncio.StreamReader):
+            return StreamInputReader(self.stdin, self.stdout, reader=self.stdin, end_on_eof=True)
+        if self.use_rawinput:
+            return ThreadInputReader(self.stdin, self.stdout, use_rawinput=True)
+        
+        try:
+            mode: int = os.fstat(self.stdin.fileno()).st_mode
+        except (AttributeError, OSError, ValueError):
+            return BlockingInputReader(self.stdin, self.stdout)
+        
+        if stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode):
+            return StreamInputReader(self.stdin, self.stdout)
+        return ThreadInputReader(self.stdin, self.stdout, use_rawinput=False)
+
     async def acmdloop(self):
         """
         Repeatedly issue a prompt, accept input, parse an initial prefix
@@ -110,47 +407,237 @@ class AsyncCmd(Cmd):
         the remainder of the line as argument.
         """
         await self._preloop_wrapper()
-        if self.use_rawinput and self.completekey:
-            self.old_completer = readline.get_completer()
-            readline.set_completer(self.complete)
-            if readline.backend == "editline":
-                if self.completekey == 'tab':
-                    # libedit uses "^I" instead of "tab"
-                    command_string = "bind ^I rl_complete"
-                else:
-                    command_string = f"bind {self.completekey} rl_complete"
-            else:
-                command_string = f"{self.completekey}: complete"
-            readline.parse_and_bind(command_string)
+        self._install_completer()
         
         if self.intro:
             self.stdout.write(self.intro)
         
-        stop = None
-        while not stop:
-            if self.cmdqueue:
-                line = self.cmdqueue.pop(0)
-            else:
-                if self.use_rawinput:
+        from asiocmd.readers import StreamInputReader
+        reader: InputReader = self.make_input_reader()
+        if isinstance(reader, StreamInputReader) and reader.stdin is self.stdin:
+            self._stream_reader = reader
+        restore_interrupt: Callable[[], None] | None = self._install_interrupt_handler()
+        line: str | None = None
+        try:
+            stop = None
+            while not stop:
+                if line is None:
                     try:
-                        line = input(self.prompt)
-                    except EOFError:
-                        line = 'EOF'
-                else:
-                    self.stdout.write(self.prompt)
-                    self.stdout.flush()
-                    line = self.stdin.readline()
-                    if not len(line):
-                        line = 'EOF'
+                        line = await self._next_line(reader)
+                    except EOFError:    # Input source gone for good
+                        break
+                run, batcher, line = await self._collect_run(line, partial(self._ready_line, reader))
+                with self.stdout:
+                    if batcher is None:
+                        _, stop = await self._aexecute(run[0])
                     else:
-                        line = line.rstrip('\r\n')
-            
-            line = await self._precmd_wrapper(line)
-            stop = await self.onecmd(line)
-            stop = await self._postcmd_wrapper(stop, line)
+                        outcomes = await self._aexecute_run(run, batcher)
+                        for outcome in outcomes:
+                            if isinstance(outcome, BaseException):
+                                raise outcome
+                        stop = any(outcome[1] for outcome in outcomes)
+                await self.stdout.drain()
+        except asyncio.CancelledError:
+            if not self._interrupt_pending:
+                raise
+            # Ctrl-C with no command running ends the loop, as in Cmd.cmdloop()
+            self._interrupt_pending = False
+            current: asyncio.Task | None = asyncio.current_task()
+            if current is not None:
+                current.uncancel()
+            raise KeyboardInterrupt from None
+        finally:
+            if restore_interrupt is not None:
+                restore_interrupt()
+            # Lines read past the last command run are handed back, not dropped
+            if line is not None:
+                if self._ahead_queued:
+                    self.cmdqueue.appendleft(line)
+                else:
+                    reader.unread(line)
+            if self._pending_read is not None:
+                read, self._pending_read = self._pending_read, None
+                if not read.done():
+                    read.cancel()
+                elif not read.cancelled() and read.exception() is None and read.result() is not None:
+                    reader.unread(read.result())
+            self._stream_reader = None
+            reader.close()
         await self._postloop_wrapper()
-        if self.use_rawinput and self.completekey:
-            readline.set_completer(self.old_completer)
+        self._restore_completer()
+
+    async def _aexecute(self, line: str) -> tuple[Any, Any]:
+        # Run 'line' through the precmd, onecmd and postcmd hooks, returning the
+        # result of onecmd() and the stop flag. postcmd() for background jobs
+        # runs once the job finishes.
+        if self.stats_sink is None:
+            line = await self._precmd_wrapper(line)
+            result = await self.onecmd(line)
+            if self._is_job(result):
+                return result, None
+            return result, await self._postcmd_wrapper(result, line)
+
+        start: float = time.perf_counter()
+        line = await self._precmd_wrapper(line)
+        dispatched: float = time.perf_counter()
+        try:
+            result = await self.onecmd(line)
+        except BaseException:
+            self._record_stats(line, time.perf_counter() - dispatched, dispatched - start, True)
+            raise
+        if self._is_job(result):
+            result.task.add_done_callback(
+                lambda task: self._record_stats(line, time.perf_counter() - dispatched, dispatched - start,
+                                                task.cancelled() or task.exception() is not None))
+            return result, None
+        finished: float = time.perf_counter()
+        stop = await self._postcmd_wrapper(result, line)
+        self._record_stats(line, finished - dispatched, dispatched - start + time.perf_counter() - finished, False)
+        return result, stop
+
+    def _is_job(self, result: Any) -> bool:
+        # Jobs only exist in concurrent mode, which imports their module
+        if self._jobs is None:
+            return False
+        from asiocmd.jobs import Job
+        return isinstance(result, Job)
+
+    def _batcher_of(self, line: str) -> "Batcher | None":
+        # The batcher of the batch command 'line' invokes in the foreground, if any
+        cmd, arg, _ = self.parseline(line)
+        if not cmd or arg is None or '|' in arg:
+            return None
+        record: DispatchRecord | None = self._method_mapping.get(cmd)
+        if record is None or (record.background and self._jobs is not None):
+            return None
+        return record.batcher
+
+    async def _collect_run(self,
+                           line: str,
+                           ready: Callable[[], Awaitable[str | None]]) -> "tuple[list[str], Batcher | None, str | None]":
+        # Extend 'line', if it invokes a batch command, with the following lines
+        # invoking the same one that 'ready' provides without waiting. Returns
+        # the run, its batcher and the line read past its end, if any.
+        batcher: Batcher | None = self._batcher_of(line)
+        run: list[str] = [line]
+        if batcher is None:
+            return run, None, None
+        while len(run) < batcher.policy.max_size:
+            following: str | None = await ready()
+            if following is None:
+                break
+            if self._batcher_of(following) is not batcher:
+                return run, batcher, following
+            run.append(following)
+        return run, batcher, None
+
+    async def _aexecute_run(self, lines: list[str], batcher: "Batcher") -> list[tuple[Any, Any] | BaseException]:
+        # Execute 'lines', all invoking the batch command of 'batcher', concurrently,
+        # so that their arguments reach it as one batch as soon as they are all in.
+        # Returns the outcome of _aexecute() or the exception raised, per line.
+        from asiocmd.batching import expected
+        expectations = [batcher.expect() for _ in lines]
+
+        async def execute(line: str, expectation: Any) -> tuple[Any, Any]:
+            with expected(expectation):
+                return await self._aexecute(line)
+
+        outer: asyncio.Task | None = self._command_task
+        try:
+            return await asyncio.gather(*map(execute, lines, expectations), return_exceptions=True)
+        finally:
+            self._command_task = outer
+            for expectation in expectations:    # Lines cancelled before they started
+                expectation.withdraw()
+
+    def run_script(self, lines: Iterable[str], stop_on_error: bool = True) -> NoReturn:
+        raise NotImplementedError(f"{self.__class__.__name__} runs scripts with the coroutine arun_script()")
+
+    async def arun_script(self,
+                          lines: AsyncIterable[str|bytes] | Iterable[str|bytes],
+                          stop_on_error: bool = True) -> "list[CommandResult]":
+        """
+        Execute every line of 'lines' through the precmd, onecmd and postcmd
+        hooks (sync and async), without prompts, intro or readline.
+
+        'lines' may be a regular or an asynchronous iterable, such as an
+        `asyncio.StreamReader`; bytes are decoded as UTF-8. Blank lines are
+        skipped. Execution ends early when the postcmd hooks return a true
+        value, or when a command raises and 'stop_on_error' is set; otherwise
+        the exception is recorded and the next line is run. Consecutive lines
+        invoking the same batch command are run together, as one batch, and
+        ending early takes effect after all of them. Background jobs still
+        running at the end are waited for.
+        Returns one `CommandResult` per executed line.
+        """
+        from asiocmd.script import CommandResult
+        results: list[CommandResult] = []
+        source: AsyncIterator[str|bytes] | Iterator[str|bytes] = (
+            aiter(lines) if isinstance(lines, AsyncIterable) else iter(lines))
+        ahead: asyncio.Future | None = None
+
+        async def next_line(wait: bool = True) -> str | None:
+            # The next line that is not blank, or None at the end of 'lines'.
+            # Without 'wait', None is also returned while an asynchronous
+            # source has no line ready, and its read is kept for the next call.
+            nonlocal ahead
+            while True:
+                if isinstance(source, Iterator):
+                    raw: str | bytes | None = next(source, None)
+                else:
+                    if ahead is None:
+                        ahead = asyncio.ensure_future(anext(source, None))
+                        if not wait:
+                            await asyncio.sleep(0)
+                    if not wait and not ahead.done():
+                        return None
+                    raw = await ahead
+                    ahead = None
+                if raw is None:
+                    return None
+                line: str = (raw.decode() if isinstance(raw, bytes) else raw).rstrip('\r\n')
+                if line.strip():
+                    return line
+
+        try:
+            line: str | None = await next_line()
+            while line is not None:
+                run, batcher, following = await self._collect_run(line, partial(next_line, False))
+                start: float = time.perf_counter()
+                outcomes: list[tuple[Any, Any] | BaseException]
+                try:
+                    with self.stdout:
+                        if batcher is None:
+                            outcomes = [await self._aexecute(line)]
+                        else:
+                            outcomes = await self._aexecute_run(run, batcher)
+                    await self.stdout.drain()
+                except Exception as exc:
+                    outcomes = [exc] * len(run)
+
+                # Lines of a batch run at the same time, and share its duration
+                elapsed: float = (time.perf_counter() - start) / len(run)
+                stop: Any = None
+                for run_line, outcome in zip(run, outcomes):
+                    if isinstance(outcome, BaseException):
+                        if not isinstance(outcome, Exception):
+                            raise outcome
+                        results.append(CommandResult(run_line, None, outcome, elapsed))
+                        stop = stop or stop_on_error
+                    else:
+                        results.append(CommandResult(run_line, outcome[0], None, elapsed))
+                        stop = stop or outcome[1]
+                if stop:
+                    break
+                line = following if following is not None else await next_line()
+        finally:
+            if ahead is not None:
+                ahead.cancel()
+
+        if self._jobs is not None:
+            await self._jobs.drain()
+        self._shutdown_executors()
+        return results
 
     async def onecmd(self, line: str):
         """
@@ -172,13 +659,407 @@ class AsyncCmd(Cmd):
             self.lastcmd = ''
         if cmd == '':
             return self.default(line)
-        else:
-            method: CmdMethod|None = self._method_mapping.get(cmd)
-            if not method:
+        try:
+            if '|' in arg and (stages := self._pipeline(line)) is not None:
+                return await self._await_command(self._arun_pipeline(stages), line, stages[-1][0].timeout)
+            record: DispatchRecord|None = self._method_mapping.get(cmd)
+            if record is None:
                 return self.default(line)
-            if inspect.iscoroutinefunction(inspect.unwrap(method)):
-                return await method(arg)
-            return method(arg)
+            if record.pipe:
+                return await self._await_command(self._arun_pipeline([(record, arg)]), line, record.timeout)
+            if record.is_async:
+                if record.background and self._jobs is not None:
+                    return self._spawn_job(record, record.bound, arg, line)
+                return await self._await_command(record.bound(arg), line, record.timeout)
+            if record.is_generator:
+                if record.background and self._jobs is not None:
+                    return self._spawn_job(record, partial(self._astream, record.bound), arg, line)
+                return await self._await_command(self._astream(record.bound, arg), line, record.timeout)
+            if record.process:
+                return await self._await_command(self._run_in_process(record, arg), line, record.timeout)
+            if self._stream_reader is not None:    # The command may read stdin
+                with self.pause_input():
+                    if record.blocking or (self.blocking_commands and record.entry.attr is not None):
+                        return await self._await_command(self.run_blocking(record.bound, arg), line, record.timeout)
+                    return record.bound(arg)
+            if record.blocking or (self.blocking_commands and record.entry.attr is not None):
+                return await self._await_command(self.run_blocking(record.bound, arg), line, record.timeout)
+            return record.bound(arg)
+        except ArgumentError as error:
+            return self.argerror(line, error)
+
+    async def _arun_pipeline(self, stages: list[tuple[DispatchRecord, str]]) -> Any:
+        # Run every stage feeding another one as a task pushing its chunks into a
+        # bounded queue, read by the next stage as an asynchronous iterator.
+        # Synchronous pipe stages read it as a blocking iterator instead, and run
+        # in a worker thread. The last stage runs in the current task.
+        if error := self._pipeline_error(stages):
+            self.stdout.write(error)
+            return None
+        bridge: _StageBridge = _StageBridge(asyncio.get_running_loop())
+        tasks: list[asyncio.Task] = []
+        queue: asyncio.Queue | None = None
+        try:
+            for record, arg in stages[:-1]:
+                output: asyncio.Queue = asyncio.Queue(self.pipe_buffer)
+                if self._threaded_stage(record, queue):
+                    generator = record.bound(arg, self._iter_queue_blocking(bridge, queue))
+                    tasks.append(asyncio.ensure_future(self.run_blocking(self._pump_blocking, bridge, generator, output)))
+                else:
+                    generator = record.bound(arg, self._stage_upstream(record, queue)) if record.pipe else record.bound(arg)
+                    tasks.append(asyncio.ensure_future(self._pump(generator, output)))
+                queue = output
+            record, arg = stages[-1]
+            if self._threaded_stage(record, queue):
+                blocking_upstream: Iterator[Any] = self._iter_queue_blocking(bridge, queue)
+                if record.is_generator:
+                    return await self.run_blocking(self._stream_blocking, bridge, record.bound, arg, blocking_upstream)
+                return await self.run_blocking(record.bound, arg, blocking_upstream)
+            upstream: Any = self._stage_upstream(record, queue)
+            if record.is_generator:
+                return await self._astream(record.bound, arg, upstream)
+            if record.is_async:
+                return await record.bound(arg, upstream)
+            return record.bound(arg, upstream)
+        finally:
+            bridge.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _sync_stage(record: DispatchRecord) -> bool:
+        return not (record.is_async or inspect.isasyncgenfunction(record.function))
+
+    def _threaded_stage(self, record: DispatchRecord, queue: asyncio.Queue | None) -> bool:
+        # Synchronous pipe stages fed by another stage iterate their upstream in a worker thread
+        return record.pipe and queue is not None and self._sync_stage(record)
+
+    def _stage_upstream(self, record: DispatchRecord, queue: asyncio.Queue | None) -> Any:
+        # Upstream of a stage running in the event loop: a synchronous pipe
+        # stage only runs there as the first stage, with nothing to read
+        if queue is None and self._sync_stage(record):
+            return iter(())
+        return self._iter_queue(queue)
+
+    @staticmethod
+    async def _pump(generator: Any, queue: asyncio.Queue) -> None:
+        try:
+            if inspect.isasyncgen(generator):
+                async for chunk in generator:
+                    await queue.put(chunk)
+            else:
+                for chunk in generator:
+                    await queue.put(chunk)
+        except Exception as exc:
+            await queue.put(_PipeError(exc))
+            return
+        finally:
+            if inspect.isasyncgen(generator):
+                await generator.aclose()
+            else:
+                generator.close()
+        await queue.put(_PIPE_END)
+
+    @staticmethod
+    def _pump_blocking(bridge: _StageBridge, generator: Iterator[Any], queue: asyncio.Queue) -> None:
+        # _pump() for synchronous pipe stages, run in a worker thread
+        try:
+            try:
+                for chunk in generator:
+                    bridge.call(queue.put(chunk))
+            except _PipeClosed:
+                return
+            except Exception as exc:
+                bridge.call(queue.put(_PipeError(exc)))
+                return
+            finally:
+                generator.close()   # type: ignore[attr-defined]
+            bridge.call(queue.put(_PIPE_END))
+        except _PipeClosed:
+            pass
+
+    @staticmethod
+    async def _iter_queue(queue: asyncio.Queue | None) -> AsyncIterator[Any]:
+        # Chunks of the previous stage, or nothing for the first stage
+        if queue is None:
+            return
+        while (chunk := await queue.get()) is not _PIPE_END:
+            if isinstance(chunk, _PipeError):
+                raise chunk.error
+            yield chunk
+
+    @staticmethod
+    def _iter_queue_blocking(bridge: _StageBridge, queue: asyncio.Queue | None) -> Iterator[Any]:
+        # _iter_queue() for synchronous pipe stages, iterated in a worker thread
+        if queue is None:
+            return
+        while (chunk := bridge.call(queue.get())) is not _PIPE_END:
+            if isinstance(chunk, _PipeError):
+                raise chunk.error
+            yield chunk
+
+    def _stream_blocking(self, bridge: _StageBridge, method: CmdMethod, *args: Any) -> Any:
+        # _astream() for a synchronous last stage, run in a worker thread:
+        # chunks are written and drained by the event loop
+        generator = method(*args)
+        try:
+            while True:
+                try:
+                    chunk = next(generator)
+                except StopIteration as exhausted:
+                    return exhausted.value
+                bridge.call(self._emit(chunk))
+        finally:
+            generator.close()
+
+    async def _emit(self, chunk: Any) -> None:
+        self.stdout.write(chunk if isinstance(chunk, str) else str(chunk))
+        await self.stdout.drain()
+
+    async def _astream(self, method: CmdMethod, *args: Any) -> Any:
+        # Write and drain every chunk yielded by a generator or asynchronous
+        # generator command as it is produced. Cancellation closes the generator.
+        generator = method(*args)
+        if inspect.isasyncgen(generator):
+            try:
+                async for chunk in generator:
+                    self.stdout.write(chunk if isinstance(chunk, str) else str(chunk))
+                    await self.stdout.drain()
+            finally:
+                await generator.aclose()
+            return None
+
+        try:
+            while True:
+                try:
+                    chunk = next(generator)
+                except StopIteration as exhausted:
+                    return exhausted.value
+                self.stdout.write(chunk if isinstance(chunk, str) else str(chunk))
+                await self.stdout.drain()
+                await asyncio.sleep(0)  # Let other tasks (and cancellation) in between chunks
+        finally:
+            generator.close()
+
+    async def _await_command(self, awaitable: Awaitable[Any], line: str, timeout: float | None) -> Any:
+        # Await a command, applying its timeout and letting Ctrl-C cancel it
+        if timeout is None:
+            timeout = self.command_timeout
+        if timeout is None and not self._interruptible:
+            return await awaitable
+
+        outer, self._command_task = self._command_task, asyncio.current_task()
+        try:
+            async with asyncio.timeout(timeout):
+                return await awaitable
+        except TimeoutError:
+            assert timeout is not None
+            return self.cmdtimeout(line, timeout)
+        except asyncio.CancelledError:
+            if not self._interrupt_pending:
+                raise
+            self._interrupt_pending = False
+            assert self._command_task is not None
+            self._command_task.uncancel()
+            return self.cmdcancelled(line)
+        finally:
+            self._command_task = outer
+
+    def _install_interrupt_handler(self) -> Callable[[], None] | None:
+        # Route SIGINT to _interrupt() while acmdloop() runs, returning a
+        # function ending the routing
+        if not self.cancel_on_interrupt or threading.current_thread() is not threading.main_thread():
+            return None
+        target: tuple[AsyncCmd, asyncio.Task | None] = (self, asyncio.current_task())
+        if not _interrupts.add(target):
+            return None
+
+        self._interruptible = True
+
+        def restore() -> None:
+            self._interruptible = False
+            _interrupts.remove(target)
+        return restore
+
+    def _interrupt(self, loop_task: asyncio.Task | None) -> None:
+        task: asyncio.Task | None = self._command_task or loop_task
+        if task is not None and not task.done():
+            self._interrupt_pending = True
+            task.cancel()
+
+    def cmdtimeout(self, line: str, timeout: float):
+        """
+        Hook method executed when the command 'line' timed out after 'timeout'
+        seconds. Its return value is used as the result of the command.
+        """
+        self.stdout.write(f"Command timed out after {timeout:g}s: {line}\n")
+
+    def cmdcancelled(self, line: str):
+        """
+        Hook method executed when the command 'line' was cancelled by Ctrl-C.
+        Its return value is used as the result of the command.
+        """
+        self.stdout.write(f"Command cancelled: {line}\n")
+
+    def _get_executor(self, process: bool) -> Executor:
+        executor: Executor | None = self._process_executor if process else self._executor
+        if executor is None:
+            # Pool implementations are imported on demand, multiprocessing is slow to import
+            if process:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Forking is unsafe once reader and worker threads exist
+                method: str = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                executor = self._process_executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                executor = self._executor = ThreadPoolExecutor(thread_name_prefix="asiocmd-command")
+            self._owned_executors.append(executor)
+        return executor
+
+    def _shutdown_executors(self) -> None:
+        # Pools given by the user are left running
+        for executor in self._owned_executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if executor is self._executor:
+                self._executor = None
+            if executor is self._process_executor:
+                self._process_executor = None
+        self._owned_executors.clear()
+
+    async def aclose(self) -> None:
+        """
+        Wait for background jobs, then shut down the worker pools created for
+        this instance and wait for their threads and processes to exit. Needed
+        when commands are run with onecmd() rather than acmdloop() or
+        arun_script(); also called when leaving an `async with` block.
+        """
+        if self._jobs is not None:
+            await self._jobs.drain()
+        executors: list[Executor] = list(self._owned_executors)
+        self._shutdown_executors()
+        for executor in executors:
+            await asyncio.to_thread(executor.shutdown)
+
+    async def __aenter__(self) -> "AsyncCmd":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call 'func' with 'args' in a worker thread, without blocking the event
+        loop. Context variables of the caller are visible to 'func'.
+        """
+        context: contextvars.Context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(False), context.run, func, *args)
+
+    async def run_cpu_bound(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call 'func' with 'args' in a worker process. 'func', 'args' and the
+        return value must be picklable, so this is meant for module-level
+        functions rather than bound commands.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(True), func, *args)
+
+    async def _run_in_process(self, record: DispatchRecord, arg: str) -> None:
+        # Run a command declared with process=True in the process pool, writing its result.
+        # Typed commands are parsed here, so that only the converted arguments are pickled.
+        assert record.function is not None
+        call: Callable[[], Any] = partial(record.function, arg)
+        if record.parser is not None:
+            args, kwargs = record.parser.parse(arg)
+            call = partial(record.function, *args, **kwargs)
+        result: Any = await self.run_cpu_bound(call)
+        if result is not None:
+            self.stdout.write(result if isinstance(result, str) else str(result))
+
+    def _spawn_job(self, record: DispatchRecord, method: CmdMethod, arg: str, line: str) -> "Job":
+        # Typed arguments are checked before the job starts, so that an
+        # ArgumentError reaches argerror() from onecmd() like in the foreground
+        assert self._jobs is not None
+        if record.parser is not None:
+            record.parser.parse(arg)
+        return self._jobs.spawn(line, self._run_job(method, arg, line, record.timeout))
+
+    async def _run_job(self, method: CmdMethod, arg: str, line: str, timeout: float | None = None) -> Any:
+        if timeout is None:
+            timeout = self.command_timeout
+        try:
+            async with asyncio.timeout(timeout):
+                stop = await method(arg)
+        except TimeoutError:
+            assert timeout is not None
+            stop = self.cmdtimeout(line, timeout)
+        except Exception as exc:
+            self.stdout.write(f"Job failed: {line}: {exc!r}\n")
+            raise
+        return await self._postcmd_wrapper(stop, line)
+
+    @staticmethod
+    def _parse_job_ids(arg: str) -> list[int]|None:
+        return [int(i) for i in arg.split()] if arg.strip() else None
+
+    def _jobs_command(self, arg: str) -> None:
+        """
+        List running background jobs.
+        """
+        assert self._jobs is not None
+        if not len(self._jobs):
+            self.stdout.write("No background jobs\n")
+            return
+        for job in self._jobs:
+            self.stdout.write(f"[{job.id}] {job.state}\t{job.line}\n")
+
+    async def _wait_command(self, arg: str) -> None:
+        """
+        Wait for background jobs to finish: "wait" for all jobs, or "wait <id> [<id> ...]".
+        """
+        assert self._jobs is not None
+        try:
+            ids: list[int]|None = self._parse_job_ids(arg)
+        except ValueError:
+            self.stdout.write(f"Invalid job ids: {arg}\n")
+            return
+        for job in await self._jobs.wait(ids):
+            self.stdout.write(f"[{job.id}] {job.state}\t{job.line}\n")
+
+    def _cancel_command(self, arg: str) -> None:
+        """
+        Cancel background jobs: "cancel" for all jobs, or "cancel <id> [<id> ...]".
+        """
+        assert self._jobs is not None
+        try:
+            ids: list[int]|None = self._parse_job_ids(arg)
+        except ValueError:
+            self.stdout.write(f"Invalid job ids: {arg}\n")
+            return
+        for job in self._jobs.cancel(ids):
+            self.stdout.write(f"[{job.id}] cancelled\t{job.line}\n")
+
+    async def _profile_command(self, arg: str):
+        """
+        Profile a command: "profile [-m] [-n TOP] [-o FILE] <command line>".
+        -m traces memory allocations instead of function calls, -n sets the
+        number of entries shown and -o saves the raw profile to FILE.
+        Background commands are waited for. Other tasks running meanwhile
+        are included in the profile.
+        """
+        from asiocmd.profiling import CommandProfile    # Loads cProfile and pstats
+        try:
+            profile: CommandProfile = CommandProfile.from_arg(arg)
+        except ValueError as exc:
+            self.stdout.write(f"{exc}\n{CommandProfile.USAGE}")
+            return
+        with profile:
+            result = await self.onecmd(profile.line)
+            if self._is_job(result):
+                await asyncio.wait((result.task,))
+                result = None
+        self.stdout.write(profile.report())
+        return result
 
     async def emptyline(self):
         """
@@ -196,18 +1077,16 @@ class AsyncCmd(Cmd):
         List available commands with "help" or detailed help with "help cmd".
         """
         if arg:
-            help_method: CmdMethod|None = self._helper_mapping.get(arg.strip())
-            if not help_method:
+            helper: DispatchRecord|None = self._helper_mapping.get(arg.strip())
+            if helper is None:
                 self.stdout.write(f"No help available for: {arg}")
                 return
             
-            if inspect.iscoroutinefunction(inspect.unwrap(help_method)):
-                await help_method()
+            if helper.is_async:
+                await helper.bound()
             else:
-                help_method()
+                helper.bound()
             return
         
         # Display help (if available) for all registered commands
-        self.print_topics(self.doc_header, list(self._helper_mapping.keys()), 80)
-        self.stdout.write("\n")
-        self.print_topics(self.undoc_header, list(self._method_mapping.keys() - self._helper_mapping.keys()), 80)
\ No newline at end of file
+        self.stdout.write(self._help_listing())
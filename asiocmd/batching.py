@@ -0,0 +1,192 @@
+"""Request batching for asynchronous commands.
+
+An `@async_command` declared with batch=True (or a `BatchPolicy`) is a batch
+handler: it is called with a list of argument strings and returns one result
+per argument, in the same order:
+
+    @async_command(batch=BatchPolicy(window=0.01, max_size=100))
+    async def lookup(self, args: list[str]) -> list[str]:
+        return await backend.get_many(args)
+
+Invocations of the command ("lookup a", "lookup b", ...) arriving within
+'window' seconds of the first one are collected and handed to the handler
+in a single call, sent early once 'max_size' distinct arguments are pending.
+Identical arguments are passed once and share their result, including those
+arriving while a batch containing them is being handled.
+Each result is written to the output of the invocation it belongs to (a
+result of None writes nothing), and a result that is an exception is raised
+from that invocation alone; an exception raised by the handler is raised
+from every invocation of the batch.
+
+Batches are collected per instance. With shared=True, invocations from all
+instances of the class (such as the sessions of a `CmdServer`) are batched
+together, and the handler runs bound to the instance of the first one.
+
+A dispatcher knowing how many invocations are on their way (such as
+`AsyncCmd.arun_script` running consecutive lines of a batch command at once)
+announces each of them with expect(), and runs it within expected(). The batch
+is sent as soon as all of them have arrived instead of at the end of the
+window, unless it is shared.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+__all__ = ("BatchPolicy", "Batcher", "expected")
+
+class BatchPolicy:
+    """
+    Collection window (in seconds) and maximum size of the batches of a command,
+    and whether they are shared by all instances of its class.
+    """
+
+    __slots__ = ('window', 'max_size', 'shared')
+
+    def __init__(self, window: float = 0.005, max_size: int = 64, shared: bool = False):
+        if window < 0:
+            raise ValueError(f"window must not be negative, got {window}")
+        if max_size < 1:
+            raise ValueError(f"max_size must be a positive integer, got {max_size}")
+        self.window = window
+        self.max_size = max_size
+        self.shared = shared
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(window={self.window}, max_size={self.max_size}, shared={self.shared})"
+
+class _Expectation:
+    # An announced invocation, until it reaches its batcher
+    __slots__ = ('batcher',)
+
+    def __init__(self, batcher: "Batcher"):
+        self.batcher: Batcher|None = batcher
+
+    def withdraw(self) -> None:
+        """
+        Count the invocation as arrived if it has not been submitted.
+        """
+        if self.batcher is not None:
+            self.batcher._arrive(self)
+
+_arrival: ContextVar[_Expectation|None] = ContextVar("asiocmd_batch_arrival", default=None)
+
+@contextmanager
+def expected(expectation: _Expectation) -> Iterator[None]:
+    """
+    Mark the invocation announced by 'expectation' as the one running in the
+    current context. It arrives when it is submitted, or when the block exits
+    without submitting it (for instance, once precmd() has rewritten the line).
+    """
+    token = _arrival.set(expectation)
+    try:
+        yield
+    finally:
+        _arrival.reset(token)
+        expectation.withdraw()
+
+class Batcher:
+    """
+    Pending invocations of one batch command, as futures keyed on their
+    argument string, along with the handler that will receive them, and the
+    futures of the batches being handled.
+    """
+
+    __slots__ = ('policy', 'batches', '_pending', '_inflight', '_handler', '_timer', '_tasks', '_expected')
+
+    def __init__(self, policy: BatchPolicy):
+        self.policy = policy
+        self.batches: int = 0   # Number of handler calls made so far
+        self._pending: dict[str, Any] = {}
+        self._inflight: dict[str, Any] = {}
+        self._handler: Callable[[list[str]], Any]|None = None
+        self._timer: Any = None
+        self._tasks: set[Any] = set()
+        self._expected: int = 0     # Announced invocations yet to arrive
+
+    def expect(self) -> _Expectation:
+        """
+        Announce an invocation about to be submitted, to be run within expected().
+        """
+        self._expected += 1
+        return _Expectation(self)
+
+    async def submit(self, handler: Callable[[list[str]], Any], arg: str) -> Any:
+        """
+        Add 'arg' to the current batch, opening one for 'handler' if none is
+        pending, and return its result once the batch has been handled.
+        Cancelling the caller does not cancel the batch.
+        """
+        future: asyncio.Future|None = self._pending.get(arg)
+        if future is None:
+            future = self._inflight.get(arg)
+        if future is None:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            future = self._pending[arg] = loop.create_future()
+            if self._handler is None:
+                self._handler = handler
+            if len(self._pending) >= self.policy.max_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.policy.window, self._flush)
+        expectation: _Expectation|None = _arrival.get()
+        if expectation is not None and expectation.batcher is self:
+            self._arrive(expectation)
+        return await asyncio.shield(future)
+
+    def wrap(self, handler: Callable[[list[str]], Any], owner: Any) -> Callable[[str], Any]:
+        """
+        Return the command submitting its argument string to this batcher
+        and writing the result to the output of 'owner'.
+        """
+        async def call(arg: str) -> None:
+            result: Any = await self.submit(handler, arg)
+            if result is not None and owner is not None:
+                owner.stdout.write(result if isinstance(result, str) else str(result))
+        return call
+
+    def _arrive(self, expectation: _Expectation) -> None:
+        expectation.batcher = None
+        self._expected -= 1
+        # Nothing else is on its way: waiting out the window would be idle time
+        if not self._expected and self._pending and not self.policy.shared:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        handler, self._handler = self._handler, None
+        if not batch:
+            return
+        assert handler is not None
+        self.batches += 1
+        for arg, future in batch.items():
+            self._inflight[arg] = future
+            future.add_done_callback(lambda _, arg=arg: self._inflight.pop(arg, None))
+        task: asyncio.Task = asyncio.ensure_future(self._run(handler, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _run(handler: Callable[[list[str]], Any], batch: dict[str, Any]) -> None:
+        args: list[str] = list(batch)
+        try:
+            results: list[Any] = list(await handler(args))
+            if len(results) != len(args):
+                raise ValueError(f"Batch handler returned {len(results)} results for {len(args)} arguments")
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            results = [exc] * len(args)
+        for future, result in zip(batch.values(), results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
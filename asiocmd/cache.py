@@ -0,0 +1,165 @@
+"""Memoized results for idempotent commands.
+
+Commands declared with cache=True (or a `CachePolicy`) keep the results of
+their recent invocations, keyed on the argument string, in a `ResultCache`
+per instance. A cached invocation returns the stored result and writes the
+output the command wrote when it ran, without running it again:
+
+    @async_command(cache=CachePolicy(ttl=30, maxsize=256))
+    async def status(self, line: str): ...
+
+Entries expire after 'ttl' seconds, and the least recently used ones are
+evicted past 'maxsize'. Failed invocations are not cached. Concurrent
+invocations of an asynchronous command with the same arguments share a
+single run. Generator and pipe commands are never cached.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple
+
+from asiocmd.output import capture_output
+
+__all__ = ("CachePolicy", "CacheInfo", "ResultCache")
+
+class CachePolicy:
+    """
+    Expiry and size limits of the caches of a command. 'ttl' is in seconds,
+    None keeps results until they are evicted or invalidated, and 'maxsize'
+    None keeps any number of results.
+    """
+
+    __slots__ = ('ttl', 'maxsize')
+
+    def __init__(self, ttl: float|None = None, maxsize: int|None = 128):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError(f"maxsize must be a positive integer or None, got {maxsize}")
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(ttl={self.ttl}, maxsize={self.maxsize})"
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int|None
+    currsize: int
+
+class ResultCache:
+    """
+    Results of one command of the instance 'owner', as (expiry, result,
+    output) entries in least recently used order. Output is replayed to the
+    stdout of 'owner'.
+    """
+
+    __slots__ = ('policy', 'owner', 'hits', 'misses', '_entries', '_inflight')
+
+    def __init__(self, policy: CachePolicy, owner: Any = None):
+        self.policy = policy
+        self.owner = owner
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, tuple[float, Any, str]] = OrderedDict()
+        self._inflight: dict[str, Any] = {}    # Argument string -> [task, waiters]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.policy.maxsize, len(self._entries))
+
+    def invalidate(self, arg: str|None = None) -> None:
+        """
+        Discard the result for the argument string 'arg', or all results.
+        Invocations already running are not affected.
+        """
+        if arg is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(arg, None)
+
+    def lookup(self, arg: str) -> tuple[bool, Any]:
+        """
+        Return whether a live result is cached for 'arg', and that result.
+        A hit replays the output of the cached invocation.
+        """
+        entry: tuple[float, Any, str]|None = self._entries.get(arg)
+        if entry is None:
+            return False, None
+        expiry, result, output = entry
+        if expiry < time.monotonic():
+            del self._entries[arg]
+            return False, None
+        self._entries.move_to_end(arg)
+        if output and self.owner is not None:
+            self.owner.stdout.write(output)
+        return True, result
+
+    def store(self, arg: str, result: Any, output: str) -> None:
+        ttl: float|None = self.policy.ttl
+        self._entries[arg] = (time.monotonic() + ttl if ttl is not None else float("inf"), result, output)
+        self._entries.move_to_end(arg)
+        maxsize: int|None = self.policy.maxsize
+        if maxsize is not None and len(self._entries) > maxsize:
+            self._entries.popitem(last=False)
+
+    def wrap(self, method: Callable[..., Any], is_async: bool) -> Callable[..., Any]:
+        """
+        Wrap the command 'method' (or, with 'is_async', the coroutine function)
+        so that its invocations go through this cache.
+        """
+        if is_async:
+            return self._wrap_async(method)
+
+        def call(arg: str) -> Any:
+            hit, result = self.lookup(arg)
+            if hit:
+                self.hits += 1
+                return result
+            self.misses += 1
+            with capture_output() as chunks:
+                result = method(arg)
+            self.store(arg, result, "".join(chunks))
+            return result
+        return call
+
+    def _wrap_async(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        async def run(arg: str) -> tuple[Any, str]:
+            with capture_output() as chunks:
+                result = await method(arg)
+            output: str = "".join(chunks)
+            self.store(arg, result, output)
+            return result, output
+
+        async def call(arg: str) -> Any:
+            hit, result = self.lookup(arg)
+            if hit:
+                self.hits += 1
+                return result
+            # Callers with the same arguments share one run, cancelled
+            # only once all of them have been cancelled
+            flight: list[Any]|None = self._inflight.get(arg)
+            if flight is None:
+                self.misses += 1
+                task: asyncio.Task = asyncio.ensure_future(run(arg))
+                flight = self._inflight[arg] = [task, 0]
+                task.add_done_callback(lambda _: self._inflight.pop(arg, None))
+                leader: bool = True
+            else:
+                self.hits += 1
+                leader = False
+            flight[1] += 1
+            try:
+                result, output = await asyncio.shield(flight[0])
+            except asyncio.CancelledError:
+                flight[1] -= 1
+                if not flight[1]:
+                    flight[0].cancel()
+                raise
+            flight[1] -= 1
+            if not leader and output and self.owner is not None:
+                self.owner.stdout.write(output)     # The leader's output was written as it ran
+            return result
+        return call
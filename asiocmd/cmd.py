@@ -43,17 +43,40 @@ functions respectively.
 """
 
 import inspect
-import string
+import os
 import sys
-from types import MethodType
-from typing import Any, Final, Sequence, TextIO
-import readline
+import time
+from collections import deque
+from types import MethodType, ModuleType
+from typing import TYPE_CHECKING, Any, Callable, Final, Iterable, Iterator, Sequence, TextIO
 
+from asiocmd.output import OutputBuffer
+from asiocmd.parsing import ArgumentError, identchars_pattern, split_argv, split_pipeline
 from asiocmd.decorators import COMMAND_ATTR, HELPER_ATTR
+from asiocmd.registry import BoundMapping, CommandEntry, CommandTable, DispatchRecord, find_decorator_attr
 from asiocmd.typing import CmdMethod
 
+# Modules of optional features are imported by the methods using them
+if TYPE_CHECKING:
+    from asiocmd.cache import CacheInfo
+    from asiocmd.lazy import LazyCommand
+    from asiocmd.script import CommandResult
+    from asiocmd.stats import StatsSink
+
 __all__ = ("Cmd",)
 
+# string.ascii_letters + string.digits + '_', spelled out: string is slow to import
+_IDENTCHARS: Final[str] = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+
+def _import_readline() -> ModuleType|None:
+    # readline is imported only by interactive loops: importing it sets up the
+    # terminal, and the module is missing from some builds
+    try:
+        import readline
+    except ImportError:
+        return None
+    return readline
+
 class Cmd:
     """A simple framework for writing line-oriented command interpreters.
 
@@ -67,58 +90,227 @@ class Cmd:
     """
 
     __slots__ = (
-        'stdin', 'stdout', 'completekey', 'cmdqueue',
+        'stdin', '_stdout', 'completekey', '_cmdqueue',
         'old_completer', 'lastcmd', 'prompt',
         'identchars', 'intro', 'ruler',
         'doc_header', 'misc_header', 'undoc_header',
         'use_rawinput', 'completion_matches',
-        '_method_mapping', '_helper_mapping'
+        '_method_mapping', '_helper_mapping',
+        '_identchars_source', '_identchars_match',
+        '_help_cache', 'stats_sink'
         )
 
+    # Wrapper around stdout collecting the output of each command
+    output_class: type[OutputBuffer] = OutputBuffer
+
+    @property
+    def stdout(self) -> OutputBuffer:
+        """
+        Output stream of the interpreter. Streams assigned to it are wrapped
+        in an `output_class` buffer, which the command loops use as a context
+        manager around each command; the stream itself is never entered or closed.
+        """
+        return self._stdout
+
+    @stdout.setter
+    def stdout(self, stream: TextIO|Any) -> None:
+        self._stdout = stream if isinstance(stream, self.output_class) else self.output_class(stream)
+
+    @property
+    def cmdqueue(self) -> deque[str]:
+        """
+        Lines to run before reading input. Any iterable of lines may be
+        assigned to it (such as a list, as with the standard library's cmd);
+        it is stored as a deque.
+        """
+        return self._cmdqueue
+
+    @cmdqueue.setter
+    def cmdqueue(self, lines: Iterable[str]) -> None:
+        self._cmdqueue = lines if isinstance(lines, deque) else deque(lines)
+
     @staticmethod
     def _find_decorator_attr(method: MethodType, attr: str):
-        func = getattr(method, "__func__", method)
+        return find_decorator_attr(method, attr)
 
-        while func:
-            if hasattr(func, attr):
-                return getattr(func, attr)
-            func = getattr(func, "__wrapped__", None)
-
-        return None        
+    @classmethod
+    def _command_table(cls) -> CommandTable:
+        """
+        Return the commands and helpers declared by this class, scanning its
+        methods on first use only. Every instance of the class shares the table.
+        """
+        table: CommandTable|None = cls.__dict__.get("_compiled_table")
+        if table is None:
+            table = CommandTable.compile(cls)
+            setattr(cls, "_compiled_table", table)
+        return table
 
     def _update_mapping(self,
                         overwrite: bool) -> None:
+        """
+        Register the commands and helpers declared by the class of this instance.
+
+        With 'overwrite', the class is scanned again and any runtime changes to
+        the mappings are discarded. Otherwise, declared commands and helpers
+        are only added under names that are not mapped yet.
+        """
         if overwrite:
-            self._method_mapping.clear()
-            self._helper_mapping.clear()
-        
-        for name, method in inspect.getmembers(self, inspect.ismethod):
-            cmdname = self._find_decorator_attr(method, COMMAND_ATTR)
-            helpname = self._find_decorator_attr(method, HELPER_ATTR)
-            if cmdname and helpname:
-                raise ValueError(f"Method {name} ({repr(method)}) cannot be both a command and a helper")
-
-            # NOTE: If a command has a docstring AND a dedicated helper method, then the latter will be given priority
-            # NOTE: Commands defined with decorators are prioritised over legacy commands of the same name
-            if cmdname is not None: # Method decorated with @command or @async_command
-                self._method_mapping[cmdname] = method
-                if docs:=inspect.cleandoc(method.__doc__ or ''):
-                    self._helper_mapping.setdefault(cmdname, lambda d=docs : self.stdout.write(d))
-            
-            elif name.startswith("do_"):  # Legacy method, defined as do_*()
-                name = name[3:]
-                self._method_mapping.setdefault(name, method)
-                if docs:=inspect.cleandoc(method.__doc__ or ''):
-                    self._helper_mapping.setdefault(name, lambda d=docs : self.stdout.write(d))
-            
-            elif helpname: # Method decorated with @command_helper or @async_command_helper
-                self._helper_mapping[helpname] = method
-            elif name.startswith("help_"):  # Legacy method for help, defined as help_*()
-                self._helper_mapping.setdefault(name[5:], method)
+            setattr(self.__class__, "_compiled_table", None)
+        table: CommandTable = self._command_table()
+        if table.error:
+            raise ValueError(table.error)
+
+        if overwrite or not (self._method_mapping or self._helper_mapping):
+            self._method_mapping.reset(table.commands, table.command_index)
+            self._helper_mapping.reset(table.helpers, table.helper_index)
+            return
+
+        for name, entry in table.commands.items():
+            if name not in self._method_mapping:
+                self._method_mapping.set_entry(name, entry)
+        for name, entry in table.helpers.items():
+            if name not in self._helper_mapping:
+                self._helper_mapping.set_entry(name, entry)
 
         if difference := (self._helper_mapping.keys() - self._method_mapping.keys()):
             raise ValueError(f"helpers: ({', '.join(difference)}) are defined for non-existent methods")
 
+    def _register_builtin(self, name: str, method: CmdMethod) -> None:
+        # Built-in commands never shadow commands defined by the user
+        if name in self._method_mapping:
+            return
+        self._method_mapping[name] = DispatchRecord.from_callable(name, method)
+        if docs:=inspect.cleandoc(method.__doc__ or ''):
+            self._helper_mapping.setdefault(name, DispatchRecord.from_callable(name, lambda d=docs : self.stdout.write(d)))
+
+    def register_command(self,
+                         method: Callable[..., Any],
+                         name: str|None = None,
+                         replace: bool = False) -> str:
+        """
+        Register 'method' as a command of this instance and return its name.
+
+        The name defaults to the one given to `@command`/`@async_command`, or
+        the method name without its "do_" prefix. Plain functions are bound to
+        the instance, like methods. The docstring serves as help unless a
+        helper is registered. Raises ValueError if the name is taken (unless
+        'replace' is set) or if 'method' is a helper.
+        """
+        if find_decorator_attr(method, HELPER_ATTR):
+            raise ValueError(f"Method {method!r} is a helper and cannot be registered as a command")
+        name = name or find_decorator_attr(method, COMMAND_ATTR) or method.__name__.removeprefix("do_")
+        if name in self._method_mapping and not replace:
+            raise ValueError(f"Command {name} is already registered")
+
+        bound: Callable[..., Any] = MethodType(method, self) if inspect.isfunction(method) else method
+        self._method_mapping[name] = DispatchRecord(bound, CommandEntry(name, None, None, bound), self)
+        if replace:
+            self._helper_mapping.pop(name, None)
+        if docs:=inspect.cleandoc(method.__doc__ or ''):
+            self._helper_mapping.setdefault(name, CommandEntry(name, None, docs).bind(self))
+        return name
+
+    def register_helper(self,
+                        method: Callable[..., Any],
+                        name: str|None = None) -> str:
+        """
+        Register 'method' as the helper of a registered command and return its name.
+
+        The name defaults to the one given to `@command_helper`, or the method
+        name without its "help_" prefix. Raises ValueError if no command has
+        that name or if 'method' is a command.
+        """
+        if find_decorator_attr(method, COMMAND_ATTR):
+            raise ValueError(f"Method {method!r} is a command and cannot be registered as a helper")
+        name = name or find_decorator_attr(method, HELPER_ATTR) or method.__name__.removeprefix("help_")
+        if name not in self._method_mapping:
+            raise ValueError(f"helpers: ({name}) are defined for non-existent methods")
+
+        bound: Callable[..., Any] = MethodType(method, self) if inspect.isfunction(method) else method
+        self._helper_mapping[name] = DispatchRecord(bound, CommandEntry(name, None, None, bound))
+        return name
+
+    def unregister_command(self, name: str) -> None:
+        """
+        Remove the command 'name' and its helper. Raises KeyError if no such command exists.
+        """
+        del self._method_mapping[name]
+        self._helper_mapping.pop(name, None)
+
+    def invalidate_cache(self, name: str|None = None, arg: str|None = None) -> None:
+        """
+        Discard the cached results of the command 'name', or of every cached
+        command. With 'arg', only the result for that argument string is
+        discarded. Meant for commands changing what cached commands report.
+        """
+        records: Iterable[DispatchRecord] = (self._method_mapping.records() if name is None
+                                             else (self._method_mapping[name],))
+        for record in records:
+            if record.cache is not None:
+                record.cache.invalidate(arg)
+
+    def cache_info(self, name: str) -> "CacheInfo|None":
+        """
+        Return the hits, misses, maximum and current size of the result cache
+        of the command 'name', or None if it is not cached.
+        """
+        record: DispatchRecord = self._method_mapping[name]
+        return record.cache.info() if record.cache is not None else None
+
+    def load_plugin(self, plugin: Any, replace: bool = False) -> list[str]:
+        """
+        Register the commands and helpers found on 'plugin' (a module, class
+        or instance), as declared on a Cmd subclass. Functions are bound to
+        this instance, methods of a plugin instance stay bound to it.
+        Returns the names of the registered commands.
+
+        Nothing is registered if 'plugin' declares invalid helpers, or commands
+        whose names are taken (unless 'replace' is set); ValueError is raised.
+        """
+        table: CommandTable = CommandTable.compile(plugin)
+        if table.error:
+            raise ValueError(table.error)
+        if not replace and (taken := [name for name in table.commands if name in self._method_mapping]):
+            raise ValueError(f"Commands ({', '.join(taken)}) are already registered")
+
+        for name in table.commands:
+            self._helper_mapping.pop(name, None)
+        for mapping, entries in ((self._method_mapping, table.commands), (self._helper_mapping, table.helpers)):
+            for name, entry in entries.items():
+                if entry.attr is None:  # Docstring helper
+                    mapping[name] = entry.bind(self)
+                    continue
+                member: Any = getattr(plugin, entry.attr)
+                bound: Callable[..., Any] = MethodType(member, self) if inspect.isfunction(member) else member
+                mapping[name] = DispatchRecord(bound, entry, self)
+        return list(table.commands)
+
+    def register_lazy_commands(self,
+                               commands: "Iterable[LazyCommand]",
+                               replace: bool = False) -> list[str]:
+        """
+        Register commands whose modules are imported only when they are first
+        run, such as those of `LazyCommand.from_entry_points()`. Their names
+        are available to completion and help listings right away. Without a
+        declared help text, the first "help <name>" imports the command to
+        show its docstring. Returns the registered names.
+
+        Raises ValueError, registering nothing, if a name is taken (unless
+        'replace' is set).
+        """
+        from asiocmd.lazy import LazyEntry
+        commands = list(commands)
+        if not replace and (taken := [command.name for command in commands if command.name in self._method_mapping]):
+            raise ValueError(f"Commands ({', '.join(taken)}) are already registered")
+
+        for command in commands:
+            self._method_mapping.set_entry(command.name, LazyEntry(command.name, command.target))
+            if command.help is not None:
+                self._helper_mapping.set_entry(command.name, CommandEntry(command.name, None, command.help))
+            else:
+                self._helper_mapping.set_entry(command.name, LazyEntry(command.name, command.target, helper=True))
+        return [command.name for command in commands]
+
     def __init__(self,
                  completekey: str ='tab',
                  prompt: str|None = None,
@@ -130,7 +322,9 @@ class Cmd:
                  doc_header: str = "Documented commands (type help <topic>):",
                  misc_header: str = "Miscellaneous help topics:",
                  undoc_header: str = "Undocumented commands:",
-                 auto_register: bool = True):
+                 auto_register: bool = True,
+                 stats: "StatsSink|None" = None,
+                 profiling: bool = False):
         """
         Instantiate a line-oriented interpreter framework.
 
@@ -139,21 +333,29 @@ class Cmd:
         not None and the readline module is available, command completion
         is done automatically. The optional arguments stdin and stdout
         specify alternate input and output file objects; if not specified,
-        sys.stdin and sys.stdout are used.
+        sys.stdin and sys.stdout are used. The output stream is wrapped in an
+        `OutputBuffer`, which writes the output of each command out at once.
+
+        If a 'stats' sink is given, every line run by the command loop or a
+        script is timed and reported to it. With a `CommandStats` sink, the
+        built-in command 'stats' is registered to display the timings.
+        With 'profiling', the built-in command 'profile' is registered to run
+        a single command line under cProfile or tracemalloc.
         """
         
         # User I/O
         self.stdin: TextIO|Any = stdin or sys.stdin
-        self.stdout: TextIO|Any = stdout or sys.stdout
+        self.stdout = stdout or sys.stdout
         
         # Internal buffering
-        self.cmdqueue: list[str] = []
+        self.cmdqueue = deque()
 
         self.completekey: str = completekey
         
         # Strings used by Cmd
         self.prompt: str = f"\n{prompt.strip('\n ')}" if prompt else f"\n{self.__class__.__name__}> "
-        self.identchars: str = string.ascii_letters + string.digits + '_'
+        self.identchars: str = _IDENTCHARS
+        self._identchars_source: str|None = None   # identchars the matcher was compiled for
         self.intro: str = intro or "Asynchronous Command Line Interface"
         self.ruler: str = ruler
         self.doc_header: str = doc_header
@@ -163,11 +365,22 @@ class Cmd:
         # Raw input flag
         self.use_rawinput = use_raw_input
 
-        # Map of Cmd methods decorated by @command and @async_command
-        self._method_mapping: Final[dict[str, CmdMethod]] = {}
-        self._helper_mapping: Final[dict[str, CmdMethod]] = {}
+        # Dispatch records of Cmd methods decorated by @command and @async_command,
+        # bound lazily from the table shared by all instances of the class
+        self._method_mapping: Final[BoundMapping] = BoundMapping(self)
+        self._helper_mapping: Final[BoundMapping] = BoundMapping(self)
+        self._help_cache: tuple[tuple, str] | None = None
         if auto_register:
             self._update_mapping(overwrite=False)
+
+        # Instrumentation
+        self.stats_sink: StatsSink|None = stats
+        if stats is not None:
+            from asiocmd.stats import CommandStats
+            if isinstance(stats, CommandStats):
+                self._register_builtin("stats", self._stats_command)
+        if profiling:
+            self._register_builtin("profile", self._profile_command)
     
     def cmdloop(self):
         """
@@ -176,18 +389,7 @@ class Cmd:
         the remainder of the line as argument.
         """
         self.preloop()
-        if self.use_rawinput and self.completekey:
-            self.old_completer = readline.get_completer()
-            readline.set_completer(self.complete)
-            if readline.backend == "editline":
-                if self.completekey == 'tab':
-                    # libedit uses "^I" instead of "tab"
-                    command_string = "bind ^I rl_complete"
-                else:
-                    command_string = f"bind {self.completekey} rl_complete"
-            else:
-                command_string = f"{self.completekey}: complete"
-            readline.parse_and_bind(command_string)
+        self._install_completer()
         
         if self.intro:
             self.stdout.write(self.intro)
@@ -195,7 +397,7 @@ class Cmd:
         stop = None
         while not stop:
             if self.cmdqueue:
-                line = self.cmdqueue.pop(0)
+                line = self.cmdqueue.popleft()
             else:
                 if self.use_rawinput:
                     try:
@@ -210,13 +412,132 @@ class Cmd:
                         line = 'EOF'
                     else:
                         line = line.rstrip('\r\n')
-            line = self.precmd(line)
-            stop = self.onecmd(line)
-            stop = self.postcmd(stop, line)
+            with self.stdout:
+                _, stop = self._execute(line)
         self.postloop()
-        if self.use_rawinput and self.completekey:
+        self._restore_completer()
+
+    def _install_completer(self) -> None:
+        # Load readline for line editing of input(), and bind the completion key
+        if not self.use_rawinput or (readline := _import_readline()) is None:
+            return
+        if self.completekey:
+            self.old_completer = readline.get_completer()
+            readline.set_completer(self.complete)
+            if getattr(readline, "backend", "readline") == "editline":
+                if self.completekey == 'tab':
+                    # libedit uses "^I" instead of "tab"
+                    command_string = "bind ^I rl_complete"
+                else:
+                    command_string = f"bind {self.completekey} rl_complete"
+            else:
+                command_string = f"{self.completekey}: complete"
+            readline.parse_and_bind(command_string)
+
+    def _restore_completer(self) -> None:
+        if self.use_rawinput and self.completekey and (readline := _import_readline()) is not None:
             readline.set_completer(self.old_completer)
 
+    def run_script(self,
+                   lines: Iterable[str],
+                   stop_on_error: bool = True) -> "list[CommandResult]":
+        """
+        Execute every line of 'lines' (a file, generator, list, ...) through
+        precmd(), onecmd() and postcmd(), without prompts, intro or readline.
+
+        Blank lines are skipped. Execution ends early when postcmd() returns a
+        true value, or when a command raises and 'stop_on_error' is set;
+        otherwise the exception is recorded and the next line is run.
+        Returns one `CommandResult` per executed line.
+        """
+        from asiocmd.script import CommandResult
+        results: list[CommandResult] = []
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+
+            start: float = time.perf_counter()
+            try:
+                with self.stdout:
+                    result, stop = self._execute(line)
+            except Exception as exc:
+                results.append(CommandResult(line, None, exc, time.perf_counter() - start))
+                if stop_on_error:
+                    break
+                continue
+
+            results.append(CommandResult(line, result, None, time.perf_counter() - start))
+            if stop:
+                break
+        return results
+
+    def _execute(self, line: str) -> tuple[Any, Any]:
+        # Run 'line' through precmd(), onecmd() and postcmd(),
+        # returning the result of onecmd() and the stop flag
+        if self.stats_sink is None:
+            line = self.precmd(line)
+            result = self.onecmd(line)
+            return result, self.postcmd(result, line)
+
+        start: float = time.perf_counter()
+        line = self.precmd(line)
+        dispatched: float = time.perf_counter()
+        try:
+            result = self.onecmd(line)
+        except BaseException:
+            self._record_stats(line, time.perf_counter() - dispatched, dispatched - start, True)
+            raise
+        finished: float = time.perf_counter()
+        stop = self.postcmd(result, line)
+        self._record_stats(line, finished - dispatched, dispatched - start + time.perf_counter() - finished, False)
+        return result, stop
+
+    def _record_stats(self, line: str, elapsed: float, hook_time: float, failed: bool) -> None:
+        assert self.stats_sink is not None
+        cmd: str|None = self.parseline(line)[0]
+        self.stats_sink.record(cmd if cmd in self._method_mapping else "<default>", elapsed, hook_time, failed)
+
+    def _stats_command(self, arg: str) -> None:
+        """
+        Show per-command latencies with "stats", or clear them with "stats reset".
+        """
+        from asiocmd.stats import CommandStats
+        assert isinstance(self.stats_sink, CommandStats)
+        if arg.strip() == "reset":
+            self.stats_sink.reset()
+            return
+        self.stdout.write(self.stats_sink.report())
+
+    def _profile_command(self, arg: str):
+        """
+        Profile a command: "profile [-m] [-n TOP] [-o FILE] <command line>".
+        -m traces memory allocations instead of function calls, -n sets the
+        number of entries shown and -o saves the raw profile to FILE.
+        """
+        from asiocmd.profiling import CommandProfile    # Loads cProfile and pstats
+        try:
+            profile: CommandProfile = CommandProfile.from_arg(arg)
+        except ValueError as exc:
+            self.stdout.write(f"{exc}\n{CommandProfile.USAGE}")
+            return
+        with profile:
+            result = self.onecmd(profile.line)
+        self.stdout.write(profile.report())
+        return result
+
+    def enqueue(self, line: str) -> None:
+        """
+        Queue 'line' to be executed by the command loop before further input is read.
+        """
+        self.cmdqueue.append(line)
+
+    def enqueue_many(self, lines: Iterable[str]) -> None:
+        """
+        Queue every line in 'lines', in order, like enqueue().
+        """
+        self.cmdqueue.extend(lines)
+
     def precmd(self, line: str):
         """
         Hook method executed just before the command line is
@@ -259,10 +580,26 @@ class Cmd:
             else:
                 return None, None, line
 
-        for i in range(len(line)):
-            if line[i] not in self.identchars:
-                return line[:i].strip(), line[i:].strip(), line
-        return line, "", line
+        # The compiled matcher is refreshed whenever identchars is reassigned
+        if self.identchars is not self._identchars_source:
+            self._identchars_source = self.identchars
+            self._identchars_match = identchars_pattern(self.identchars).match
+
+        end: int = self._identchars_match(line).end()
+        if end == len(line):
+            return line, "", line
+        return line[:end].strip(), line[end:].strip(), line
+
+    def parseargv(self, line: str) -> tuple[str|None, tuple[str, ...]|None, str]:
+        """
+        Like parseline(), but with the arguments split into a tuple of
+        shell-like words. Splits are cached for each distinct argument string.
+        Raises ValueError if the arguments contain unbalanced quotes.
+        """
+        cmd, arg, line = self.parseline(line)
+        if arg is None:
+            return cmd, None, line
+        return cmd, split_argv(arg), line
     
     def onecmd(self, line: str):
         """
@@ -284,11 +621,82 @@ class Cmd:
             self.lastcmd = ''
         if cmd == '':
             return self.default(line)
-        else:
-            method: CmdMethod|None = self._method_mapping.get(cmd)
-            if not method:
+        try:
+            if '|' in arg and (stages := self._pipeline(line)) is not None:
+                return self._run_pipeline(stages)
+            record: DispatchRecord|None = self._method_mapping.get(cmd)
+            if record is None:
                 return self.default(line)
-            return method(arg)
+            if record.pipe:
+                return self._run_pipeline([(record, arg)])
+            if record.is_generator:
+                return self._stream(record.bound, arg)
+            return record.bound(arg)
+        except ArgumentError as error:
+            return self.argerror(line, error)
+
+    def _pipeline(self, line: str) -> list[tuple[DispatchRecord, str]]|None:
+        """
+        Return the dispatch records and arguments of the stages of the
+        pipeline 'line' ("cmd1 args | cmd2 args | ..."), or None if 'line' is
+        not a pipeline: every stage after the first must be a registered
+        command declared with pipe=True, otherwise '|' is part of the arguments.
+        """
+        parts: tuple[str, ...] = split_pipeline(line)
+        if len(parts) < 2:
+            return None
+        stages: list[tuple[DispatchRecord, str]] = []
+        for part in parts:
+            cmd, arg, _ = self.parseline(part)
+            record: DispatchRecord|None = self._method_mapping.get(cmd) if cmd else None
+            if record is None or (stages and not record.pipe):
+                return None
+            stages.append((record, arg or ""))
+        return stages
+
+    def _pipeline_error(self, stages: list[tuple[DispatchRecord, str]]) -> str|None:
+        # Every stage feeding another one must produce chunks
+        for record, _ in stages[:-1]:
+            if not record.is_generator:
+                return f"Cannot pipe the output of {record.entry.name}: not a generator command\n"
+        return None
+
+    def _run_pipeline(self, stages: list[tuple[DispatchRecord, str]]):
+        # Chain the generators of the stages lazily: each pipe stage iterates
+        # the chunks of the previous one, and the last stage's chunks are written
+        if error := self._pipeline_error(stages):
+            self.stdout.write(error)
+            return None
+        generators: list[Iterator[Any]] = []
+        upstream: Iterator[Any] = iter(())
+        try:
+            for record, arg in stages[:-1]:
+                upstream = record.bound(arg, upstream) if record.pipe else record.bound(arg)
+                generators.append(upstream)
+            record, arg = stages[-1]
+            if record.is_generator:
+                return self._stream(record.bound, arg, upstream)
+            return record.bound(arg, upstream)
+        finally:
+            for generator in generators:
+                generator.close()
+
+    def _stream(self, method: CmdMethod, *args: Any):
+        # Write every chunk yielded by a generator command as soon as it is
+        # produced, returning the generator's return value
+        generator = method(*args)
+        if not inspect.isgenerator(generator):
+            raise TypeError(f"{self.__class__.__name__} cannot run asynchronous generator commands")
+        try:
+            while True:
+                try:
+                    chunk = next(generator)
+                except StopIteration as exhausted:
+                    return exhausted.value
+                self.stdout.write(chunk if isinstance(chunk, str) else str(chunk))
+                self.stdout.flush()
+        finally:
+            generator.close()
 
     def emptyline(self):
         """
@@ -309,6 +717,16 @@ class Cmd:
         """
         self.stdout.write(f"Unknown syntax: {line}\n")
 
+    def argerror(self, line: str, error: ArgumentError):
+        """Called when the arguments of a command declared with typed=True
+        do not match its signature.
+
+        If this method is not overridden, it prints the error and the usage
+        of the command, and returns.
+
+        """
+        self.stdout.write(f"{error}\n{error.usage}")
+
     def completedefault(self, *ignored):
         """Method called to complete an input line when no command-specific
         complete_*() method is available.
@@ -319,7 +737,7 @@ class Cmd:
         return []
 
     def completenames(self, text, *ignored):
-        return [command for command in self._method_mapping.keys() if command.startswith(text)]
+        return self._method_mapping.names_with_prefix(text)
 
     def complete(self, text, state):
         """
@@ -330,6 +748,8 @@ class Cmd:
         """
         if state == 0:
             compfunc = self.completenames
+            readline = _import_readline()
+            assert readline is not None    # Only called by readline
 
             origline = readline.get_line_buffer()
             line = origline.lstrip()
@@ -347,38 +767,63 @@ class Cmd:
             return None
 
     def complete_help(self, *args):
-        commands = set(self.completenames(*args))
-        topics: set[str] = set(helper for helper in self._helper_mapping
-                               if helper.startswith(args[0]))
-        return list(commands | topics)
+        # Both match lists are sorted, so merging them keeps the result sorted
+        import heapq
+        return list(dict.fromkeys(heapq.merge(self.completenames(*args),
+                                              self._helper_mapping.names_with_prefix(args[0]))))
 
     def do_help(self, arg: str) -> None:
         """
         List available commands with "help" or detailed help with "help cmd".
         """
         if arg:
-            help_method: CmdMethod|None = self._helper_mapping.get(arg.strip())
-            if not help_method:
+            helper: DispatchRecord|None = self._helper_mapping.get(arg.strip())
+            if helper is None:
                 self.stdout.write(f"No help available for: {arg}")
                 return
             
-            help_method()
+            helper.bound()
             return
         
         # Display help (if available) for all registered commands
-        self.print_topics(self.doc_header, list(self._helper_mapping.keys()), 80)
-        self.stdout.write("\n")
-        self.print_topics(self.undoc_header, list(self._method_mapping.keys() - self._helper_mapping.keys()), 80)
+        self.stdout.write(self._help_listing())
+
+    def _help_width(self) -> int:
+        try:
+            return os.get_terminal_size(self.stdout.fileno()).columns
+        except (AttributeError, OSError, ValueError):
+            return 80
+
+    def _help_listing(self) -> str:
+        """
+        Return the rendered topic listing of "help", for the current width of
+        the output terminal. Renders are cached until the registered commands,
+        helpers or headers change.
+        """
+        width: int = self._help_width()
+        key: tuple = (width, self._method_mapping.version, self._helper_mapping.version,
+                      self.doc_header, self.undoc_header, self.ruler)
+        if self._help_cache is not None and self._help_cache[0] == key:
+            return self._help_cache[1]
+
+        documented: list[str] = sorted(self._helper_mapping)
+        undocumented: list[str] = sorted(self._method_mapping.keys() - self._helper_mapping.keys())
+        listing: str = (self._format_topics(self.doc_header, documented, width)
+                        + "\n"
+                        + self._format_topics(self.undoc_header, undocumented, width))
+        self._help_cache = (key, listing)
+        return listing
+
+    def _format_topics(self, header: str, cmds: Sequence[str], maxcol: int) -> str:
+        if not cmds:
+            return ""
+        from asiocmd.layout import columnize
+        ruler: str = f"{self.ruler * len(header)}\n" if self.ruler else ""
+        return f"{header}\n{ruler}{columnize(cmds, maxcol-1)}\n"
 
     def print_topics(self, header: str, cmds: Sequence[str], maxcol):
         if cmds:
-            self.stdout.write(header)
-            self.stdout.write("\n")
-            if self.ruler:
-                self.stdout.write(self.ruler * len(header))
-                self.stdout.write("\n")
-            self.columnize(cmds, maxcol-1)
-            self.stdout.write("\n")
+            self.stdout.write(self._format_topics(header, cmds, maxcol))
 
     def columnize(self, string_list: Sequence[str], displaywidth: int = 80):
         """
@@ -387,54 +832,9 @@ class Cmd:
         Each column is only as wide as necessary.
         Columns are separated by two spaces (one was not legible enough).
         """
-        if not string_list:
-            self.stdout.write("<empty>\n")
-            return
-
         nonstrings: list[Any] = [i for i in string_list if not isinstance(i, str)]
         if nonstrings:
             raise TypeError(f"Objects provided in argument 'string_list' not strings: {','.join(str(i) for i in nonstrings)}")
         
-        size: int = len(string_list)
-        if size == 1:
-            self.stdout.write(f"{string_list[0]}")
-            return
-        
-        # Try every row count from 1 upwards
-        for nrows in range(1, len(string_list)):
-            ncols = (size+nrows-1) // nrows
-            colwidths = []
-            totwidth = -2
-            for col in range(ncols):
-                colwidth = 0
-                for row in range(nrows):
-                    i = row + nrows*col
-                    if i >= size:
-                        break
-                    x = string_list[i]
-                    colwidth = max(colwidth, len(x))
-                colwidths.append(colwidth)
-                totwidth += colwidth + 2
-                if totwidth > displaywidth:
-                    break
-            if totwidth <= displaywidth:
-                break
-        else:
-            nrows = size
-            ncols = 1
-            colwidths = [0]
-        
-        for row in range(nrows):
-            texts = []
-            for col in range(ncols):
-                i = row + nrows*col
-                if i >= size:
-                    x = ""
-                else:
-                    x = string_list[i]
-                texts.append(x)
-            while texts and not texts[-1]:
-                del texts[-1]
-            for col in range(len(texts)):
-                texts[col] = texts[col].ljust(colwidths[col])
-            self.stdout.write(" ".join(texts))
+        from asiocmd.layout import columnize
+        self.stdout.write(columnize(string_list, displaywidth))
@@ -1,53 +1,99 @@
-from functools import wraps
-from typing import Any, Callable, Coroutine, Final
+"""Decorators registering methods as commands and command helpers.
 
-__all__ = ("COMMAND_ATTR", 'HELPER_ATTR',
+The decorators only tag the decorated function with the name it is registered
+under and return it unchanged, so calling a command costs no extra frame or
+coroutine. A function that is already registered is copied before being tagged
+again, so that its earlier registration is not renamed. Registration discovers
+the tags through `__wrapped__` chains, which keeps stacking with other
+`functools.wraps` decorators working.
+"""
+
+from types import FunctionType
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Final
+
+if TYPE_CHECKING:
+    from asiocmd.batching import BatchPolicy
+    from asiocmd.cache import CachePolicy
+
+__all__ = ("COMMAND_ATTR", 'HELPER_ATTR', "BACKGROUND_ATTR", "BLOCKING_ATTR", "PROCESS_ATTR", "TIMEOUT_ATTR", "PIPE_ATTR", "TYPED_ATTR", "CACHE_ATTR", "BATCH_ATTR",
            "command", "async_command",
            "command_helper", "async_command_helper")
 
 COMMAND_ATTR: Final[str] = "__commandname__"
 HELPER_ATTR: Final[str] = "__helpdata__"
+BACKGROUND_ATTR: Final[str] = "__cmdbackground__"
+BLOCKING_ATTR: Final[str] = "__cmdblocking__"
+PROCESS_ATTR: Final[str] = "__cmdprocess__"
+TIMEOUT_ATTR: Final[str] = "__cmdtimeout__"
+PIPE_ATTR: Final[str] = "__cmdpipe__"
+TYPED_ATTR: Final[str] = "__cmdtyped__"
+CACHE_ATTR: Final[str] = "__cmdcache__"
+BATCH_ATTR: Final[str] = "__cmdbatch__"
 
-def command(arg: str | Callable[..., Any] | None = None):
-    def outer_decorated(method):
-        @wraps(method)
-        def inner_decorated(*args, **kwargs):
-            return method(*args, **kwargs)
-        
-        setattr(inner_decorated, COMMAND_ATTR, arg if isinstance(arg, str) else method.__name__)
-        return inner_decorated
-    
-    return outer_decorated(arg) if callable(arg) else outer_decorated
+_TAGS: Final[tuple[str, ...]] = (COMMAND_ATTR, HELPER_ATTR, BACKGROUND_ATTR, BLOCKING_ATTR, PROCESS_ATTR, TIMEOUT_ATTR, PIPE_ATTR,
+                                  TYPED_ATTR, CACHE_ATTR, BATCH_ATTR)
+
+def _untagged_copy(method: FunctionType) -> FunctionType:
+    # A copy of an already registered function, so that registering it again
+    # (such as under another name in a subclass) leaves the original alone
+    copy = FunctionType(method.__code__, method.__globals__, method.__name__, method.__defaults__, method.__closure__)
+    copy.__kwdefaults__ = method.__kwdefaults__
+    copy.__qualname__ = method.__qualname__
+    copy.__doc__ = method.__doc__
+    copy.__module__ = method.__module__
+    copy.__annotations__ = method.__annotations__
+    copy.__dict__.update((attr, value) for attr, value in vars(method).items() if attr not in _TAGS)
+    return copy
 
-def async_command(arg: str | Callable[..., Coroutine[Any, Any, Any]] | None = None):
+def _tag(arg: str | Callable[..., Any] | None, attr: str, **flags: Any):
     def outer_decorated(method):
-        @wraps(method)
-        async def inner_decorated(*args, **kwargs):
-            return await method(*args, **kwargs)
-        
-        setattr(inner_decorated, COMMAND_ATTR, arg if isinstance(arg, str) else method.__name__)
-        return inner_decorated
+        if isinstance(method, staticmethod):    # Tag the function, found through the class
+            return staticmethod(outer_decorated(method.__func__))
+        if isinstance(method, FunctionType) and (COMMAND_ATTR in vars(method) or HELPER_ATTR in vars(method)):
+            method = _untagged_copy(method)
+        setattr(method, attr, arg if isinstance(arg, str) else method.__name__)
+        for flag_attr, value in flags.items():
+            setattr(method, flag_attr, value)
+        return method
     
     return outer_decorated(arg) if callable(arg) else outer_decorated
 
+def command(arg: str | Callable[..., Any] | None = None,
+            *,
+            blocking: bool = False,
+            process: bool = False,
+            timeout: float | None = None,
+            pipe: bool = False,
+            typed: bool = False,
+            cache: "bool | CachePolicy" = False):
+    # blocking: Run the command in a worker thread when dispatched by AsyncCmd
+    # process: Run the command, a static method returning the text to write, in a worker process when dispatched by AsyncCmd
+    # timeout: Seconds AsyncCmd waits for a blocking command before giving up on it
+    # pipe: The command takes the output of the previous pipeline stage as a third argument
+    # typed: The command receives arguments parsed and converted according to its signature
+    # cache: Memoize results and output per argument string, with the default or given CachePolicy
+    return _tag(arg, COMMAND_ATTR, **{BLOCKING_ATTR: blocking, PROCESS_ATTR: process, TIMEOUT_ATTR: timeout, PIPE_ATTR: pipe,
+                                      TYPED_ATTR: typed, CACHE_ATTR: cache})
+
+def async_command(arg: str | Callable[..., Coroutine[Any, Any, Any]] | None = None,
+                  *,
+                  background: bool = False,
+                  timeout: float | None = None,
+                  pipe: bool = False,
+                  typed: bool = False,
+                  cache: "bool | CachePolicy" = False,
+                  batch: "bool | BatchPolicy" = False):
+    # background: Schedule the command as a job when AsyncCmd runs in concurrent mode
+    # timeout: Seconds after which the command is cancelled
+    # pipe: The command takes the output of the previous pipeline stage as a third argument
+    # typed: The command receives arguments parsed and converted according to its signature
+    # cache: Memoize results and output per argument string, sharing concurrent runs with the same arguments
+    # batch: The command handles the arguments of invocations collected with the default or given BatchPolicy
+    return _tag(arg, COMMAND_ATTR, **{BACKGROUND_ATTR: background, TIMEOUT_ATTR: timeout, PIPE_ATTR: pipe, TYPED_ATTR: typed,
+                                      CACHE_ATTR: cache, BATCH_ATTR: batch})
+
 def command_helper(arg: str | Callable[..., Any]  | None = None):
-    def outer_decorated(method):
-        @wraps(method)
-        def inner_decorated(*args, **kwargs):
-            return method(*args, **kwargs)
-        
-        setattr(inner_decorated, HELPER_ATTR, arg if isinstance(arg, str) else method.__name__)
-        return inner_decorated
-    
-    return outer_decorated(arg) if callable(arg) else outer_decorated
+    return _tag(arg, HELPER_ATTR)
 
 def async_command_helper(arg: str | Callable[..., Coroutine[Any, Any, Any]] | None = None):
-    def outer_decorated(method):
-        @wraps(method)
-        async def inner_decorated(*args, **kwargs):
-            return await method(*args, **kwargs)
-        
-        setattr(inner_decorated, HELPER_ATTR, arg if isinstance(arg, str) else method.__name__)
-        return inner_decorated
-    
-    return outer_decorated(arg) if callable(arg) else outer_decorated
\ No newline at end of file
+    return _tag(arg, HELPER_ATTR)
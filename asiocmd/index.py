@@ -0,0 +1,47 @@
+"""Sorted-array prefix index over command names, used for completion."""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable
+
+__all__ = ("PrefixIndex",)
+
+# Upper bound for names sharing a prefix: prefix + _MAX_CHAR sorts after all of them
+_MAX_CHAR: str = "\U0010ffff"
+
+class PrefixIndex:
+    """
+    Sorted array of unique names, supporting incremental updates and prefix
+    lookups in O(log n + matches).
+    """
+
+    __slots__ = ('_names',)
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: list[str] = sorted(set(names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        i: int = bisect_left(self._names, name)
+        return i < len(self._names) and self._names[i] == name
+
+    def add(self, name: str) -> None:
+        if name not in self:
+            insort(self._names, name)
+
+    def discard(self, name: str) -> None:
+        i: int = bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            del self._names[i]
+
+    def match(self, prefix: str) -> list[str]:
+        """
+        Return the sorted names starting with 'prefix'.
+        """
+        if not prefix:
+            return self._names.copy()
+        lo: int = bisect_left(self._names, prefix)
+        return self._names[lo:bisect_right(self._names, prefix + _MAX_CHAR, lo)]
@@ -0,0 +1,105 @@
+"""Bounded pool of background command jobs, used by `AsyncCmd` in concurrent mode."""
+
+import asyncio
+from typing import Any, Coroutine, Iterable
+
+__all__ = ("Job", "JobPool")
+
+class Job:
+    """
+    A command line scheduled in the background, wrapping its `asyncio.Task`.
+    """
+
+    __slots__ = ('id', 'line', 'task')
+
+    def __init__(self, id: int, line: str, task: asyncio.Task):
+        self.id = id
+        self.line = line
+        self.task = task
+
+    @property
+    def state(self) -> str:
+        if not self.task.done():
+            return "running"
+        if self.task.cancelled():
+            return "cancelled"
+        if self.task.exception() is not None:
+            return "failed"
+        return "done"
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} [{self.id}] {self.state}: {self.line!r}>"
+
+class JobPool:
+    """
+    Run coroutines as tasks, with at most 'max_jobs' of them executing at once.
+
+    Jobs beyond the limit are scheduled immediately but wait on a semaphore
+    before starting. Finished jobs are forgotten.
+    """
+
+    __slots__ = ('max_jobs', '_semaphore', '_jobs', '_next_id')
+
+    def __init__(self, max_jobs: int):
+        if max_jobs < 1:
+            raise ValueError(f"max_jobs must be a positive integer, got {max_jobs}")
+        self.max_jobs: int = max_jobs
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(max_jobs)
+        self._jobs: dict[int, Job] = {}
+        self._next_id: int = 1
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __iter__(self):
+        return iter(tuple(self._jobs.values()))
+
+    def get(self, id: int) -> Job|None:
+        return self._jobs.get(id)
+
+    async def _run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        async with self._semaphore:
+            return await coro
+
+    def _finalize(self, job_id: int, coro: Coroutine[Any, Any, Any]) -> None:
+        self._jobs.pop(job_id, None)
+        coro.close()    # No-op once awaited, silences warnings for jobs cancelled before starting
+
+    def spawn(self, line: str, coro: Coroutine[Any, Any, Any]) -> Job:
+        """
+        Schedule 'coro' as a background job for the command 'line'.
+        """
+        job_id: int = self._next_id
+        self._next_id += 1
+
+        task: asyncio.Task = asyncio.ensure_future(self._run(coro))
+        job: Job = Job(job_id, line, task)
+        self._jobs[job_id] = job
+        task.add_done_callback(lambda _: self._finalize(job_id, coro))
+        return job
+
+    async def wait(self, ids: Iterable[int]|None = None) -> list[Job]:
+        """
+        Wait for the given jobs (all jobs if None) to finish, and return them.
+        Failures and cancellations are not propagated.
+        """
+        jobs: list[Job] = list(self._jobs.values()) if ids is None else [job for id in ids if (job := self._jobs.get(id))]
+        if jobs:
+            await asyncio.wait([job.task for job in jobs])
+        return jobs
+
+    def cancel(self, ids: Iterable[int]|None = None) -> list[Job]:
+        """
+        Request cancellation of the given jobs (all jobs if None), and return them.
+        """
+        jobs: list[Job] = list(self._jobs.values()) if ids is None else [job for id in ids if (job := self._jobs.get(id))]
+        for job in jobs:
+            job.task.cancel()
+        return jobs
+
+    async def drain(self) -> None:
+        """
+        Wait until every job, including ones spawned while draining, has finished.
+        """
+        while self._jobs:
+            await self.wait()
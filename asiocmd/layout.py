@@ -0,0 +1,62 @@
+"""Text layout helpers for help listings."""
+
+from typing import Sequence
+
+__all__ = ("columnize",)
+
+def columnize(strings: Sequence[str], displaywidth: int = 80) -> str:
+    """
+    Lay out 'strings' as a compact set of columns no wider than 'displaywidth',
+    filled column by column, and return the rendered rows.
+
+    Each column is only as wide as necessary, and columns are separated by two
+    spaces. The smallest row count whose layout fits is used. Row counts that
+    cannot fit even if every string were as short as the shortest one are
+    skipped, and column widths are answered in O(1) from a sparse table of
+    range maxima over the string lengths, built once in O(n log n).
+    """
+    if not strings:
+        return "<empty>\n"
+
+    size: int = len(strings)
+    if size == 1:
+        return f"{strings[0]}\n"
+
+    lengths: list[int] = [len(s) for s in strings]
+    # At most this many columns fit, whatever the layout
+    max_columns: int = max(1, (displaywidth + 2) // (min(lengths) + 2))
+
+    # sparse[k][i] is the longest length among strings[i:i + 2**k]
+    sparse: list[list[int]] = [lengths]
+    span: int = 1
+    while span * 2 <= size:
+        previous: list[int] = sparse[-1]
+        sparse.append(list(map(max, previous[:-span], previous[span:])))
+        span *= 2
+
+    colwidths: list[int] = [0]
+    nrows: int = size
+    for rows in range(max(1, -(-size // max_columns)), size):
+        widths: list[int] = []
+        totwidth: int = -2
+        for start in range(0, size, rows):
+            end: int = min(start + rows, size)
+            k: int = (end - start).bit_length() - 1
+            width: int = max(sparse[k][start], sparse[k][end - (1 << k)])
+            widths.append(width)
+            totwidth += width + 2
+            if totwidth > displaywidth:
+                break
+        else:
+            colwidths, nrows = widths, rows
+            break
+    
+    ncols: int = len(colwidths) if nrows < size else 1
+    rows_text: list[str] = []
+    for row in range(nrows):
+        texts: list[str] = [strings[i] for i in range(row, min(size, row + nrows * ncols), nrows)]
+        if nrows == size:   # Single column, no padding
+            rows_text.append(texts[0])
+            continue
+        rows_text.append("  ".join(text.ljust(colwidths[col]) for col, text in enumerate(texts)).rstrip())
+    return "\n".join(rows_text) + "\n"
@@ -0,0 +1,117 @@
+"""Commands declared by import path and loaded on first use.
+
+A `LazyCommand` names a command, the "module:attribute" path of the function
+implementing it, and optionally its help text. Registering it with
+`Cmd.register_lazy_commands` makes the name available for dispatch,
+completion and help listings right away, while the module is only imported
+when the command is first run (or its help is first shown, if no help text
+was declared).
+
+Lazy commands can be declared in the "asiocmd.commands" entry point group of
+an installed distribution, or in a JSON manifest of the form
+{"name": "module:attribute"} or {"name": {"target": "module:attribute", "help": "..."}}.
+"""
+
+import importlib
+import inspect
+from types import MethodType
+from typing import Any, Callable
+
+from asiocmd.registry import CommandEntry, DispatchRecord
+
+__all__ = ("ENTRY_POINT_GROUP", "LazyCommand", "LazyEntry", "resolve_target")
+
+ENTRY_POINT_GROUP: str = "asiocmd.commands"
+
+def resolve_target(target: str) -> Any:
+    """
+    Import and return the object at 'target', written as "module:attribute"
+    (the attribute may be dotted). Raises ImportError or AttributeError.
+    """
+    module_name, sep, attribute = target.partition(":")
+    if not (sep and module_name and attribute):
+        raise ValueError(f"Invalid import path: {target!r}, expected 'module:attribute'")
+    obj: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+class LazyCommand:
+    """
+    Declaration of a command implemented by the function at 'target'.
+    """
+
+    __slots__ = ('name', 'target', 'help')
+
+    def __init__(self, name: str, target: str, help: str|None = None):
+        self.name = name
+        self.target = target
+        self.help = help
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.name!r} -> {self.target}>"
+
+    @classmethod
+    def from_entry_points(cls, group: str = ENTRY_POINT_GROUP) -> list["LazyCommand"]:
+        """
+        Return the commands declared in the entry point group 'group' of
+        installed distributions, named after their entry points.
+        """
+        from importlib.metadata import entry_points     # Slow to import, only needed here
+        return [cls(entry_point.name, entry_point.value) for entry_point in entry_points(group=group)]
+
+    @classmethod
+    def from_manifest(cls, path: str) -> list["LazyCommand"]:
+        """
+        Return the commands declared in the JSON manifest at 'path'.
+        """
+        import json
+        with open(path) as file:
+            manifest: dict[str, Any] = json.load(file)
+        commands: list[LazyCommand] = []
+        for name, spec in manifest.items():
+            if isinstance(spec, str):
+                commands.append(cls(name, spec))
+            else:
+                commands.append(cls(name, spec["target"], spec.get("help")))
+        return commands
+
+class _UnloadedRecord(DispatchRecord):
+    # Writes why the target of a lazy command could not be imported, whether
+    # the command or its help was asked for. Not kept by the mapping, so the
+    # import is attempted again on the next lookup.
+    __slots__ = ()
+    cacheable = False
+
+    def __init__(self, name: str, message: str, owner: Any):
+        def report(*args: Any) -> None:
+            owner.stdout.write(message)
+        super().__init__(report, CommandEntry(name, None, None, report), owner)
+
+class LazyEntry(CommandEntry):
+    """
+    `CommandEntry` whose function is imported when it is first bound. With
+    'helper', binding yields a helper writing the docstring of the function.
+    If the function cannot be imported, the record writes the error instead.
+    """
+
+    __slots__ = ('target', 'helper')
+
+    def __init__(self, name: str, target: str, helper: bool = False):
+        super().__init__(name, None)
+        object.__setattr__(self, 'target', target)
+        object.__setattr__(self, 'helper', helper)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.name!r} -> {self.target}>"
+
+    def bind(self, owner: Any) -> DispatchRecord:
+        try:
+            function: Any = resolve_target(self.target)
+        except (ImportError, AttributeError) as exc:
+            return _UnloadedRecord(self.name, f"Cannot load command {self.name} from {self.target}: {exc}\n", owner)
+        if self.helper:
+            doc: str = inspect.cleandoc(getattr(function, "__doc__", None) or "") or f"No help available for: {self.name}"
+            return CommandEntry(self.name, None, doc).bind(owner)
+        bound: Callable[..., Any] = MethodType(function, owner) if inspect.isfunction(function) else function
+        return DispatchRecord(bound, CommandEntry(self.name, None, None, bound))
@@ -0,0 +1,144 @@
+"""Buffered output streams used as `Cmd.stdout`.
+
+While a command runs, its writes are collected in memory and handed to the
+underlying stream in a single write() once the command finishes, or whenever
+the buffered text grows past a size threshold. Outside of commands, writes go
+straight through, so output from hooks, prompts and direct method calls
+appears immediately.
+
+capture_output() additionally records what is written from the current
+context (thread or task), which is how cached commands replay their output.
+"""
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, TextIO
+
+if TYPE_CHECKING:
+    from contextvars import ContextVar
+
+__all__ = ("OutputBuffer", "AsyncOutputBuffer", "capture_output")
+
+# Created by the first capture, sparing writes the lookup until then
+_capture: "ContextVar[list[str]|None] | None" = None
+
+@contextmanager
+def capture_output() -> Iterator[list[str]]:
+    """
+    Collect the text written to output buffers from the current context
+    within the block, in addition to writing it. Captures nest: the text is
+    also recorded by enclosing captures.
+    """
+    global _capture
+    if _capture is None:
+        from contextvars import ContextVar
+        _capture = ContextVar("asiocmd_capture", default=None)
+    chunks: list[str] = []
+    parent: list[str]|None = _capture.get()
+    token = _capture.set(chunks)
+    try:
+        yield chunks
+    finally:
+        _capture.reset(token)
+        if parent is not None:
+            parent.extend(chunks)
+
+class OutputBuffer:
+    """
+    Write-coalescing wrapper around a text stream.
+
+    Using the buffer as a context manager defers writes until the outermost
+    block exits. Attributes not defined here (fileno, encoding, getvalue, ...)
+    are looked up on the wrapped stream.
+    """
+
+    __slots__ = ('stream', 'threshold', '_chunks', '_size', '_depth')
+
+    def __init__(self, stream: TextIO|Any, threshold: int = 2**16):
+        self.stream = stream
+        self.threshold = threshold
+        self._chunks: list[str] = []
+        self._size: int = 0
+        self._depth: int = 0
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "stream":    # Not set yet, avoid recursing
+            raise AttributeError(name)
+        return getattr(self.stream, name)
+
+    def __enter__(self) -> "OutputBuffer":
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._depth -= 1
+        if not self._depth:
+            self.flush()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of characters buffered but not yet written to the stream.
+        """
+        return self._size
+
+    def write(self, data: str) -> int:
+        if _capture is not None and (capture := _capture.get()) is not None:
+            capture.append(data)
+        if not self._depth:
+            return self.stream.write(data)
+        self._chunks.append(data)
+        self._size += len(data)
+        if self._size >= self.threshold:
+            self._write_chunks()
+        return len(data)
+
+    def writelines(self, lines: Any) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        """
+        Write out any buffered text and flush the underlying stream.
+        """
+        self._write_chunks()
+        self.stream.flush()
+
+    def _write_chunks(self) -> None:
+        if not self._chunks:
+            return
+        data: str = "".join(self._chunks) if len(self._chunks) > 1 else self._chunks[0]
+        self._chunks.clear()
+        self._size = 0
+        self.stream.write(data)
+
+class AsyncOutputBuffer(OutputBuffer):
+    """
+    `OutputBuffer` with awaitable writes, used by `AsyncCmd`.
+
+    If the underlying stream has a drain() coroutine (such as
+    `asiocmd.server.StreamWriterOutput`), drain() and awrite() wait on it,
+    so producers are slowed down to the pace of the consumer.
+    """
+
+    __slots__ = ()
+
+    async def awrite(self, data: str) -> int:
+        """
+        Write 'data', then wait for the stream to catch up if the buffered
+        text has grown past the threshold.
+        """
+        overflow: bool = not self._depth or self._size + len(data) >= self.threshold
+        written: int = self.write(data)
+        if overflow:
+            await self.drain()
+        return written
+
+    async def drain(self) -> None:
+        """
+        Write out any buffered text, then wait until the underlying stream
+        has accepted it.
+        """
+        self.flush()
+        drain = getattr(self.stream, "drain", None)
+        if drain is not None:
+            await drain()
@@ -0,0 +1,61 @@
+"""Command line tokenizing helpers used by `Cmd.parseline` and `Cmd.parseargv`."""
+
+import re
+from functools import lru_cache
+
+__all__ = ("ArgumentError", "identchars_pattern", "split_argv", "split_pipeline")
+
+class ArgumentError(ValueError):
+    """
+    Raised when an argument string does not match the signature of a typed
+    command. 'usage' is the usage line of the command.
+    """
+
+    def __init__(self, message: str, usage: str):
+        super().__init__(message)
+        self.usage = usage
+
+@lru_cache(maxsize=16)
+def identchars_pattern(identchars: str) -> re.Pattern[str]:
+    """
+    Return a compiled pattern matching the longest run of characters in 'identchars'.
+    """
+    if not identchars:
+        return re.compile("")
+    return re.compile(f"[{re.escape(identchars)}]*")
+
+@lru_cache(maxsize=1024)
+def split_argv(arg: str) -> tuple[str, ...]:
+    """
+    Split an argument string with shell-like syntax, caching the result for
+    each distinct string. Raises ValueError on unbalanced quotes.
+    """
+    import shlex    # Only needed by commands taking shell-like arguments
+    return tuple(shlex.split(arg))
+
+@lru_cache(maxsize=256)
+def split_pipeline(line: str) -> tuple[str, ...]:
+    """
+    Split 'line' into the stripped stages of a pipeline, on every '|' that is
+    not quoted or escaped. A line without such '|' is a single stage. Splits
+    are cached for each distinct line.
+    """
+    stages: list[str] = []
+    start: int = 0
+    quote: str|None = None
+    escaped: bool = False
+    for index, char in enumerate(line):
+        if escaped:
+            escaped = False
+        elif char == "\\" and quote != "'":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "|":
+            stages.append(line[start:index].strip())
+            start = index + 1
+    stages.append(line[start:].strip())
+    return tuple(stages)
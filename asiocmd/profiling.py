@@ -0,0 +1,109 @@
+"""Profiling of single command invocations, used by the built-in 'profile' command.
+
+    profile [-m] [-n TOP] [-o FILE] <command line>
+
+runs the command line under `cProfile` (or `tracemalloc` with -m) and shows
+the TOP most expensive functions (or allocation sites). With -o, the raw
+profile is also written to FILE: a `.pstats` file readable by `pstats`, or a
+`tracemalloc.Snapshot` dump.
+"""
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+
+__all__ = ("CommandProfile",)
+
+class CommandProfile:
+    """
+    Profiling session for one command line, used as a context manager
+    around its execution.
+    """
+
+    __slots__ = ('line', 'memory', 'top', 'dump', '_profiler', '_baseline', '_snapshot', '_started_tracing')
+
+    USAGE: str = "Usage: profile [-m] [-n TOP] [-o FILE] <command line>\n"
+
+    def __init__(self, line: str, memory: bool = False, top: int = 20, dump: str|None = None):
+        self.line = line
+        self.memory = memory
+        self.top = top
+        self.dump = dump
+        self._profiler: cProfile.Profile|None = None
+        self._baseline: tracemalloc.Snapshot|None = None
+        self._snapshot: tracemalloc.Snapshot|None = None
+        self._started_tracing: bool = False
+
+    @classmethod
+    def from_arg(cls, arg: str) -> "CommandProfile":
+        """
+        Build a session from the argument string of the 'profile' command.
+        Raises ValueError on invalid options or a missing command line.
+        """
+        memory, top, dump = False, 20, None
+        rest: str = arg.strip()
+        while rest.startswith("-"):
+            option, _, rest = rest.partition(" ")
+            rest = rest.lstrip()
+            if option == "-m":
+                memory = True
+            elif option in ("-n", "-o"):
+                value, _, rest = rest.partition(" ")
+                rest = rest.lstrip()
+                if not value:
+                    raise ValueError(f"Option {option} requires a value")
+                if option == "-n":
+                    top = int(value)
+                else:
+                    dump = value
+            else:
+                raise ValueError(f"Unknown option: {option}")
+        if not rest:
+            raise ValueError("No command line to profile")
+        return cls(rest, memory, top, dump)
+
+    def __enter__(self) -> "CommandProfile":
+        if self.memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            self._baseline = tracemalloc.take_snapshot()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            if self._started_tracing:
+                tracemalloc.stop()
+        else:
+            assert self._profiler is not None
+            self._profiler.disable()
+
+        if self.dump:
+            if self._snapshot is not None:
+                self._snapshot.dump(self.dump)
+            elif self._profiler is not None:
+                self._profiler.dump_stats(self.dump)
+
+    def report(self) -> str:
+        """
+        Return the top entries of the finished profile as text.
+        """
+        if self.memory:
+            assert self._snapshot is not None and self._baseline is not None
+            ignored = (tracemalloc.Filter(False, tracemalloc.__file__),
+                       tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+            differences = self._snapshot.filter_traces(ignored).compare_to(self._baseline.filter_traces(ignored), "lineno")
+            lines: list[str] = [f"Top {self.top} allocation sites for: {self.line}\n"]
+            lines.extend(f"{difference}\n" for difference in differences[:self.top])
+            return "".join(lines)
+
+        assert self._profiler is not None
+        stream = io.StringIO()
+        stream.write(f"Top {self.top} functions for: {self.line}\n")
+        pstats.Stats(self._profiler, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        return stream.getvalue()
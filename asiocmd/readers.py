@@ -0,0 +1,446 @@
+"""Asynchronous line sources for `AsyncCmd.acmdloop`.
+
+Every reader exposes a single coroutine, `readline(prompt)`, which issues the
+prompt (if applicable) and resolves to the next input line without its line
+terminator, or to None once end of file is reached. None of the readers block
+the event loop while waiting for input.
+
+Input a reader took from stdin without returning it (lines handed back with
+unread(), bytes read ahead from a pipe, or a read still running in a thread
+when the reader is closed) is kept for the next reader of the same stdin.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TextIO
+
+__all__ = ("InputReader", "BlockingInputReader",
+           "ThreadInputReader", "StreamInputReader")
+
+class _Leftover:
+    # Input taken from a stdin and not used by the reader that took it
+    __slots__ = ('lines', 'data', 'read')
+
+    def __init__(self):
+        self.lines: list[str] = []          # Lines handed back, in order
+        self.data: bytes = b""              # Bytes read ahead from a pipe
+        self.read: Future|None = None       # Read running in a daemon thread
+
+_leftovers: weakref.WeakKeyDictionary[Any, _Leftover] = weakref.WeakKeyDictionary()
+
+def _leftover(stdin: Any, create: bool = True) -> _Leftover|None:
+    # The leftover input of 'stdin', or None if there is none or it cannot be tracked
+    try:
+        leftover: _Leftover|None = _leftovers.get(stdin)
+        if leftover is None and create:
+            leftover = _leftovers[stdin] = _Leftover()
+    except TypeError:   # No weak references to 'stdin'
+        return None
+    return leftover
+
+class InputReader:
+    """
+    Base class for line sources consumed by `AsyncCmd.acmdloop`.
+
+    Readers whose readline() never waits set 'immediate', so that the
+    command loop can await them directly. Readers that may be asked for the
+    next line while commands are pending, without disturbing a terminal,
+    set 'lookahead'.
+    """
+
+    __slots__ = ('stdin', 'stdout')
+
+    immediate: bool = False
+    lookahead: bool = False
+
+    def __init__(self, stdin: TextIO|Any, stdout: TextIO|Any):
+        self.stdin = stdin
+        self.stdout = stdout
+
+    async def readline(self, prompt: str) -> str|None:
+        """
+        Issue 'prompt' and return the next line of input, stripped of its
+        line terminator. None is returned on end of file. Readers may raise
+        EOFError to end the command loop once input can no longer arrive.
+        """
+        raise NotImplementedError
+
+    def unread(self, line: str) -> None:
+        """
+        Hand back 'line', read but not used. Lines handed back are returned
+        first, in order, by readline() of this reader or of the next reader
+        of the same stdin.
+        """
+        leftover: _Leftover|None = _leftover(self.stdin)
+        if leftover is not None:
+            leftover.lines.append(line)
+
+    def _take_unread(self) -> str|None:
+        leftover: _Leftover|None = _leftover(self.stdin, create=False)
+        if leftover is None or not leftover.lines:
+            return None
+        return leftover.lines.pop(0)
+
+    def close(self) -> None:
+        """
+        Release any resources held by the reader.
+        """
+        pass
+
+    def _write_prompt(self, prompt: str) -> None:
+        self.stdout.write(prompt)
+        self.stdout.flush()
+
+class BlockingInputReader(InputReader):
+    """
+    Reader for in-memory streams (such as `io.StringIO`), where readline()
+    never waits and a thread hand-off would be pure overhead.
+    """
+
+    __slots__ = ()
+
+    immediate: bool = True
+    lookahead: bool = True
+
+    async def readline(self, prompt: str) -> str|None:
+        if (unread := self._take_unread()) is not None:
+            return unread
+        self._write_prompt(prompt)
+        line: str = self.stdin.readline()
+        if not line:
+            return None
+        return line.rstrip('\r\n')
+
+class ThreadInputReader(InputReader):
+    """
+    Reader that performs each blocking read in a daemon thread.
+
+    When 'use_rawinput' is set, lines are read with the builtin input(), so
+    the readline module (history, line editing and completion through
+    `Cmd.complete`) keeps working for TTYs. Otherwise stdin.readline() is used.
+    Daemon threads are used so that a read left pending when the loop exits
+    does not keep the interpreter alive. Such a read keeps waiting for input,
+    and the next reader of the same stdin returns its line rather than
+    starting another read.
+    """
+
+    __slots__ = ('use_rawinput',)
+
+    def __init__(self, stdin: TextIO|Any, stdout: TextIO|Any, use_rawinput: bool = True):
+        super().__init__(stdin, stdout)
+        self.use_rawinput = use_rawinput
+
+    def _input(self, prompt: str) -> str|None:
+        try:
+            return input(prompt)
+        except EOFError:
+            return None
+
+    def _readline(self) -> str|None:
+        line: str = self.stdin.readline()
+        if not line:
+            return None
+        return line.rstrip('\r\n')
+
+    def _run_in_thread(self, func: Callable[..., str|None], *args: Any) -> Future:
+        # The read of this stdin still running, if any, otherwise a new one
+        leftover: _Leftover|None = _leftover(self.stdin)
+        if leftover is not None and leftover.read is not None:
+            return leftover.read
+        future: Future = Future()
+        future.set_running_or_notify_cancel()   # Cancelling a waiter leaves the read running
+
+        def runner() -> None:
+            try:
+                result: str|None = func(*args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+        if leftover is not None:
+            leftover.read = future
+        threading.Thread(target=runner, name="asiocmd-input", daemon=True).start()
+        return future
+
+    async def _read_in_thread(self, func: Callable[..., str|None], *args: Any) -> str|None:
+        future: Future = self._run_in_thread(func, *args)
+        try:
+            line: str|None = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            raise   # The read, done or not, is left for the next readline()
+        except BaseException:
+            self._forget(future)
+            raise
+        self._forget(future)
+        return line
+
+    def _forget(self, future: Future) -> None:
+        leftover: _Leftover|None = _leftover(self.stdin, create=False)
+        if leftover is not None and leftover.read is future:
+            leftover.read = None
+
+    async def readline(self, prompt: str) -> str|None:
+        if (unread := self._take_unread()) is not None:
+            return unread
+        if self.use_rawinput:
+            return await self._read_in_thread(self._input, prompt)
+        self._write_prompt(prompt)
+        return await self._read_in_thread(self._readline)
+
+class _PipeBuffer(asyncio.Protocol):
+    """
+    Bytes read from a pipe and not yet consumed. Reading is paused while more
+    than 'limit' bytes are buffered, or while the buffer is held.
+    """
+
+    __slots__ = ('data', 'eof', 'limit', 'held', 'transport', '_reading', '_waiter')
+
+    def __init__(self, limit: int):
+        self.data: bytearray = bytearray()
+        self.eof: bool = False
+        self.limit: int = limit
+        self.held: bool = False
+        self.transport: asyncio.ReadTransport|None = None
+        self._reading: bool = True
+        self._waiter: asyncio.Future|None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport   # type: ignore[assignment]
+
+    def data_received(self, data: bytes) -> None:
+        self.data += data
+        self.update_reading()
+        self.wake()
+
+    def eof_received(self) -> None:
+        self.eof = True
+        self.wake()
+
+    def connection_lost(self, exc: Exception|None) -> None:
+        self.eof = True
+        self.wake()
+
+    def wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def update_reading(self) -> None:
+        reading: bool = not self.held and len(self.data) <= self.limit
+        if reading == self._reading or self.transport is None or self.transport.is_closing():
+            return
+        self._reading = reading
+        if reading:
+            self.transport.resume_reading()
+        else:
+            self.transport.pause_reading()
+
+    def take_line(self) -> bytes|None:
+        """
+        Remove and return the next complete line, or the remaining bytes
+        once end of file was reached. None if no line is complete yet.
+        """
+        end: int = self.data.find(b"\n")
+        if end < 0:
+            if not self.eof:
+                return None
+            end = len(self.data)
+        else:
+            end += 1
+        line: bytes = bytes(self.data[:end])
+        del self.data[:end]
+        if not self._reading:
+            self.update_reading()
+        return line
+
+    async def readline(self) -> bytes:
+        while (line := self.take_line()) is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return line
+
+class _PausedInput(io.TextIOBase):
+    """
+    Stand-in for stdin while a `StreamInputReader` is paused. Lines already
+    read from the pipe are handed back first, then the pipe is read directly,
+    one byte at a time so that nothing past the returned line is consumed.
+    """
+
+    def __init__(self, buffer: _PipeBuffer, fd: int, encoding: str, errors: str):
+        super().__init__()
+        self._buffer = buffer
+        self._fd = fd
+        self._encoding = encoding
+        self._errors = errors
+        self._blocking: bool = False    # Descriptor switched to blocking mode
+
+    @property
+    def encoding(self) -> str:     # type: ignore[override]
+        return self._encoding
+
+    @property
+    def errors(self) -> str:       # type: ignore[override]
+        return self._errors
+
+    def readable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def readline(self, size: int|None = -1) -> str:    # type: ignore[override]
+        line: bytes|None = self._buffer.take_line()
+        if line is None:
+            chunks: list[bytes] = [bytes(self._buffer.data)]
+            self._buffer.data.clear()
+            if not self._blocking:
+                os.set_blocking(self._fd, True)
+                self._blocking = True
+            while True:
+                byte: bytes = os.read(self._fd, 1)
+                if not byte:
+                    self._buffer.eof = True
+                    break
+                chunks.append(byte)
+                if byte == b"\n":
+                    break
+            line = b"".join(chunks)
+        text: str = line.decode(self._encoding, self._errors)
+        if size is not None and 0 <= size < len(text):
+            # Hand the rest back for the next read
+            self._buffer.data[0:0] = text[size:].encode(self._encoding, self._errors)
+            text = text[:size]
+        return text
+
+    def read(self, size: int|None = -1) -> str:
+        chunks: list[str] = []
+        remaining: int = -1 if size is None else size
+        while remaining:
+            chunk: str = self.readline(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if remaining > 0:
+                remaining -= len(chunk)
+        return "".join(chunks)
+
+    def release(self) -> None:
+        if self._blocking:
+            os.set_blocking(self._fd, False)
+            self._blocking = False
+
+class StreamInputReader(InputReader):
+    """
+    Reader backed by an `asyncio.StreamReader`.
+
+    If no StreamReader is given, a duplicate of stdin's file descriptor is
+    read through `loop.connect_read_pipe` from first use. This requires stdin
+    to be a pipe, socket or character device, and puts it in non-blocking
+    mode, with input read ahead of the commands: use paused() to let a
+    command read stdin itself.
+    With 'end_on_eof', reads after end of file has been reported once raise
+    EOFError, ending the command loop.
+    """
+
+    __slots__ = ('_reader', '_transport', '_fd', '_eof', 'end_on_eof', 'encoding', 'errors')
+
+    lookahead: bool = True
+
+    def __init__(self,
+                 stdin: TextIO|Any,
+                 stdout: TextIO|Any,
+                 reader: asyncio.StreamReader|None = None,
+                 encoding: str|None = None,
+                 errors: str|None = None,
+                 end_on_eof: bool = False):
+        super().__init__(stdin, stdout)
+        self._reader: asyncio.StreamReader|_PipeBuffer|None = reader
+        self._transport: asyncio.ReadTransport|None = None
+        self._fd: int|None = None
+        self._eof: bool = False
+        self.end_on_eof: bool = end_on_eof
+        self.encoding: str = encoding or getattr(stdin, "encoding", None) or "utf-8"
+        self.errors: str = errors or getattr(stdin, "errors", None) or "strict"
+
+    async def _connect(self) -> _PipeBuffer:
+        loop = asyncio.get_running_loop()
+        self._fd = self.stdin.fileno()
+        # The transport closes its pipe object, so it is given a duplicate descriptor
+        pipe = os.fdopen(os.dup(self._fd), "rb", buffering=0)
+        buffer: _PipeBuffer = _PipeBuffer(2**20)
+        if (leftover := _leftover(self.stdin, create=False)) is not None:
+            buffer.data += leftover.data
+            leftover.data = b""
+        self._transport, _ = await loop.connect_read_pipe(lambda: buffer, pipe)
+        return buffer
+
+    @contextmanager
+    def paused(self) -> Iterator[TextIO|None]:
+        """
+        Suspend reading from stdin within the block, yielding a stream that
+        returns the input read ahead so far and then reads stdin directly
+        (in blocking mode). sys.stdin is replaced by that stream if it is the
+        reader's stdin, so that input() works. Yields None, changing nothing,
+        if stdin is not being read from a pipe yet.
+        """
+        buffer = self._reader
+        if not isinstance(buffer, _PipeBuffer) or self._fd is None:
+            yield None
+            return
+        stream: _PausedInput = _PausedInput(buffer, self._fd, self.encoding, self.errors)
+        replaced: bool = sys.stdin is self.stdin
+        if replaced:
+            sys.stdin = stream  # type: ignore[assignment]
+        buffer.held = True
+        buffer.update_reading()
+        try:
+            yield stream    # type: ignore[misc]
+        finally:
+            if replaced:
+                sys.stdin = self.stdin
+            stream.release()
+            buffer.held = False
+            buffer.update_reading()
+            buffer.wake()
+
+    async def readline(self, prompt: str) -> str|None:
+        if (unread := self._take_unread()) is not None:
+            return unread
+        if self._eof and self.end_on_eof:
+            raise EOFError
+        self._write_prompt(prompt)
+        if self._reader is None:
+            self._reader = await self._connect()
+
+        try:
+            line: bytes = await self._reader.readline()
+        except ConnectionError:
+            line = b""
+        if not line:
+            self._eof = True
+            return None
+        return line.decode(self.encoding, self.errors).rstrip('\r\n')
+
+    def close(self) -> None:
+        if isinstance(self._reader, _PipeBuffer) and self._reader.data and (leftover := _leftover(self.stdin)) is not None:
+            leftover.data = bytes(self._reader.data) + leftover.data    # Read ahead, for the next reader
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+            self._reader = None
+        if self._fd is not None:
+            # O_NONBLOCK is shared with the duplicated descriptor
+            try:
+                os.set_blocking(self._fd, True)
+            except OSError:
+                pass
+            self._fd = None
@@ -0,0 +1,409 @@
+"""Per-class command registry.
+
+The command and helper tables of a `Cmd` subclass are computed once per class,
+from its members, and shared by every instance. Instances view them through a
+`BoundMapping`, which binds methods to the instance only when they are first
+looked up, and records instance-level changes in an overlay without copying
+the class table.
+"""
+
+import inspect
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Mapping, MutableMapping
+
+from asiocmd.decorators import (BACKGROUND_ATTR, BATCH_ATTR, BLOCKING_ATTR, CACHE_ATTR, COMMAND_ATTR, HELPER_ATTR,
+                                PIPE_ATTR, PROCESS_ATTR, TIMEOUT_ATTR, TYPED_ATTR)
+
+if TYPE_CHECKING:
+    from asiocmd.arguments import SignatureParser
+    from asiocmd.batching import Batcher, BatchPolicy
+    from asiocmd.cache import CachePolicy, ResultCache
+    from asiocmd.index import PrefixIndex
+
+__all__ = ("find_decorator_attr", "CommandEntry", "DispatchRecord", "CommandTable", "BoundMapping")
+
+def find_decorator_attr(func: Any, attr: str):
+    """
+    Return the value of 'attr' on 'func' or the first function it wraps
+    (following `__wrapped__`) that has it, or None.
+    """
+    func = getattr(func, "__func__", func)
+    while func:
+        if hasattr(func, attr):
+            return getattr(func, attr)
+        func = getattr(func, "__wrapped__", None)
+    return None
+
+class CommandEntry:
+    """
+    Immutable description of a command or helper, resolved once at registration.
+
+    'attr' is the name of the method implementing it, and 'function' the
+    innermost function behind that method (with decorators unwrapped). Helpers
+    generated from a command's docstring have no attribute, and write 'doc' instead.
+    Commands declared with typed=True get a 'parser' built from their signature,
+    commands declared with cache= the 'cache' policy of their results, and
+    batch commands their 'batch' policy (and 'batcher', if shared by instances).
+    Commands declared with process=True are static methods, run by 'function'.
+    """
+
+    __slots__ = ('name', 'attr', 'doc', 'function', 'is_async', 'is_generator', 'background', 'blocking', 'process', 'timeout',
+                 'pipe', 'parser', 'cache', 'batch', 'batcher')
+
+    def __init__(self,
+                 name: str,
+                 attr: str|None,
+                 doc: str|None = None,
+                 method: Callable[..., Any]|None = None):
+        function: Callable[..., Any]|None = None
+        if method is not None:
+            function = inspect.unwrap(getattr(method, "__func__", method))
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'attr', attr)
+        object.__setattr__(self, 'doc', doc)
+        object.__setattr__(self, 'function', function)
+        object.__setattr__(self, 'is_async', inspect.iscoroutinefunction(function))
+        object.__setattr__(self, 'is_generator', inspect.isgeneratorfunction(function) or inspect.isasyncgenfunction(function))
+        object.__setattr__(self, 'background', bool(method is not None and find_decorator_attr(method, BACKGROUND_ATTR)))
+        object.__setattr__(self, 'blocking', bool(method is not None and find_decorator_attr(method, BLOCKING_ATTR)))
+        object.__setattr__(self, 'timeout', find_decorator_attr(method, TIMEOUT_ATTR) if method is not None else None)
+        object.__setattr__(self, 'pipe', bool(method is not None and find_decorator_attr(method, PIPE_ATTR)))
+        # Functions returning their output, which a worker process cannot write
+        object.__setattr__(self, 'process', bool(method is not None and find_decorator_attr(method, PROCESS_ATTR)
+                                                 and not (self.is_async or self.is_generator or self.pipe)))
+        # Batch handlers of coroutine functions only, taking a list of argument strings
+        # Their modules are only imported for the commands using them
+        batch: BatchPolicy|bool|None = find_decorator_attr(method, BATCH_ATTR) if self.is_async else None
+        batcher: Batcher|None = None
+        if batch:
+            from asiocmd.batching import Batcher, BatchPolicy
+            if batch is True:
+                batch = BatchPolicy()
+            if batch.shared:
+                batcher = Batcher(batch)
+        object.__setattr__(self, 'batch', batch or None)
+        object.__setattr__(self, 'batcher', batcher)
+        parser: SignatureParser|None = None
+        if function is not None and not self.batch and find_decorator_attr(method, TYPED_ATTR):
+            from asiocmd.arguments import SignatureParser
+            # Methods and functions bound as methods take the instance first
+            parser = SignatureParser(name, function,
+                                     skip=int((inspect.isfunction(method) or inspect.ismethod(method)) and not self.process),
+                                     skip_last=int(self.pipe))
+        object.__setattr__(self, 'parser', parser)
+        cache: CachePolicy|bool|None = find_decorator_attr(method, CACHE_ATTR) if method is not None else None
+        if cache is True:
+            from asiocmd.cache import CachePolicy
+            cache = CachePolicy()
+        # Streamed output cannot be replayed
+        object.__setattr__(self, 'cache', cache if cache and not (self.is_generator or self.pipe or self.process) else None)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.name!r} -> {self.attr or 'docstring'}>"
+
+    def bind(self, owner: Any) -> "DispatchRecord":
+        """
+        Return the dispatch record of this entry for the instance 'owner'.
+        """
+        if self.attr is not None:
+            return DispatchRecord(getattr(owner, self.attr), self, owner)
+        doc: str|None = self.doc
+        return DispatchRecord(lambda: owner.stdout.write(doc), self)
+
+class DispatchRecord:
+    """
+    A command or helper bound to an instance, with everything needed to call it.
+
+    'bound' is the callable to invoke, 'is_async' whether its result must be
+    awaited, 'is_generator' whether it is a (possibly asynchronous) generator
+    streaming its output, and 'function' the original function behind it.
+    For typed commands, 'bound' parses the argument string with 'parser'
+    before calling the command, for batch commands it submits the argument
+    string to 'batcher', and for cached commands, it goes through 'cache'.
+    For commands run in a worker process, 'bound' writes the result of the
+    function instead, when called in the current process.
+    Output is written to 'owner' (by default, the instance 'bound' is bound to).
+    """
+
+    __slots__ = ('bound', 'is_async', 'is_generator', 'function', 'background', 'blocking', 'process', 'timeout', 'pipe',
+                 'parser', 'batcher', 'cache', 'entry')
+
+    cacheable: bool = True  # Whether a `BoundMapping` keeps the record for later lookups
+
+    def __init__(self, bound: Callable[..., Any], entry: CommandEntry, owner: Any = None):
+        self.parser: SignatureParser|None = entry.parser
+        self.batcher: Batcher|None = None
+        self.cache: ResultCache|None = None
+        if owner is None:
+            owner = getattr(bound, "__self__", None)
+        if self.parser is not None:
+            bound = self.parser.adapt(bound)
+        if entry.process:
+            bound = self._writing(bound, owner)
+        if entry.batch is not None:
+            from asiocmd.batching import Batcher
+            self.batcher = entry.batcher or Batcher(entry.batch)
+            bound = self.batcher.wrap(bound, owner)
+        if entry.cache is not None:
+            from asiocmd.cache import ResultCache
+            self.cache = ResultCache(entry.cache, owner)
+            bound = self.cache.wrap(bound, entry.is_async)
+        self.bound: Callable[..., Any] = bound
+        self.is_async: bool = entry.is_async
+        self.is_generator: bool = entry.is_generator
+        self.function: Callable[..., Any]|None = entry.function
+        self.background: bool = entry.background
+        self.blocking: bool = entry.blocking
+        self.process: bool = entry.process
+        self.timeout: float|None = entry.timeout
+        self.pipe: bool = entry.pipe
+        self.entry: CommandEntry = entry
+
+    @staticmethod
+    def _writing(function: Callable[..., Any], owner: Any) -> Callable[..., Any]:
+        def call(arg: str) -> None:
+            result: Any = function(arg)
+            if result is not None and owner is not None:
+                owner.stdout.write(result if isinstance(result, str) else str(result))
+        return call
+
+    @classmethod
+    def from_callable(cls, name: str, method: Callable[..., Any]) -> "DispatchRecord":
+        """
+        Build a record for an already bound callable registered under 'name'.
+        """
+        return cls(method, CommandEntry(name, None, None, method))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.entry.name!r} ({'async' if self.is_async else 'sync'}) {self.bound!r}>"
+
+class CommandTable:
+    """
+    Commands and helpers declared by a class, as read-only mappings of name
+    to `CommandEntry`, along with prefix indexes of their names, built when
+    completion first needs them.
+
+    Registration errors are recorded in 'error' rather than raised, so that
+    they surface when an instance registers its commands.
+    """
+
+    __slots__ = ('commands', 'helpers', '_command_index', '_helper_index', 'error')
+
+    def __init__(self,
+                 commands: Mapping[str, CommandEntry],
+                 helpers: Mapping[str, CommandEntry],
+                 error: str|None = None):
+        self.commands: Mapping[str, CommandEntry] = MappingProxyType(dict(commands))
+        self.helpers: Mapping[str, CommandEntry] = MappingProxyType(dict(helpers))
+        self._command_index: PrefixIndex|None = None
+        self._helper_index: PrefixIndex|None = None
+        self.error: str|None = error
+
+    def command_index(self) -> "PrefixIndex":
+        """
+        Return the prefix index of the command names.
+        """
+        if self._command_index is None:
+            from asiocmd.index import PrefixIndex
+            self._command_index = PrefixIndex(self.commands)
+        return self._command_index
+
+    def helper_index(self) -> "PrefixIndex":
+        """
+        Return the prefix index of the helper names.
+        """
+        if self._helper_index is None:
+            from asiocmd.index import PrefixIndex
+            self._helper_index = PrefixIndex(self.helpers)
+        return self._helper_index
+
+    @classmethod
+    def compile(cls, owner: type) -> "CommandTable":
+        """
+        Scan the methods of the class 'owner' for commands and helpers.
+        """
+        commands: dict[str, CommandEntry] = {}
+        helpers: dict[str, CommandEntry] = {}
+
+        for name in sorted(dir(owner)):
+            # Only members that would be bound methods on an instance qualify, and commands run in worker processes
+            static: Any = inspect.getattr_static(owner, name, None)
+            if isinstance(static, staticmethod) and not find_decorator_attr(static.__func__, PROCESS_ATTR):
+                continue
+            method = getattr(owner, name, None)
+            if not (inspect.isfunction(method) or inspect.ismethod(method)):
+                continue
+
+            cmdname = find_decorator_attr(method, COMMAND_ATTR)
+            helpname = find_decorator_attr(method, HELPER_ATTR)
+            if cmdname and helpname:
+                return cls({}, {}, f"Method {name} ({repr(method)}) cannot be both a command and a helper")
+            if find_decorator_attr(method, PROCESS_ATTR) and not isinstance(static, staticmethod):
+                return cls({}, {}, f"Method {name} ({repr(method)}) must be a static method to run in a worker process")
+
+            # NOTE: If a command has a docstring AND a dedicated helper method, then the latter will be given priority
+            # NOTE: Commands defined with decorators are prioritised over legacy commands of the same name
+            if cmdname is not None: # Method decorated with @command or @async_command
+                commands[cmdname] = CommandEntry(cmdname, name, method=method)
+                if docs:=inspect.cleandoc(method.__doc__ or ''):
+                    helpers.setdefault(cmdname, CommandEntry(cmdname, None, docs))
+
+            elif name.startswith("do_"):  # Legacy method, defined as do_*()
+                cmdname = name[3:]
+                commands.setdefault(cmdname, CommandEntry(cmdname, name, method=method))
+                if docs:=inspect.cleandoc(method.__doc__ or ''):
+                    helpers.setdefault(cmdname, CommandEntry(cmdname, None, docs))
+
+            elif helpname: # Method decorated with @command_helper or @async_command_helper
+                helpers[helpname] = CommandEntry(helpname, name, method=method)
+            elif name.startswith("help_"):  # Legacy method for help, defined as help_*()
+                helpers.setdefault(name[5:], CommandEntry(name[5:], name, method=method))
+
+        error: str|None = None
+        if difference := (helpers.keys() - commands.keys()):
+            error = f"helpers: ({', '.join(difference)}) are defined for non-existent methods"
+        return cls(commands, helpers, error)
+
+class BoundMapping(MutableMapping[str, DispatchRecord]):
+    """
+    Mapping of names to `DispatchRecord` bound to 'owner', backed by a shared table of `CommandEntry`.
+
+    Entries are bound on first lookup and cached. Assignments and deletions
+    are kept in a per-instance overlay, so the shared table is never copied.
+    Names are indexed for prefix lookups: the shared index is used until the
+    overlay changes, after which a private index is built once and updated
+    incrementally.
+    """
+
+    __slots__ = ('_owner', '_base', '_base_index', '_index', '_added', '_removed', '_bound', 'version')
+
+    def __init__(self,
+                 owner: Any,
+                 base: Mapping[str, CommandEntry]|None = None,
+                 base_index: "Callable[[], PrefixIndex]|None" = None):
+        self._owner = owner
+        self._base: Mapping[str, CommandEntry] = base if base is not None else MappingProxyType({})
+        self._base_index = base_index   # Returns the shared index of the base table
+        self._index: PrefixIndex|None = None    # Private index, once the overlay changed or without a shared one
+        self._added: dict[str, CommandEntry|None] = {}   # None marks a record assigned directly
+        self._removed: set[str] = set()                 # Hidden names of the base table
+        self._bound: dict[str, DispatchRecord] = {}
+        self.version: int = 0   # Incremented on every change of names or records
+
+    def reset(self, base: Mapping[str, CommandEntry], base_index: "Callable[[], PrefixIndex]|None" = None) -> None:
+        """
+        Discard all instance-level changes and view the table 'base' instead.
+        """
+        self._base = base
+        self._base_index = base_index
+        self._index = None
+        self.version += 1
+        self._added.clear()
+        self._removed.clear()
+        self._bound.clear()
+
+    def names_with_prefix(self, prefix: str) -> list[str]:
+        """
+        Return the sorted names starting with 'prefix'.
+        """
+        if self._index is not None:
+            return self._index.match(prefix)
+        if self._base_index is not None and not (self._added or self._removed):
+            return self._base_index().match(prefix)
+        from asiocmd.index import PrefixIndex
+        self._index = PrefixIndex(self)
+        return self._index.match(prefix)
+
+    def _entry(self, name: str) -> CommandEntry|None:
+        if name in self._added:
+            return self._added[name]
+        if name in self._removed:
+            raise KeyError(name)
+        return self._base[name]
+
+    def __getitem__(self, name: str) -> DispatchRecord:
+        try:
+            return self._bound[name]
+        except KeyError:
+            pass
+        entry: CommandEntry|None = self._entry(name)
+        assert entry is not None
+        record: DispatchRecord = entry.bind(self._owner)
+        if record.cacheable:
+            self._bound[name] = record
+        return record
+
+    def records(self) -> list[DispatchRecord]:
+        """
+        Return the records bound so far, without binding the others.
+        """
+        return [record for name, record in self._bound.items() if name in self]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        record = self._bound.get(name)
+        if record is not None:
+            return record
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._added or (name in self._base and name not in self._removed)
+
+    def __setitem__(self, name: str, value: DispatchRecord) -> None:
+        if name in self._base:
+            self._removed.add(name)
+        self._added[name] = None
+        self._bound[name] = value
+        self.version += 1
+        if self._index is not None:
+            self._index.add(name)
+
+    def set_entry(self, name: str, entry: CommandEntry) -> None:
+        """
+        Map 'name' to 'entry', binding it lazily like the entries of the shared table.
+        """
+        if name in self._base:
+            self._removed.add(name)
+        self._added[name] = entry
+        self._bound.pop(name, None)
+        self.version += 1
+        if self._index is not None:
+            self._index.add(name)
+
+    def __delitem__(self, name: str) -> None:
+        if name in self._added:
+            del self._added[name]
+        elif name in self._base and name not in self._removed:
+            self._removed.add(name)
+        else:
+            raise KeyError(name)
+        self._bound.pop(name, None)
+        self.version += 1
+        if self._index is not None and name not in self:
+            self._index.discard(name)
+
+    def clear(self) -> None:
+        self._removed.update(self._base)
+        self._added.clear()
+        self._bound.clear()
+        self._index = None
+        self.version += 1
+
+    def __iter__(self) -> Iterator[str]:
+        removed: set[str] = self._removed
+        if removed:
+            yield from (name for name in self._base if name not in removed)
+        else:
+            yield from self._base
+        yield from self._added
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._removed) + len(self._added)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ({', '.join(self)})>"
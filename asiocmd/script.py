@@ -0,0 +1,32 @@
+"""Results of non-interactive script execution through `Cmd.run_script` and `AsyncCmd.arun_script`."""
+
+from typing import Any
+
+__all__ = ("CommandResult",)
+
+class CommandResult:
+    """
+    Outcome of a single script line.
+
+    'result' is the value returned by onecmd(), 'error' the exception raised
+    while running the line (if any), and 'elapsed' the time taken by the
+    precmd/onecmd/postcmd sequence, in seconds. Lines that `arun_script` runs
+    together as one batch are each given an equal share of the time taken by
+    the batch, so that elapsed times add up to the duration of the script.
+    """
+
+    __slots__ = ('line', 'result', 'error', 'elapsed')
+
+    def __init__(self, line: str, result: Any = None, error: BaseException|None = None, elapsed: float = 0.0):
+        self.line = line
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        outcome: str = f"error={self.error!r}" if self.error is not None else f"result={self.result!r}"
+        return f"<{self.__class__.__name__} {self.line!r} {outcome} elapsed={self.elapsed:.6f}s>"
@@ -0,0 +1,135 @@
+"""Serve `AsyncCmd` sessions over TCP or Unix sockets.
+
+Every connection gets its own lightweight instance of the served class,
+reading lines from the connection and writing output back to it, while all
+sessions share one event loop and the class' precompiled command table.
+"""
+
+import asyncio
+from typing import Any, Callable
+
+from asiocmd.async_cmd import AsyncCmd
+
+__all__ = ("StreamWriterOutput", "CmdServer")
+
+class StreamWriterOutput:
+    """
+    Text stream interface over an `asyncio.StreamWriter`.
+
+    write() only buffers in the transport; drain() waits until the peer has
+    accepted enough data, providing backpressure between commands.
+    """
+
+    __slots__ = ('writer', 'encoding', 'errors')
+
+    def __init__(self, writer: asyncio.StreamWriter, encoding: str = "utf-8", errors: str = "replace"):
+        self.writer = writer
+        self.encoding = encoding
+        self.errors = errors
+
+    def write(self, data: str) -> int:
+        if not self.writer.is_closing():
+            self.writer.write(data.encode(self.encoding, self.errors))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    async def drain(self) -> None:
+        if not self.writer.is_closing():
+            await self.writer.drain()
+
+    def isatty(self) -> bool:
+        return False
+
+class CmdServer:
+    """
+    Accept connections and run an `AsyncCmd` session for each of them.
+
+    'cmd_factory' (usually an AsyncCmd subclass) is called with the stdin,
+    stdout and use_raw_input keyword arguments, plus any extra 'cmd_kwargs'.
+    Sessions are created with cancel_on_interrupt=False, unless given in
+    'cmd_kwargs', so that Ctrl-C reaches the server rather than a session.
+    At most 'max_connections' sessions run at once; further connections are
+    sent 'busy_message' and closed.
+    """
+
+    __slots__ = ('cmd_factory', 'cmd_kwargs', 'max_connections', 'busy_message',
+                 'encoding', '_sessions', '_servers')
+
+    def __init__(self,
+                 cmd_factory: Callable[..., AsyncCmd],
+                 max_connections: int = 64,
+                 busy_message: str = "Too many connections, try again later\n",
+                 encoding: str = "utf-8",
+                 **cmd_kwargs: Any):
+        if max_connections < 1:
+            raise ValueError(f"max_connections must be a positive integer, got {max_connections}")
+        self.cmd_factory = cmd_factory
+        self.cmd_kwargs = cmd_kwargs
+        self.max_connections = max_connections
+        self.busy_message = busy_message
+        self.encoding = encoding
+        self._sessions: set[asyncio.Task] = set()
+        self._servers: list[asyncio.Server] = []
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._sessions)
+
+    async def start_tcp(self, host: str|None = None, port: int = 0, **kwargs: Any) -> asyncio.Server:
+        """
+        Listen on a TCP address. Extra keyword arguments go to `asyncio.start_server`.
+        """
+        server: asyncio.Server = await asyncio.start_server(self._handle_connection, host, port, **kwargs)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str, **kwargs: Any) -> asyncio.Server:
+        """
+        Listen on a Unix socket. Extra keyword arguments go to `asyncio.start_unix_server`.
+        """
+        server: asyncio.Server = await asyncio.start_unix_server(self._handle_connection, path, **kwargs)
+        self._servers.append(server)
+        return server
+
+    async def close(self) -> None:
+        """
+        Stop listening and end every running session.
+        """
+        for server in self._servers:
+            server.close()
+        for session in tuple(self._sessions):
+            session.cancel()
+        if self._sessions:
+            await asyncio.wait(tuple(self._sessions))
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            if len(self._sessions) >= self.max_connections:
+                writer.write(self.busy_message.encode(self.encoding))
+                await writer.drain()
+                return
+
+            task: asyncio.Task|None = asyncio.current_task()
+            assert task is not None
+            self._sessions.add(task)
+            try:
+                session: AsyncCmd = self.cmd_factory(stdin=reader,
+                                                     stdout=StreamWriterOutput(writer, self.encoding),
+                                                     use_raw_input=False,
+                                                     **{"cancel_on_interrupt": False, **self.cmd_kwargs})
+                await session.acmdloop()
+            finally:
+                self._sessions.discard(task)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
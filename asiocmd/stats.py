@@ -0,0 +1,92 @@
+"""Per-command latency instrumentation for `Cmd` and `AsyncCmd`.
+
+Interpreters created with a 'stats' sink time every command line executed by
+their command loops and scripts, reporting the time spent in the command body
+and in the pre/post command hooks separately.
+"""
+
+import math
+from collections import deque
+
+__all__ = ("StatsSink", "CommandTimings", "CommandStats")
+
+class StatsSink:
+    """
+    Receiver of command timings. Subclass and override record() to forward
+    timings elsewhere, such as a metrics client.
+    """
+
+    __slots__ = ()
+
+    def record(self, command: str, elapsed: float, hook_time: float, failed: bool) -> None:
+        """
+        Called once per executed line with the name of the command, the
+        seconds spent in onecmd() and in the pre/post command hooks, and
+        whether the command raised.
+        """
+        raise NotImplementedError
+
+class CommandTimings:
+    """
+    Aggregated timings of a single command. Percentiles are computed over
+    the last 'sample_size' calls.
+    """
+
+    __slots__ = ('calls', 'errors', 'total_time', 'hook_time', 'samples')
+
+    def __init__(self, sample_size: int):
+        self.calls: int = 0
+        self.errors: int = 0
+        self.total_time: float = 0.0
+        self.hook_time: float = 0.0
+        self.samples: deque[float] = deque(maxlen=sample_size)
+
+    def percentile(self, p: float) -> float:
+        """
+        Return the 'p'th percentile (0-100) of recent command latencies, in seconds.
+        """
+        if not self.samples:
+            return 0.0
+        ordered: list[float] = sorted(self.samples)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+class CommandStats(StatsSink):
+    """
+    In-memory sink keeping a `CommandTimings` per command. Interpreters
+    given a CommandStats sink also register the built-in 'stats' command.
+    """
+
+    __slots__ = ('sample_size', 'commands')
+
+    def __init__(self, sample_size: int = 1024):
+        self.sample_size: int = sample_size
+        self.commands: dict[str, CommandTimings] = {}
+
+    def record(self, command: str, elapsed: float, hook_time: float, failed: bool) -> None:
+        timings: CommandTimings|None = self.commands.get(command)
+        if timings is None:
+            timings = self.commands[command] = CommandTimings(self.sample_size)
+        timings.calls += 1
+        timings.errors += failed
+        timings.total_time += elapsed
+        timings.hook_time += hook_time
+        timings.samples.append(elapsed)
+
+    def reset(self) -> None:
+        self.commands.clear()
+
+    def report(self) -> str:
+        """
+        Return a table of the recorded timings, slowest commands (by p95) first.
+        Latencies are in milliseconds.
+        """
+        if not self.commands:
+            return "No commands recorded\n"
+        rows: list[tuple[str, ...]] = [("command", "calls", "errors", "p50", "p95", "p99", "body", "hooks")]
+        for name, timings in sorted(self.commands.items(), key=lambda item: item[1].percentile(95), reverse=True):
+            rows.append((name, str(timings.calls), str(timings.errors),
+                         *(f"{timings.percentile(p) * 1000:.3f}" for p in (50, 95, 99)),
+                         f"{timings.total_time * 1000:.3f}", f"{timings.hook_time * 1000:.3f}"))
+        widths: list[int] = [max(len(row[col]) for row in rows) for col in range(len(rows[0]))]
+        return "".join("  ".join([row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]).rstrip() + "\n"
+                       for row in rows)
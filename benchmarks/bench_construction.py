@@ -0,0 +1,21 @@
+"""Benchmark `Cmd` instantiation cost against the number of declared commands.
+
+Usage: python -m benchmarks.bench_construction
+"""
+
+import io
+import timeit
+
+from benchmarks.synth import make_cmd_class
+
+def main() -> None:
+    stdin, stdout = io.StringIO(), io.StringIO()
+    print(f"{'commands':>10} {'first (ms)':>12} {'per instance (us)':>18}")
+    for n_commands in (10, 100, 1000, 10000):
+        cls = make_cmd_class(n_commands)
+        first: float = timeit.timeit(lambda: cls(stdin=stdin, stdout=stdout), number=1)
+        runs, total = timeit.Timer(lambda: cls(stdin=stdin, stdout=stdout)).autorange()
+        print(f"{n_commands:>10} {first * 1e3:>12.3f} {total / runs * 1e6:>18.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark the per-call cost of commands registered through the decorators.
+
+Each case dispatches through `onecmd` (the path used by the command loops)
+and calls the bound method directly, once with the current decorators and
+once with the wrapping decorators used before they were made zero-overhead.
+
+Usage: python -m benchmarks.bench_decorators
+"""
+
+import asyncio
+import io
+import timeit
+from functools import wraps
+
+from asiocmd import AsyncCmd, Cmd, async_command, command
+from asiocmd.decorators import COMMAND_ATTR
+
+def legacy_command(name: str):
+    def outer_decorated(method):
+        @wraps(method)
+        def inner_decorated(*args, **kwargs):
+            return method(*args, **kwargs)
+        setattr(inner_decorated, COMMAND_ATTR, name)
+        return inner_decorated
+    return outer_decorated
+
+def legacy_async_command(name: str):
+    def outer_decorated(method):
+        @wraps(method)
+        async def inner_decorated(*args, **kwargs):
+            return await method(*args, **kwargs)
+        setattr(inner_decorated, COMMAND_ATTR, name)
+        return inner_decorated
+    return outer_decorated
+
+class SyncBench(Cmd):
+    @command("tagged")
+    def tagged(self, line: str) -> None: pass
+
+    @legacy_command("wrapped")
+    def wrapped(self, line: str) -> None: pass
+
+class AsyncBench(AsyncCmd):
+    @async_command("tagged")
+    async def tagged(self, line: str) -> None: pass
+
+    @legacy_async_command("wrapped")
+    async def wrapped(self, line: str) -> None: pass
+
+def per_call(stmt, number: int = 200_000) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+async def per_await(factory, number: int = 200_000) -> float:
+    best: float = float("inf")
+    loop = asyncio.get_running_loop()
+    for _ in range(5):
+        start: float = loop.time()
+        for _ in range(number):
+            await factory()
+        best = min(best, loop.time() - start)
+    return best / number * 1e9
+
+async def async_cases(cmd: AsyncBench) -> dict[str, float]:
+    return {
+        "async onecmd (tagged)": await per_await(lambda: cmd.onecmd("tagged x")),
+        "async onecmd (wrapped)": await per_await(lambda: cmd.onecmd("wrapped x")),
+        "async direct (tagged)": await per_await(lambda: cmd.tagged("x")),
+        "async direct (wrapped)": await per_await(lambda: cmd.wrapped("x")),
+    }
+
+def main() -> None:
+    stdin, stdout = io.StringIO(), io.StringIO()
+    sync_cmd: SyncBench = SyncBench(stdin=stdin, stdout=stdout)
+    results: dict[str, float] = {
+        "sync onecmd (tagged)": per_call(lambda: sync_cmd.onecmd("tagged x")),
+        "sync onecmd (wrapped)": per_call(lambda: sync_cmd.onecmd("wrapped x")),
+        "sync direct (tagged)": per_call(lambda: sync_cmd.tagged("x")),
+        "sync direct (wrapped)": per_call(lambda: sync_cmd.wrapped("x")),
+    }
+    results.update(asyncio.run(async_cases(AsyncBench(stdin=stdin, stdout=stdout))))
+
+    for case, nanoseconds in results.items():
+        print(f"{case:<26} {nanoseconds:>10.1f} ns/call")
+
+if __name__ == "__main__":
+    main()
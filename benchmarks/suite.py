@@ -0,0 +1,175 @@
+"""Benchmark suite for import, construction, dispatch, parsing, completion and help rendering.
+
+Synthetic `Cmd` and `AsyncCmd` subclasses with 10 to 10,000 commands are
+measured case by case, and the package import is timed with -X importtime
+in fresh interpreters. Results are printed as a table and can be written as
+JSON with --output, then compared against an earlier run with --compare.
+
+Usage: python -m benchmarks.suite [--sizes 10,100] [--repeat N] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from typing import Any, Callable
+
+from asiocmd import AsyncCmd, Cmd, command
+from benchmarks.synth import command_names, make_cmd_class
+
+SIZES: tuple[int, ...] = (10, 100, 1000, 10000)
+
+def per_call(func: Callable[[], Any], repeat: int = 5) -> float:
+    """
+    Return the best time of a call to 'func' in microseconds.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+def per_await(factory: Callable[[], Any], number: int = 20_000, repeat: int = 5) -> float:
+    """
+    Return the best time of awaiting the coroutines produced by 'factory', in microseconds.
+    """
+    async def run() -> float:
+        best: float = float("inf")
+        for _ in range(repeat):
+            start: float = time.perf_counter()
+            for _ in range(number):
+                await factory()
+            best = min(best, time.perf_counter() - start)
+        return best / number * 1e6
+    return asyncio.run(run())
+
+def first_call(func: Callable[[], Any]) -> float:
+    start: float = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1e6
+
+def import_time(statement: str, module: str, repeat: int) -> float:
+    """
+    Return the best cumulative import time of 'module', in microseconds, as
+    reported by -X importtime for a fresh interpreter running 'statement'.
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        stderr: str = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                                     capture_output=True, text=True, check=True).stderr
+        for line in stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            _, _, fields = line.partition(":")
+            parts: list[str] = fields.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                best = min(best, float(parts[1]))
+    return best
+
+def bench_import(repeat: int) -> dict[str, float]:
+    return {
+        "asiocmd": import_time("import asiocmd", "asiocmd", repeat),
+        "asiocmd_async": import_time("from asiocmd import AsyncCmd", "asiocmd.async_cmd", repeat),
+    }
+
+def bench_sync(n_commands: int, repeat: int) -> dict[str, float]:
+    stdin, stdout = io.StringIO(), io.StringIO()
+    cls: type[Cmd] = make_cmd_class(n_commands)
+    results: dict[str, float] = {"construct_first": first_call(lambda: cls(stdin=stdin, stdout=stdout))}
+    cmd: Cmd = cls(stdin=stdin, stdout=stdout)
+    names: list[str] = command_names(cls)
+    last: str = f"{names[-1]} some arguments"
+
+    def rendered_help() -> None:
+        cmd._help_cache = None
+        cmd._help_listing()
+
+    def dispatch() -> None:
+        stdout.seek(0)
+        cmd.onecmd(last)
+
+    @command(typed=True)
+    def typed(self, name: str, count: int = 1, *, verbose: bool = False) -> None:
+        pass
+    cmd.register_command(typed)
+
+    results.update({
+        "construct": per_call(lambda: cls(stdin=stdin, stdout=stdout), repeat=repeat),
+        "update_mapping": per_call(lambda: cmd._update_mapping(overwrite=True), repeat=repeat),
+        "parseline": per_call(lambda: cmd.parseline(last), repeat=repeat),
+        "parseargv": per_call(lambda: cmd.parseargv(last), repeat=repeat),
+        "onecmd": per_call(dispatch, repeat=repeat),
+        "onecmd_typed": per_call(lambda: cmd.onecmd("typed name 3 --verbose"), repeat=repeat),
+        "onecmd_unknown": per_call(lambda: (stdout.seek(0), cmd.onecmd("nonexistent arguments")), repeat=repeat),
+        "completenames_prefix": per_call(lambda: cmd.completenames("cmd1"), repeat=repeat),
+        "completenames_all": per_call(lambda: cmd.completenames(""), repeat=repeat),
+        "help_render": per_call(rendered_help, repeat=repeat),
+        "help_cached": per_call(cmd._help_listing, repeat=repeat),
+    })
+    return results
+
+def bench_async(n_commands: int, repeat: int) -> dict[str, float]:
+    stdin, stdout = io.StringIO(), io.StringIO()
+    cls: type[Cmd] = make_cmd_class(n_commands, AsyncCmd)
+    results: dict[str, float] = {"construct_first": first_call(lambda: cls(stdin=stdin, stdout=stdout))}
+    cmd: Cmd = cls(stdin=stdin, stdout=stdout)
+    names: list[str] = command_names(cls)
+    sync_line: str = f"{next(name for name in names if not name.startswith('acmd'))} some arguments"
+    async_line: str = f"{next(name for name in names if name.startswith('acmd'))} some arguments"
+
+    results.update({
+        "construct": per_call(lambda: cls(stdin=stdin, stdout=stdout), repeat=repeat),
+        "onecmd_sync": per_await(lambda: cmd.onecmd(sync_line), repeat=repeat),
+        "onecmd_async": per_await(lambda: cmd.onecmd(async_line), repeat=repeat),
+    })
+    return results
+
+def run(sizes: tuple[int, ...], repeat: int = 5) -> dict[str, Any]:
+    results: dict[str, float] = {f"import.{case}": micros for case, micros in bench_import(repeat).items()}
+    for n_commands in sizes:
+        for kind, bench in (("cmd", bench_sync), ("async_cmd", bench_async)):
+            for case, micros in bench(n_commands, repeat).items():
+                results[f"{kind}.{case}[{n_commands}]"] = micros
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "unit": "us",
+        "results": results,
+    }
+
+def report(data: dict[str, Any], baseline: dict[str, Any]|None = None) -> str:
+    lines: list[str] = []
+    previous: dict[str, float] = baseline["results"] if baseline else {}
+    width: int = max(len(case) for case in data["results"])
+    for case, micros in data["results"].items():
+        line: str = f"{case:<{width}} {micros:>14.3f} us"
+        if case in previous:
+            line += f" {micros / previous[case]:>8.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv: list[str]|None = None) -> None:
+    parser = argparse.ArgumentParser(description="asiocmd benchmark suite")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma separated numbers of commands per synthetic class")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per case, the best is kept")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run, shown as time ratios")
+    args = parser.parse_args(argv)
+
+    data: dict[str, Any] = run(tuple(int(size) for size in args.sizes.split(",")), args.repeat)
+    baseline: dict[str, Any]|None = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print(report(data, baseline))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(data, file, indent=2)
+
+if __name__ == "__main__":
+    main()
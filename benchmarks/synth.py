@@ -0,0 +1,43 @@
+"""Synthetic `Cmd`/`AsyncCmd` subclasses shared by the benchmarks."""
+
+from asiocmd import AsyncCmd, Cmd, async_command, command, command_helper
+
+def make_cmd_class(n_commands: int, base: type[Cmd] = Cmd) -> type[Cmd]:
+    """
+    Return a subclass of 'base' declaring 'n_commands' commands, alternating
+    between `@command` methods and legacy do_* methods. Subclasses of
+    `AsyncCmd` additionally get `@async_command` coroutines, so that commands
+    are split evenly between the three kinds. Every other command has a helper.
+    """
+    namespace: dict[str, object] = {}
+    kinds: int = 3 if issubclass(base, AsyncCmd) else 2
+    for i in range(n_commands):
+        kind: int = i % kinds
+        if kind == 0:
+            def method(self, line: str) -> None:
+                """Generated command"""
+            method.__name__ = f"cmd{i}"
+            namespace[method.__name__] = command(method)
+        elif kind == 1:
+            def method(self, line: str) -> None:
+                """Generated command"""
+            namespace[f"do_legacy{i}"] = method
+        else:
+            async def method(self, line: str) -> None:
+                """Generated command"""
+            method.__name__ = f"acmd{i}"
+            namespace[method.__name__] = async_command(method)
+
+        if i % 2 == 0:
+            name: str = method.__name__ if kind != 1 else f"legacy{i}"
+            def helper(self) -> None:
+                self.stdout.write("Generated help")
+            helper.__name__ = f"help{i}"
+            namespace[helper.__name__] = command_helper(name)(helper)
+    return type(f"Generated{base.__name__}{n_commands}", (base,), namespace)
+
+def command_names(cls: type[Cmd]) -> list[str]:
+    """
+    Return the names of the commands declared by a class built with make_cmd_class().
+    """
+    return list(cls._command_table().commands)
@@ -1,6 +1,10 @@
 import asyncio
+import os
+import threading
+import time
 from functools import wraps
-from typing import Any, Literal, TextIO
+from typing import Any, AsyncIterator, Iterator, Literal, TextIO
+from asiocmd.batching import BatchPolicy
 from asiocmd import (AsyncCmd,
                   command, command_helper,
                   async_command, async_command_helper)
@@ -138,4 +142,232 @@ class AsyncDecoratorCmd(AsyncCmd):
     async def areversed_foo(self, line: str) -> None: pass
     
     @command
-    def exit(self, line: str) -> Literal[True]: return True
\ No newline at end of file
+    def exit(self, line: str) -> Literal[True]: return True
+
+class AsyncJobCmd(AsyncCmd):
+    '''AsyncCmd with slow background commands, for testing concurrent dispatch'''
+    __slots__ = ("completed", "postcmd_lines")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.completed: list[str] = []
+        self.postcmd_lines: list[str] = []
+
+    def postcmd(self, stop, line: str):
+        self.postcmd_lines.append(line)
+        return stop
+
+    @async_command(background=True)
+    async def fetch(self, line: str) -> None:
+        await asyncio.sleep(float(line))
+        self.completed.append(line)
+
+    @async_command(background=True)
+    async def hang(self, line: str) -> None:
+        await asyncio.sleep(60)
+
+    @async_command(background=True, typed=True)
+    async def nap(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+        self.completed.append(f"nap {seconds}")
+
+    @command
+    def exit(self, line: str) -> Literal[True]:
+        return True
+
+class AsyncBlockingCmd(AsyncCmd):
+    '''AsyncCmd with blocking synchronous commands, for testing offloading to worker threads'''
+    __slots__ = ("threads",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads: list[str] = []
+
+    @command(blocking=True)
+    def block(self, line: str) -> None:
+        self.threads.append(threading.current_thread().name)
+        time.sleep(float(line))
+
+    @command
+    def inline(self, line: str) -> None:
+        self.threads.append(threading.current_thread().name)
+
+    @staticmethod
+    @command(process=True)
+    def pid(line: str) -> str:
+        return f"{os.getpid()}\n"
+
+    @staticmethod
+    @command(process=True, typed=True)
+    def power(base: int, exponent: int = 2) -> str:
+        return f"{base ** exponent}\n"
+
+    @command
+    def exit(self, line: str) -> Literal[True]:
+        return True
+
+class AsyncAllBlockingCmd(AsyncBlockingCmd):
+    '''AsyncBlockingCmd with every synchronous command offloaded'''
+    blocking_commands = True
+
+class AsyncTimeoutCmd(AsyncCmd):
+    '''AsyncCmd with hanging commands, for testing timeouts and cancellation'''
+    __slots__ = ("events",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events: list[str] = []
+
+    def cmdtimeout(self, line: str, timeout: float):
+        self.events.append(f"timeout {line}")
+
+    def cmdcancelled(self, line: str):
+        self.events.append(f"cancelled {line}")
+
+    @async_command(timeout=0.05)
+    async def quick(self, line: str) -> None:
+        await asyncio.sleep(60)
+
+    @async_command
+    async def hang(self, line: str) -> None:
+        await asyncio.sleep(float(line or 60))
+
+    @async_command(background=True, timeout=0.05)
+    async def job(self, line: str) -> None:
+        await asyncio.sleep(60)
+
+    @command
+    def exit(self, line: str) -> Literal[True]:
+        return True
+
+class AsyncStreamCmd(AsyncCmd):
+    '''AsyncCmd with generator commands, for testing streamed output'''
+    __slots__ = ("closed",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed: list[str] = []
+
+    @command
+    def rows(self, line: str) -> Iterator[str]:
+        try:
+            for i in range(int(line)):
+                yield f"{i}\n"
+        finally:
+            self.closed.append("rows")
+
+    @async_command(timeout=0.1)
+    async def tail(self, line: str) -> AsyncIterator[str]:
+        try:
+            while True:
+                yield "tick\n"
+                await asyncio.sleep(0.01)
+        finally:
+            self.closed.append("tail")
+
+class AsyncPipeCmd(AsyncStreamCmd):
+    '''AsyncCmd with pipe commands, for testing command pipelines'''
+    @async_command(pipe=True)
+    async def upper(self, line: str, upstream: AsyncIterator[str]) -> AsyncIterator[str]:
+        async for chunk in upstream:
+            yield chunk.upper()
+
+    @async_command(pipe=True)
+    async def head(self, line: str, upstream: AsyncIterator[str]) -> AsyncIterator[str]:
+        n: int = int(line)
+        async for chunk in upstream:
+            if n <= 0:
+                return
+            n -= 1
+            yield chunk
+
+    @async_command(pipe=True)
+    async def total(self, line: str, upstream: AsyncIterator[str]) -> None:
+        self.stdout.write(f"{len([chunk async for chunk in upstream])}\n")
+
+    @command(pipe=True)
+    def grep(self, line: str, upstream: Iterator[str]) -> Iterator[str]:
+        for chunk in upstream:
+            if line in chunk:
+                yield chunk
+
+    @command(pipe=True)
+    def count(self, line: str, upstream: Iterator[str]) -> None:
+        self.stdout.write(f"{sum(1 for _ in upstream)}\n")
+
+    @command
+    def fail(self, line: str) -> Iterator[str]:
+        yield "partial\n"
+        raise ValueError(line)
+
+class AsyncTypedCmd(AsyncCmd):
+    '''AsyncCmd with typed commands'''
+    @async_command(typed=True)
+    async def add(self, *numbers: float) -> float:
+        return sum(numbers)
+
+    @command(typed=True, blocking=True)
+    def sleep(self, seconds: float, *, label: str|None = None) -> Any:
+        time.sleep(seconds)
+        return label
+
+class AsyncCachedCmd(AsyncCmd):
+    '''AsyncCmd with cached commands'''
+    __slots__ = ("runs",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.runs: int = 0
+
+    @async_command(cache=True)
+    async def lookup(self, line: str) -> str:
+        self.runs += 1
+        await asyncio.sleep(0.02)
+        self.stdout.write(line)
+        return line
+
+class AsyncBatchCmd(AsyncCmd):
+    '''AsyncCmd with batch commands'''
+    __slots__ = ("batches",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches: list[list[str]] = []
+
+    @async_command(batch=BatchPolicy(window=0.01, max_size=4))
+    async def get(self, args: list[str]) -> list[Any]:
+        self.batches.append(args)
+        await asyncio.sleep(0)
+        return [KeyError(arg) if arg == "missing" else f"{arg}={len(args)}\n" for arg in args]
+
+    @async_command(batch=BatchPolicy(window=0.01, shared=True))
+    async def shared(self, args: list[str]) -> list[str]:
+        self.batches.append(args)
+        return args
+
+    @async_command(batch=BatchPolicy(window=5))
+    async def slow(self, args: list[str]) -> list[str]:
+        self.batches.append(args)
+        return [f"{arg}\n" for arg in args]
+
+    def do_exit(self, line: str) -> bool:
+        return True
+
+class AsyncPromptCmd(AsyncCmd):
+    '''AsyncCmd with commands reading their own input'''
+
+    def do_confirm(self, line: str) -> None:
+        self.stdout.write(f"confirmed={input('Sure? ')}\n")
+
+    @command(blocking=True)
+    def ask(self, line: str) -> None:
+        self.stdout.write(f"answer={self.stdin.readline().strip()}\n")
+
+    @async_command
+    async def aask(self, line: str) -> None:
+        with self.pause_input():
+            answer = await self.run_blocking(input)
+        self.stdout.write(f"async={answer}\n")
+
+    def do_exit(self, line: str) -> bool:
+        return True
@@ -1,10 +1,12 @@
 '''Class definitions for testing Cmd functionality'''
 
 from functools import wraps
-from typing import Any, Literal, TextIO
+from enum import Enum
+from typing import Any, Iterator, Literal, TextIO
 from asiocmd import Cmd, command, command_helper
+from asiocmd.cache import CachePolicy
 
-__all__ = ("RegistrarBaseCmd", "EchoCmd")
+__all__ = ("RegistrarBaseCmd", "EchoCmd", "HookCmd", "DecoratorCmd", "ScriptCmd", "StreamCmd", "PipeCmd", "TypedCmd", "CachedCmd")
 
 class RegistrarBaseCmd(Cmd):
     '''Cmd implementation for testing method registration'''
@@ -118,4 +120,87 @@ class DecoratorCmd(Cmd):
     def reversed_foo(self, line: str) -> None: pass
     
     @command
-    def exit(self, line: str) -> Literal[True]: return True
\ No newline at end of file
+    def exit(self, line: str) -> Literal[True]: return True
+
+class ScriptCmd(Cmd):
+    '''Cmd implementation for testing non-interactive script execution'''
+    @command
+    def echo(self, line: str) -> None:
+        self.stdout.write(line)
+
+    @command
+    def fail(self, line: str) -> None:
+        raise RuntimeError(line)
+
+    @command
+    def exit(self, line: str) -> Literal[True]:
+        return True
+
+class StreamCmd(Cmd):
+    '''Cmd implementation for testing generator commands'''
+    @command
+    def rows(self, line: str) -> Iterator[str]:
+        for i in range(int(line)):
+            yield f"{i}\n"
+
+    @command
+    def stop(self, line: str) -> Iterator[str]:
+        yield "stopping"
+        return True
+
+class PipeCmd(StreamCmd):
+    '''Cmd implementation for testing command pipelines'''
+    @command(pipe=True)
+    def grep(self, line: str, upstream: Iterator[str]) -> Iterator[str]:
+        for chunk in upstream:
+            if line in chunk:
+                yield chunk
+
+    @command(pipe=True)
+    def count(self, line: str, upstream: Iterator[str]) -> None:
+        self.stdout.write(f"{sum(1 for _ in upstream)}\n")
+
+    @command
+    def say(self, line: str) -> None:
+        self.stdout.write(line)
+
+class Color(Enum):
+    RED = "r"
+    GREEN = "g"
+
+class TypedCmd(PipeCmd):
+    '''Cmd implementation for testing commands with typed arguments'''
+    @command(typed=True)
+    def resize(self, name: str, width: int, height: int = 0, *, force: bool = False, unit: Literal["px", "cm"] = "px") -> Any:
+        return (name, width, height, force, unit)
+
+    @command(typed=True)
+    def paint(self, *colors: Color, **tags: str) -> Any:
+        return (colors, tags)
+
+    @command(typed=True, pipe=True)
+    def take(self, n: int, upstream: Iterator[str]) -> Iterator[str]:
+        for _, chunk in zip(range(n), upstream):
+            yield chunk
+
+class CachedCmd(Cmd):
+    '''Cmd implementation for testing cached commands'''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.runs: list[str] = []
+
+    @command(cache=CachePolicy(maxsize=2))
+    def describe(self, line: str) -> str:
+        self.runs.append(line)
+        if line == "missing":
+            raise KeyError(line)
+        self.stdout.write(f"<{line}>")
+        return line.upper()
+
+    @command(cache=CachePolicy(ttl=0.05))
+    def status(self, line: str) -> None:
+        self.runs.append("status")
+
+    @command
+    def update(self, line: str) -> None:
+        self.invalidate_cache("describe", line or None)
@@ -0,0 +1,12 @@
+'''Module imported by lazy commands, for testing deferred imports'''
+import asyncio
+from asiocmd import async_command
+
+def report(self, line: str) -> None:
+    '''Report something'''
+    self.stdout.write(f"report {line}")
+
+@async_command
+async def areport(self, line: str) -> None:
+    await asyncio.sleep(0)
+    self.stdout.write(f"areport {line}")
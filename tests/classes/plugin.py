@@ -0,0 +1,16 @@
+'''Plugin module for testing runtime registration through Cmd.load_plugin'''
+from asiocmd import command, command_helper
+
+@command
+def greet(self, line: str) -> None:
+    '''Greet someone'''
+    self.stdout.write(f"Hello {line}")
+
+def do_shout(self, line: str) -> None:
+    self.stdout.write(line.upper())
+
+@command_helper("shout")
+def shout_helper(self) -> None:
+    self.stdout.write("Shout something")
+
+def unrelated(self, line: str) -> None: pass
@@ -1,9 +1,19 @@
+import asyncio
+import contextvars
+import math
+import os
+import signal
+import threading
 from typing import Literal
 import pytest
 from tests.conf import test_io
 import io
-from asiocmd import AsyncCmd
-from tests.classes.async_ import AsyncTestCmd, AsyncHookCmd, AsyncDecoratorCmd
+from asiocmd import AsyncCmd, command
+from asiocmd.lazy import LazyCommand
+from asiocmd.output import AsyncOutputBuffer
+from asiocmd.readers import StreamInputReader, ThreadInputReader
+from asiocmd.stats import CommandStats
+from tests.classes.async_ import AsyncTestCmd, AsyncHookCmd, AsyncDecoratorCmd, AsyncJobCmd, AsyncBlockingCmd, AsyncAllBlockingCmd, AsyncTimeoutCmd, AsyncStreamCmd, AsyncPipeCmd, AsyncTypedCmd, AsyncCachedCmd, AsyncBatchCmd, AsyncPromptCmd
 from unittest.mock import patch
 
 def test_loop(test_io) -> None:
@@ -132,4 +142,506 @@ async def test_cmd_decorators(test_io):
     assert cmd.method_decorator_calls == expected_outputs, \
         f'''Expected output not found
         Expected: ({', '.join(expected_outputs)})
-        Observed: ({', '.join(cmd.method_decorator_calls)})'''
\ No newline at end of file
+        Observed: ({', '.join(cmd.method_decorator_calls)})'''
+
+@pytest.mark.asyncio
+async def test_nonblocking_input() -> None:
+    read_fd, write_fd = os.pipe()
+    stdin, stdout = os.fdopen(read_fd, "r"), io.StringIO()
+    cmd: AsyncTestCmd = AsyncTestCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    assert isinstance(cmd.make_input_reader(), StreamInputReader), \
+        "Pipe stdin not read through an asyncio stream"
+
+    ticks: int = 0
+
+    async def heartbeat() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def feed() -> None:
+        await asyncio.sleep(0.1)
+        os.write(write_fd, b"foo\nexit\n")
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    feed_task = asyncio.create_task(feed())
+    try:
+        await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    finally:
+        heartbeat_task.cancel()
+        await feed_task
+        os.close(write_fd)
+        stdin.close()
+
+    assert ticks > 5, "Event loop blocked while waiting for input"
+    assert cmd.foo.__name__ in stdout.getvalue(), "Command read from pipe not executed"
+
+@pytest.mark.asyncio
+async def test_pipe_input_within_commands(monkeypatch) -> None:
+    read_fd, write_fd = os.pipe()
+    stdin, stdout = os.fdopen(read_fd, "r"), io.StringIO()
+    monkeypatch.setattr("sys.stdin", stdin)
+    cmd: AsyncPromptCmd = AsyncPromptCmd(stdout=stdout, use_raw_input=False)
+    cmd.intro = ""
+    os.write(write_fd, b"confirm\nyes\nask\nblue\naask\n")
+    try:
+        async def feed() -> None:
+            await asyncio.sleep(0.1)
+            os.write(write_fd, b"later\nconfirm\nno\nexit\n")
+        feed_task = asyncio.create_task(feed())
+        await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+        await feed_task
+        assert os.get_blocking(read_fd), "Stdin left in non-blocking mode"
+    finally:
+        os.close(write_fd)
+        stdin.close()
+
+    assert [line for line in stdout.getvalue().replace(cmd.prompt, "").splitlines() if "=" in line] == ["confirmed=yes", "answer=blue", "async=later", "confirmed=no"], \
+        "Input read by commands not handed back from the reader"
+
+@pytest.mark.asyncio
+async def test_concurrent_jobs(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncJobCmd = AsyncJobCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=8)
+
+    stdin.write("\n".join(["fetch 0.2"] * 5 + ["hang", "jobs", "cancel 6", "wait", "exit"]))
+    stdin.seek(0)
+
+    loop = asyncio.get_running_loop()
+    start: float = loop.time()
+    await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    elapsed: float = loop.time() - start
+
+    assert cmd.completed == ["0.2"] * 5, "Background jobs not completed"
+    assert elapsed < 0.8, f"Background jobs executed serially ({elapsed:.2f}s)"
+    assert cmd.postcmd_lines.count("fetch 0.2") == 5, "postcmd not run on job completion"
+    assert "[6] cancelled\thang" in stdout.getvalue(), "Job not cancelled"
+
+@pytest.mark.asyncio
+async def test_typed_background_arguments(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncJobCmd = AsyncJobCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=8)
+
+    assert await cmd.onecmd("nap soon") is None, "Job started with invalid arguments"
+    assert not len(cmd._jobs), "Job started with invalid arguments"
+    assert "usage: nap" in stdout.getvalue().lower(), "Usage error not reported right away"
+
+    await cmd.onecmd("nap 0.01")
+    await cmd.onecmd("wait")
+    assert cmd.completed == ["nap 0.01"], "Typed background job not run"
+
+@pytest.mark.asyncio
+async def test_concurrent_mode_disabled(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncJobCmd = AsyncJobCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    assert "jobs" not in cmd._method_mapping, "Job control registered outside concurrent mode"
+
+    stdin.write("fetch 0.01\nexit")
+    stdin.seek(0)
+    await cmd.acmdloop()
+    assert cmd.completed == ["0.01"], "Background command not awaited inline"
+
+def test_dispatch_records(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncDecoratorCmd = AsyncDecoratorCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+
+    for name in ("afoo", "abar", "arfoo"):
+        assert cmd._method_mapping[name].is_async, f"Coroutine command {name} not flagged as async"
+        assert cmd.check_async(cmd._method_mapping[name].bound)
+    for name in ("foo", "bar", "rfoo", "exit"):
+        assert not cmd._method_mapping[name].is_async, f"Synchronous command {name} flagged as async"
+    assert cmd._helper_mapping["afoo"].is_async and not cmd._helper_mapping["foo"].is_async, \
+        "Helper records not resolved"
+
+    # Records are resolved once and reused across lookups
+    assert cmd._method_mapping.get("afoo") is cmd._method_mapping.get("afoo")
+    assert cmd._method_mapping["arfoo"].function.__name__ == "areversed_foo", \
+        "Original function not resolved through decorators"
+
+@pytest.mark.asyncio
+async def test_enqueue_wakes_loop() -> None:
+    read_fd, write_fd = os.pipe()
+    stdin, stdout = os.fdopen(read_fd, "r"), io.StringIO()
+    cmd: AsyncTestCmd = AsyncTestCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+
+    async def push() -> None:
+        await asyncio.sleep(0.05)
+        cmd.enqueue("foo")
+        await asyncio.sleep(0.05)
+        cmd.enqueue_many(["afoo", "exit"])
+
+    push_task = asyncio.create_task(push())
+    try:
+        # Nothing is ever written to stdin, queued lines alone must drive the loop
+        await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    finally:
+        await push_task
+        os.close(write_fd)
+        stdin.close()
+
+    output: str = stdout.getvalue()
+    assert output.index(cmd.foo.__name__) < output.index(cmd.afoo.__name__) < output.index(cmd.do_exit.__name__), \
+        "Queued commands not executed in order"
+    assert not cmd.cmdqueue, "Queued commands left unconsumed"
+
+@pytest.mark.asyncio
+async def test_consecutive_loops() -> None:
+    # Pipe read ahead of the commands: the second loop gets what the first one read past its exit
+    read_fd, write_fd = os.pipe()
+    stdin = os.fdopen(read_fd, "r")
+    os.write(write_fd, b"exit\nfoo\nexit\n")
+    os.close(write_fd)
+    outputs: list[io.StringIO] = [io.StringIO(), io.StringIO()]
+    try:
+        for stdout in outputs:
+            cmd: AsyncTestCmd = AsyncTestCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+            await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    finally:
+        stdin.close()
+    assert cmd.foo.__name__ not in outputs[0].getvalue(), "Line past exit executed by the first loop"
+    assert cmd.foo.__name__ in outputs[1].getvalue(), "Line read ahead by the first loop lost"
+
+    # Thread read left pending by a queued exit: its line goes to the second loop
+    read_fd, write_fd = os.pipe()
+    stdin = os.fdopen(read_fd, "r")
+    outputs = [io.StringIO(), io.StringIO()]
+    try:
+        for stdout in outputs:
+            cmd = AsyncTestCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+            cmd.make_input_reader = lambda: ThreadInputReader(stdin, cmd.stdout, use_rawinput=False)
+            if stdout is outputs[0]:
+                asyncio.get_running_loop().call_later(0.1, cmd.enqueue, "exit")
+            else:
+                os.write(write_fd, b"foo\nexit\n")
+            await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    finally:
+        os.close(write_fd)
+        stdin.close()
+    assert cmd.foo.__name__ in outputs[1].getvalue(), "Line of the pending read lost"
+
+@pytest.mark.asyncio
+async def test_assigned_cmdqueue(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncTestCmd = AsyncTestCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    cmd.cmdqueue = ["foo", "exit"]
+    await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    assert not cmd.cmdqueue and cmd.foo.__name__ in stdout.getvalue(), "Assigned list of lines not run"
+
+@pytest.mark.asyncio
+async def test_arun_script(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncHookCmd = AsyncHookCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+
+    async def lines():
+        for line in (b"exit\n", "unreachable\n"):
+            yield line
+
+    results = await cmd.arun_script(lines())
+    assert [result.line for result in results] == ["exit"] and results[0].result is True
+    assert cmd.order_list == ["precmd", "aprecmd", "postcmd", "apostcmd"], \
+        "Command hooks not run around script lines"
+
+    job_cmd: AsyncJobCmd = AsyncJobCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=4)
+    results = await job_cmd.arun_script(["fetch 0.05", "fetch 0.05", "nonexistent"], stop_on_error=False)
+    assert len(results) == 3 and job_cmd.completed == ["0.05", "0.05"], \
+        "Background jobs not waited for at the end of the script"
+
+@pytest.mark.asyncio
+async def test_async_output_buffer() -> None:
+    class DrainingIO(io.StringIO):
+        drains: int = 0
+        async def drain(self) -> None:
+            self.drains += 1
+
+    stream = DrainingIO()
+    buffer: AsyncOutputBuffer = AsyncOutputBuffer(stream, threshold=4)
+    with buffer:
+        await buffer.awrite("ab")
+        assert not stream.drains and stream.getvalue() == ""
+        await buffer.awrite("cd")
+        assert stream.drains == 1 and stream.getvalue() == "abcd", "Buffer past threshold not drained"
+    await buffer.awrite("e")
+    assert stream.drains == 2 and stream.getvalue() == "abcde"
+
+    cmd: AsyncTestCmd = AsyncTestCmd(stdin=io.StringIO("afoo\nexit\n"), stdout=stream, use_raw_input=False)
+    await cmd.acmdloop()
+    assert stream.drains >= 4, "Output not drained after each command"
+
+@pytest.mark.asyncio
+async def test_stats(test_io) -> None:
+    stdin, stdout = test_io
+    stats: CommandStats = CommandStats()
+    cmd: AsyncJobCmd = AsyncJobCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=2, stats=stats)
+    await cmd.arun_script(["fetch 0.05", "stats"])
+
+    fetch = stats.commands["fetch"]
+    assert fetch.calls == 1 and fetch.percentile(50) >= 0.04, "Background job not timed until completion"
+    assert stats.commands["stats"].calls == 1 and "command" in stdout.getvalue(), "Built-in stats command not run"
+
+@pytest.mark.asyncio
+async def test_profile(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncJobCmd = AsyncJobCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=2, profiling=True)
+    await cmd.onecmd("profile fetch 0.01")
+    assert cmd.completed == ["0.01"], "Background command not waited for"
+    assert "Top 20 functions for: fetch 0.01" in stdout.getvalue()
+
+@pytest.mark.asyncio
+async def test_blocking_commands(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncBlockingCmd = AsyncBlockingCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    ticks: list[float] = []
+
+    async def tick() -> None:
+        while True:
+            ticks.append(0)
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    try:
+        await cmd.onecmd("block 0.2")
+        await cmd.onecmd("inline")
+    finally:
+        ticker.cancel()
+    main_thread: str = threading.current_thread().name
+    assert cmd.threads[0] != main_thread and cmd.threads[1] == main_thread, "Wrong commands offloaded"
+    assert len(ticks) >= 5, "Blocking command stalled the event loop"
+
+    variable: contextvars.ContextVar[str] = contextvars.ContextVar("variable")
+    variable.set("caller")
+    assert await cmd.run_blocking(variable.get) == "caller", "Context not propagated to worker thread"
+    assert await cmd.run_cpu_bound(math.factorial, 20) == math.factorial(20)
+
+    results = await cmd.arun_script(["inline"])
+    assert results[0].ok and cmd._executor is None and cmd._process_executor is None, \
+        "Worker pools not shut down at the end of the script"
+
+    # Commands run in worker processes, and pools shut down by aclose() when onecmd() is called directly
+    stdout.truncate(0); stdout.seek(0)
+    async with AsyncBlockingCmd(stdin=stdin, stdout=stdout, use_raw_input=False) as process_cmd:
+        await process_cmd.onecmd("pid")
+        await process_cmd.onecmd("power 3 --exponent 3")
+        await process_cmd.onecmd("power three")
+        process_executor = process_cmd._process_executor
+    pid, power, *usage = stdout.getvalue().splitlines()
+    assert int(pid) != os.getpid() and power == "27", "Command not run in a worker process"
+    assert usage[0] == "Invalid value for base: 'three'"
+    assert process_cmd._process_executor is None and not process_executor._processes, "Worker processes left running"
+
+    class InstanceProcessCmd(AsyncCmd):
+        @command(process=True)
+        def pid(self, line: str) -> None: ...
+
+    with pytest.raises(ValueError, match="static method"):
+        InstanceProcessCmd(stdin=stdin, stdout=stdout)
+
+    policy_cmd: AsyncAllBlockingCmd = AsyncAllBlockingCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=1)
+    await policy_cmd.onecmd("inline")
+    await policy_cmd.onecmd("jobs")
+    assert policy_cmd.threads[0] != main_thread, "Class policy not applied to sync commands"
+    assert await policy_cmd.onecmd("exit") is True
+
+@pytest.mark.asyncio
+async def test_timeouts(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncTimeoutCmd = AsyncTimeoutCmd(stdin=stdin, stdout=stdout, use_raw_input=False, command_timeout=0.1)
+    await asyncio.wait_for(cmd.onecmd("quick"), timeout=5)
+    await asyncio.wait_for(cmd.onecmd("hang"), timeout=5)
+    await cmd.onecmd("hang 0.01")
+    assert cmd.events == ["timeout quick", "timeout hang"], "Timeouts not reported through cmdtimeout()"
+
+    job_cmd: AsyncTimeoutCmd = AsyncTimeoutCmd(stdin=stdin, stdout=stdout, use_raw_input=False, max_jobs=1)
+    await job_cmd.arun_script(["job"])
+    assert job_cmd.events == ["timeout job"], "Background job timeout not applied"
+
+@pytest.mark.asyncio
+async def test_interrupt(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncTimeoutCmd = AsyncTimeoutCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    cmd.enqueue_many(["hang", "exit"])
+    previous_handler = signal.getsignal(signal.SIGINT)
+    asyncio.get_running_loop().call_later(0.1, signal.raise_signal, signal.SIGINT)
+    await asyncio.wait_for(cmd.acmdloop(), timeout=5)
+    assert cmd.events == ["cancelled hang"], "Interrupt did not cancel only the running command"
+    assert signal.getsignal(signal.SIGINT) == previous_handler, "SIGINT handler not restored"
+
+    # Without a running command, Ctrl-C ends the loop
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "r") as pipe_stdin:
+        idle_cmd: AsyncTimeoutCmd = AsyncTimeoutCmd(stdin=pipe_stdin, stdout=io.StringIO(), use_raw_input=False)
+        asyncio.get_running_loop().call_later(0.1, signal.raise_signal, signal.SIGINT)
+        with pytest.raises(KeyboardInterrupt):
+            await asyncio.wait_for(idle_cmd.acmdloop(), timeout=5)
+    os.close(write_fd)
+
+@pytest.mark.asyncio
+async def test_interrupt_overlapping_loops() -> None:
+    previous_handler = signal.getsignal(signal.SIGINT)
+    pipes = [os.pipe() for _ in range(2)]
+    stdins = [os.fdopen(read_fd, "r") for read_fd, _ in pipes]
+    outer, inner = (AsyncTimeoutCmd(stdin=stdin, stdout=io.StringIO(), use_raw_input=False) for stdin in stdins)
+    try:
+        outer_task = asyncio.ensure_future(outer.acmdloop())
+        await asyncio.sleep(0.02)
+        inner_task = asyncio.ensure_future(inner.acmdloop())
+        inner.enqueue("hang")
+        await asyncio.sleep(0.05)
+        signal.raise_signal(signal.SIGINT)
+        await asyncio.sleep(0.05)
+        assert inner.events == ["cancelled hang"] and not outer.events, "Interrupt not routed to the innermost loop"
+
+        # The loop that installed the handler ends first
+        outer.enqueue("exit")
+        await asyncio.wait_for(outer_task, timeout=5)
+        assert signal.getsignal(signal.SIGINT) != previous_handler, "Handler removed while a loop still runs"
+        inner.enqueue("exit")
+        await asyncio.wait_for(inner_task, timeout=5)
+    finally:
+        for stdin, (_, write_fd) in zip(stdins, pipes):
+            os.close(write_fd)
+            stdin.close()
+    assert signal.getsignal(signal.SIGINT) == previous_handler, "SIGINT handler not restored by the last loop"
+
+@pytest.mark.asyncio
+async def test_lazy_commands(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncTestCmd = AsyncTestCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    cmd.register_lazy_commands([LazyCommand("areport", "tests.classes.lazy_target:areport")])
+    await cmd.onecmd("areport y")
+    assert stdout.getvalue() == "areport y", "Lazy coroutine command not awaited"
+
+    # Commands failing to load do not stop the loop
+    cmd.register_lazy_commands([LazyCommand("bad", "tests.classes.nonexistent:bad")])
+    stdout.seek(0)
+    stdout.truncate()
+    await cmd.arun_script(["bad x", "help bad", "areport z"])
+    assert stdout.getvalue() == ("Cannot load command bad from tests.classes.nonexistent:bad: "
+                                 "No module named 'tests.classes.nonexistent'\n") * 2 + "areport z"
+
+@pytest.mark.asyncio
+async def test_generator_commands(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncStreamCmd = AsyncStreamCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    await cmd.onecmd("rows 3")
+    assert stdout.getvalue() == "0\n1\n2\n" and cmd.closed == ["rows"]
+
+    await asyncio.wait_for(cmd.onecmd("tail"), timeout=5)
+    assert cmd.closed == ["rows", "tail"], "Asynchronous generator not closed on timeout"
+    assert stdout.getvalue().count("tick") >= 2, "Chunks not streamed before the timeout"
+
+@pytest.mark.asyncio
+async def test_pipelines(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncPipeCmd = AsyncPipeCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    await cmd.onecmd("rows 5 | upper | total")
+    assert stdout.getvalue() == "5\n"
+
+    stdout.truncate(0); stdout.seek(0)
+    cmd.closed.clear()
+    await asyncio.wait_for(cmd.onecmd("tail | head 3 | upper"), timeout=5)
+    assert stdout.getvalue() == "TICK\n" * 3, "Pipeline not stopped by a finished downstream stage"
+    assert cmd.closed == ["tail"], "Upstream generator not closed"
+
+    stdout.truncate(0); stdout.seek(0)
+    with pytest.raises(ValueError, match="boom"):
+        await cmd.onecmd("fail boom | upper")
+    assert stdout.getvalue() == "PARTIAL\n", "Chunks before the error not passed downstream"
+
+@pytest.mark.asyncio
+async def test_mixed_pipelines(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncPipeCmd = AsyncPipeCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    await cmd.onecmd("rows 12 | grep 1")
+    assert stdout.getvalue() == "1\n10\n11\n", "Synchronous pipe stage not fed"
+
+    stdout.truncate(0); stdout.seek(0)
+    await cmd.onecmd("rows 12 | grep 1 | upper | count")
+    await cmd.onecmd("grep 1 | total")
+    assert stdout.getvalue() == "3\n0\n"
+
+    stdout.truncate(0); stdout.seek(0)
+    cmd.closed.clear()
+    await asyncio.wait_for(cmd.onecmd("tail | grep t | head 2"), timeout=5)
+    assert stdout.getvalue() == "tick\n" * 2, "Pipeline not stopped by a finished downstream stage"
+    assert cmd.closed == ["tail"], "Upstream generator not closed"
+
+    stdout.truncate(0); stdout.seek(0)
+    with pytest.raises(ValueError, match="boom"):
+        await cmd.onecmd("fail boom | grep p")
+    assert stdout.getvalue() == "partial\n", "Chunks before the error not passed downstream"
+
+@pytest.mark.asyncio
+async def test_typed_commands(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncTypedCmd = AsyncTypedCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    assert await cmd.onecmd("add 1 2.5") == 3.5
+    assert await cmd.onecmd("sleep 0 --label done") == "done", "Typed blocking command not parsed"
+
+    assert await cmd.onecmd("add one") is None
+    assert stdout.getvalue() == "Invalid value for numbers: 'one'\nUsage: add [numbers...]\n"
+
+@pytest.mark.asyncio
+async def test_cached_commands(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncCachedCmd = AsyncCachedCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    results = await asyncio.gather(*(cmd.onecmd(line) for line in ("lookup x", "lookup x", "lookup y")))
+    assert results == ["x", "x", "y"]
+    assert cmd.runs == 2, "Concurrent invocations with the same arguments not shared"
+    assert sorted(stdout.getvalue()) == ["x", "x", "y"], "Output of the shared run not written to every caller"
+
+    assert await cmd.onecmd("lookup x") == "x" and cmd.runs == 2
+    assert cmd.cache_info("lookup").hits == 2
+
+    task = asyncio.ensure_future(cmd.onecmd("lookup z"))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0.03)
+    assert cmd.cache_info("lookup").currsize == 2, "Run of a cancelled invocation not cancelled"
+
+@pytest.mark.asyncio
+async def test_batch_commands(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncBatchCmd = AsyncBatchCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    results = await asyncio.gather(*(cmd.onecmd(f"get {arg}") for arg in ("a", "b", "a", "missing")),
+                                   return_exceptions=True)
+    assert cmd.batches == [["a", "b", "missing"]], "Invocations not collected into one batch"
+    assert results[:3] == [None] * 3 and isinstance(results[3], KeyError), "Failed result not raised to its caller alone"
+    assert sorted(stdout.getvalue().splitlines()) == ["a=3", "a=3", "b=3"]
+
+    cmd.batches.clear()
+    await asyncio.gather(*(cmd.onecmd(f"get {i}") for i in range(6)))
+    assert [len(batch) for batch in cmd.batches] == [4, 2], "Batch not sent once full"
+
+    other: AsyncBatchCmd = AsyncBatchCmd(stdin=stdin, stdout=io.StringIO(), use_raw_input=False)
+    stdout.truncate(0); stdout.seek(0)
+    await asyncio.gather(cmd.onecmd("shared x"), other.onecmd("shared y"))
+    assert cmd.batches[-1] == ["x", "y"] and not other.batches, "Shared batch not handled by the first instance"
+    assert stdout.getvalue() == "x" and other.stdout.getvalue() == "y", "Results not written to their callers"
+
+@pytest.mark.asyncio
+async def test_batch_script_runs(test_io) -> None:
+    stdin, stdout = test_io
+    cmd: AsyncBatchCmd = AsyncBatchCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    loop = asyncio.get_running_loop()
+    start: float = loop.time()
+    results = await cmd.arun_script([f"slow {i}" for i in range(8)] + ["get a", "get b"])
+    duration: float = loop.time() - start
+    await cmd.arun_script(["slow lone"])
+    assert loop.time() - start < 1, "Batch lines waited for the window"
+    assert cmd.batches == [[str(i) for i in range(8)], ["a", "b"], ["lone"]], "Consecutive lines not batched"
+    assert [result.line for result in results][-2:] == ["get a", "get b"]
+    assert sum(result.elapsed for result in results) <= duration, "Time of a batch counted once per line"
+    assert stdout.getvalue() == "".join(f"{i}\n" for i in range(8)) + "a=2\nb=2\nlone\n"
+
+    cmd.batches.clear()
+    results = await cmd.arun_script(["get a", "get missing", "get c"])
+    assert len(results) == 3 and isinstance(results[1].error, KeyError), "Run not reported per line"
+
+    cmd.batches.clear()
+    stdin.write("slow x\nslow y\nhelp\nslow z\nexit\n")
+    stdin.seek(0)
+    await asyncio.wait_for(cmd.acmdloop(), timeout=2)
+    assert cmd.batches == [["x", "y"], ["z"]], "Command loop did not batch consecutive lines"
@@ -1,5 +1,21 @@
+import random
+import subprocess
+import sys
+import pytest
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+from asiocmd.layout import columnize
+from asiocmd.lazy import LazyCommand
+from asiocmd.output import OutputBuffer
+from asiocmd.stats import CommandStats, StatsSink
+from asiocmd import AsyncCmd, Cmd, async_command, command, command_helper
 from tests.conf import test_io
-from tests.classes.base import RegistrarBaseCmd, EchoCmd, HookCmd, DecoratorCmd
+from tests.classes import plugin
+from tests.classes.base import RegistrarBaseCmd, EchoCmd, HookCmd, DecoratorCmd, ScriptCmd, StreamCmd, PipeCmd, TypedCmd, Color, CachedCmd
 
 def test_base_cmd_registration(test_io):
     stdin, stdout = test_io
@@ -78,4 +94,499 @@ def test_base_cmd_decorators(test_io):
     assert cmd.method_decorator_calls == expected_outputs, \
         f'''Expected output not found
         Expected: ({', '.join(expected_outputs)})
-        Observed: ({', '.join(cmd.method_decorator_calls)})'''
\ No newline at end of file
+        Observed: ({', '.join(cmd.method_decorator_calls)})'''
+
+def test_base_cmd_shared_registry(test_io):
+    stdin, stdout = test_io
+    first: RegistrarBaseCmd = RegistrarBaseCmd(stdin=stdin, stdout=stdout)
+    second: RegistrarBaseCmd = RegistrarBaseCmd(stdin=stdin, stdout=stdout)
+
+    assert RegistrarBaseCmd._command_table() is RegistrarBaseCmd._command_table(), \
+    "Command table recompiled for the same class"
+    assert list(first._method_mapping) == list(second._method_mapping), \
+    "Instances of the same class registered different commands"
+
+    # Methods are bound to their own instance
+    assert first._method_mapping["bar"].bound.__self__ is first
+    assert second._method_mapping["bar"].bound.__self__ is second
+
+    # Runtime changes to one instance do not leak into the class table
+    del first._method_mapping["bar"]
+    assert "bar" not in first._method_mapping and "bar" in second._method_mapping, \
+    "Instance-level removal leaked into the shared command table"
+
+def test_base_cmd_invalid_registration(test_io):
+    stdin, stdout = test_io
+
+    class OrphanHelperCmd(Cmd):
+        def help_missing(self) -> None: ...
+
+    with pytest.raises(ValueError):
+        OrphanHelperCmd(stdin=stdin, stdout=stdout)
+    
+    # Validation is deferred until registration
+    OrphanHelperCmd(stdin=stdin, stdout=stdout, auto_register=False)
+
+def test_base_cmd_decorators_return_original():
+    def method(self, line: str) -> None: ...
+    async def async_method(self, line: str) -> None: ...
+    def helper(self) -> None: ...
+
+    assert command(method) is method, "@command wrapped the decorated function"
+    assert async_command(async_method) is async_method, "@async_command wrapped the decorated function"
+    assert command_helper("name")(helper) is helper, "@command_helper wrapped the decorated function"
+    assert AsyncCmd.check_async(async_method), "Tagged coroutine function not detected as async"
+
+    # Registering a function again tags a copy, with every flag overridden
+    renamed = command("renamed", blocking=True, timeout=0)(method)
+    assert renamed is not method and renamed.__commandname__ == "renamed" and method.__commandname__ == "method"
+    assert renamed.__cmdtimeout__ == 0
+    assert command(blocking=False)(renamed).__cmdblocking__ is False, "Falsy flag did not override an earlier one"
+    assert AsyncCmd.check_async(async_command("renamed")(async_method))
+
+def test_base_cmd_alias_in_subclass(test_io):
+    stdin, stdout = test_io
+
+    class BaseAliasCmd(Cmd):
+        @command
+        def foo(self, line: str) -> None:
+            """Write foo"""
+            self.stdout.write("foo\n")
+
+    class AliasCmd(BaseAliasCmd):
+        bar = command("bar")(BaseAliasCmd.foo)
+
+    assert sorted(BaseAliasCmd(stdin=stdin, stdout=stdout)._method_mapping) == ["foo", "help"], \
+    "Aliasing a command in a subclass renamed it in the base class"
+    alias_cmd: AliasCmd = AliasCmd(stdin=stdin, stdout=stdout)
+    assert sorted(alias_cmd._method_mapping) == ["bar", "foo", "help"]
+    alias_cmd.onecmd("bar")
+    alias_cmd.onecmd("help bar")
+    assert stdout.getvalue() == "foo\nWrite foo"
+
+def test_base_cmd_parseline(test_io):
+    stdin, stdout = test_io
+    cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout)
+
+    def reference_parseline(line: str, identchars: str):
+        # Character by character parsing, as done by cmd.Cmd
+        line = line.strip()
+        if not line:
+            return None, None, line
+        elif line[0] == '?':
+            line = 'help ' + line[1:]
+        elif line[0] == '!':
+            return None, None, line
+        for i in range(len(line)):
+            if line[i] not in identchars:
+                return line[:i].strip(), line[i:].strip(), line
+        return line, "", line
+
+    lines: list[str] = ["", "   ", "echo", "  echo  hello world  ", "?echo", "? ", "!ls -l",
+                        "echo-x y", "x.y z", "123 abc", "a]b^c\\d", "héllo wörld", "-x"]
+    for identchars in (cmd.identchars, cmd.identchars + "-]^\\", "", "xyz"):
+        cmd.identchars = identchars
+        for line in lines:
+            assert cmd.parseline(line) == reference_parseline(line, identchars), \
+            f"parseline({line!r}) diverged from reference for identchars {identchars!r}"
+
+    cmd.identchars = EchoCmd(stdin=stdin, stdout=stdout).identchars
+    assert cmd.parseargv("echo 'a b' c") == ("echo", ("a b", "c"), "echo 'a b' c")
+    assert cmd.parseargv("") == (None, None, "")
+
+def test_base_cmd_queue(test_io):
+    stdin, stdout = test_io
+    test_cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+
+    test_cmd.enqueue_many(f"echo {i}" for i in range(1000))
+    test_cmd.enqueue("exit")
+    test_cmd.cmdloop()
+
+    assert not test_cmd.cmdqueue, "Queued commands left unconsumed"
+    assert stdout.getvalue().endswith("".join(f"{i}" for i in range(1000))), \
+    "Queued commands not executed in order"
+
+    test_cmd.cmdqueue = ["echo list", "exit"]  # As with the standard library's cmd
+    test_cmd.cmdloop()
+    assert not test_cmd.cmdqueue and stdout.getvalue().endswith("list"), "Assigned list of lines not run"
+
+def test_base_cmd_run_script(test_io):
+    stdin, stdout = test_io
+    script: list[str] = ["echo a\n", "\n", "fail boom\n", "echo b\n", "exit\n", "echo unreachable\n"]
+
+    results = ScriptCmd(stdin=stdin, stdout=stdout).run_script(script)
+    assert [result.line for result in results] == ["echo a", "fail boom"], \
+    "Script not stopped on error"
+    assert isinstance(results[1].error, RuntimeError) and not results[1].ok
+
+    results = ScriptCmd(stdin=stdin, stdout=stdout).run_script(script, stop_on_error=False)
+    assert [result.line for result in results] == ["echo a", "fail boom", "echo b", "exit"], \
+    "Script not continued after error, or not stopped by a stopping command"
+    assert results[0].result is None and results[3].result is True
+    assert all(result.elapsed >= 0 for result in results)
+    assert stdin.getvalue() == "" and "ScriptCmd>" not in stdout.getvalue(), \
+    "Prompt written while running script"
+
+def test_base_cmd_completion(test_io):
+    stdin, stdout = test_io
+    test_cmd: RegistrarBaseCmd = RegistrarBaseCmd(stdin=stdin, stdout=stdout)
+
+    assert test_cmd.completenames("") == sorted(test_cmd._method_mapping), "Completions not sorted"
+    assert test_cmd.completenames("b") == ["bar"]
+    assert test_cmd.completenames("x") == []
+    assert test_cmd.complete_help("", "help ", 5, 5) == sorted(test_cmd._method_mapping.keys() | test_cmd._helper_mapping.keys())
+
+    # The index follows runtime changes to the mapping
+    test_cmd._method_mapping["baz"] = test_cmd._method_mapping["bar"]
+    assert test_cmd.completenames("ba") == ["bar", "baz"]
+    del test_cmd._method_mapping["bar"]
+    test_cmd._method_mapping["bat"] = test_cmd._method_mapping["baz"]
+    assert test_cmd.completenames("ba") == ["bat", "baz"]
+    assert RegistrarBaseCmd(stdin=stdin, stdout=stdout).completenames("ba") == ["bar"], \
+    "Runtime changes leaked into the shared index"
+
+def test_base_cmd_columnize(test_io):
+    stdin, stdout = test_io
+    test_cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout)
+
+    def reference_layout(strings: list[str], displaywidth: int) -> tuple[int, list[int]]:
+        # Exhaustive search over row counts, as done by cmd.Cmd
+        size: int = len(strings)
+        for nrows in range(1, size):
+            ncols = (size + nrows - 1) // nrows
+            colwidths, totwidth = [], -2
+            for col in range(ncols):
+                colwidth = max(len(x) for x in strings[col * nrows:(col + 1) * nrows])
+                colwidths.append(colwidth)
+                totwidth += colwidth + 2
+                if totwidth > displaywidth:
+                    break
+            if totwidth <= displaywidth:
+                return nrows, colwidths
+        return size, [0]
+
+    rng = random.Random(0)
+    for _ in range(300):
+        strings: list[str] = ["x" * rng.randint(1, 20) for _ in range(rng.randint(2, 60))]
+        displaywidth: int = rng.randint(10, 120)
+        nrows, colwidths = reference_layout(strings, displaywidth)
+        rows: list[str] = columnize(strings, displaywidth).splitlines()
+        assert len(rows) == nrows, "Row count differs from exhaustive search"
+        if nrows < len(strings):
+            assert all(len(row) <= displaywidth for row in rows), "Layout wider than display"
+            assert rows[0].split() == strings[::nrows], "Strings not filled column by column"
+        
+    test_cmd.columnize(["a", "bb", "ccc"], 80)
+    assert stdout.getvalue() == "a  bb  ccc\n"
+    with pytest.raises(TypeError):
+        test_cmd.columnize(["a", 1])  # pyright: ignore[reportArgumentType]
+
+def test_base_cmd_help_cache(test_io):
+    stdin, stdout = test_io
+    test_cmd: RegistrarBaseCmd = RegistrarBaseCmd(stdin=stdin, stdout=stdout)
+
+    listing: str = test_cmd._help_listing()
+    assert test_cmd._help_listing() is listing, "Help listing rendered again without changes"
+    test_cmd.onecmd("help")
+    assert stdout.getvalue() == listing
+
+    test_cmd._method_mapping["extra"] = test_cmd._method_mapping["bar"]
+    assert "extra" in test_cmd._help_listing(), "Help listing not invalidated by registry change"
+
+def test_base_cmd_output_buffer(test_io):
+    class CountingIO(io.StringIO):
+        writes: int = 0
+        def write(self, s: str) -> int:
+            self.writes += 1
+            return super().write(s)
+
+    stdin = io.StringIO("help\n" + "echo x\n" * 3 + "exit\n")
+    stdout = CountingIO()
+    test_cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout, use_raw_input=False)
+    assert isinstance(test_cmd.stdout, OutputBuffer)
+    test_cmd.cmdloop()
+    # Intro, then a prompt and a single coalesced write per command
+    assert stdout.writes <= 1 + 2 * 5, "Command output not coalesced"
+    assert test_cmd.stdout.getvalue() == stdout.getvalue(), "Stream attributes not delegated"
+
+    buffer: OutputBuffer = OutputBuffer(io.StringIO(), threshold=8)
+    buffer.write("direct")
+    assert buffer.stream.getvalue() == "direct", "Write outside of a command buffered"
+    with buffer:
+        buffer.write("abc")
+        with buffer:
+            buffer.write("def")
+        assert buffer.pending == 6 and buffer.stream.getvalue() == "direct", "Nested block flushed early"
+        buffer.write("ghi")
+        assert not buffer.pending, "Buffer not flushed past its threshold"
+    assert buffer.stream.getvalue() == "directabcdefghi"
+
+    # Streams assigned after construction are wrapped too, and never closed
+    test_cmd.stdin = io.StringIO("echo a\necho b\nexit\n")
+    test_cmd.stdout = replaced = io.StringIO()
+    assert isinstance(test_cmd.stdout, OutputBuffer) and test_cmd.stdout.stream is replaced
+    test_cmd.intro = ""
+    test_cmd.cmdloop()
+    results = test_cmd.run_script(["echo c", "echo d"])
+    assert not replaced.closed and all(result.ok for result in results), "Assigned stream used as a context manager"
+    assert replaced.getvalue().replace(test_cmd.prompt, "") == "abcd"
+
+def test_base_cmd_stats(test_io):
+    stdin, stdout = test_io
+    stats: CommandStats = CommandStats()
+    test_cmd: ScriptCmd = ScriptCmd(stdin=stdin, stdout=stdout, stats=stats)
+    test_cmd.run_script(["echo a", "echo b", "fail x", "nonexistent", "exit"], stop_on_error=False)
+
+    assert stats.commands["echo"].calls == 2 and not stats.commands["echo"].errors
+    assert stats.commands["fail"].calls == stats.commands["fail"].errors == 1, "Failed command not recorded"
+    assert stats.commands["<default>"].calls == 1, "Unknown command not recorded as default"
+    assert 0 < stats.commands["echo"].percentile(50) <= stats.commands["echo"].percentile(99)
+
+    test_cmd.onecmd("stats")
+    report: str = stdout.getvalue()
+    assert all(name in report for name in ("echo", "fail", "exit", "p95")), "Built-in stats command incomplete"
+    test_cmd.onecmd("stats reset")
+    assert not stats.commands
+
+    class FailingSink(StatsSink):
+        def record(self, command: str, elapsed: float, hook_time: float, failed: bool) -> None:
+            raise AssertionError("Sink called")
+    assert "stats" not in ScriptCmd(stdin=stdin, stdout=stdout, stats=FailingSink())._method_mapping
+    ScriptCmd(stdin=stdin, stdout=stdout).run_script(["echo a"])   # No sink, no instrumentation
+
+def test_base_cmd_user_stats_command(test_io):
+    stdin, stdout = test_io
+    class SlottedStatsCmd(Cmd):
+        __slots__ = ()
+        @command
+        def stats(self, line: str) -> str:
+            return "user stats"
+
+    class StatsCmd(Cmd):
+        @command
+        def stats(self, line: str) -> str:
+            return "user stats"
+
+    for cls in (SlottedStatsCmd, StatsCmd):
+        test_cmd = cls(stdin=stdin, stdout=stdout, stats=CommandStats())
+        assert test_cmd.onecmd("stats") == "user stats", "Command named stats shadowed by the stats sink"
+
+def test_base_cmd_profile(test_io):
+    stdin, stdout = test_io
+    test_cmd: ScriptCmd = ScriptCmd(stdin=stdin, stdout=stdout, profiling=True)
+
+    test_cmd.onecmd("profile -n 5 echo hello")
+    output: str = stdout.getvalue()
+    assert output.startswith("hello") and "Top 5 functions for: echo hello" in output and "echo" in output
+
+    test_cmd.onecmd("profile -m echo hello")
+    assert "allocation sites for: echo hello" in stdout.getvalue()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "echo.pstats")
+        test_cmd.onecmd(f"profile -o {path} echo hello")
+        assert pstats.Stats(path).total_calls, "Profile not dumped"
+
+    assert test_cmd.onecmd("profile exit") is True, "Result of profiled command not returned"
+    test_cmd.onecmd("profile -x echo")
+    assert stdout.getvalue().endswith("Unknown option: -x\nUsage: profile [-m] [-n TOP] [-o FILE] <command line>\n")
+    assert "profile" not in ScriptCmd(stdin=stdin, stdout=stdout)._method_mapping, "Profiling not opt-in"
+
+def test_base_cmd_runtime_registration(test_io):
+    stdin, stdout = test_io
+    test_cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout)
+    listing: str = test_cmd._help_listing()
+
+    assert sorted(test_cmd.load_plugin(plugin)) == ["greet", "shout"]
+    assert "unrelated" not in test_cmd._method_mapping
+    test_cmd.onecmd("greet world")
+    test_cmd.onecmd("shout abc")
+    test_cmd.onecmd("help shout")
+    assert stdout.getvalue() == "Hello worldABCShout something"
+    assert "greet" in test_cmd._help_listing() != listing, "Help listing not updated"
+    assert test_cmd.completenames("gr") == ["greet"], "Completion index not updated"
+
+    with pytest.raises(ValueError):
+        test_cmd.load_plugin(plugin)    # Names taken
+    with pytest.raises(ValueError):
+        test_cmd.register_command(plugin.shout_helper)
+    with pytest.raises(ValueError):
+        test_cmd.register_helper(plugin.unrelated, "nonexistent")
+
+    class Counter:
+        def __init__(self) -> None:
+            self.count = 0
+        @command("count")
+        def increment(self, line: str) -> None:
+            self.count += 1
+    counter = Counter()
+    test_cmd.load_plugin(counter)
+    test_cmd.onecmd("count")
+    assert counter.count == 1, "Plugin instance methods not kept bound to the plugin"
+
+    assert test_cmd.register_command(lambda self, line: self.stdout.write("new"), "new") == "new"
+    test_cmd.register_helper(lambda self: None, "new")
+    test_cmd.unregister_command("greet")
+    test_cmd.unregister_command("new")
+    assert "greet" not in test_cmd._method_mapping and "greet" not in test_cmd._helper_mapping
+    assert "new" not in test_cmd._helper_mapping and test_cmd.completenames("gr") == []
+    with pytest.raises(KeyError):
+        test_cmd.unregister_command("greet")
+    assert "greet" not in EchoCmd(stdin=stdin, stdout=stdout)._method_mapping, "Registration leaked to the class"
+
+def test_base_cmd_lazy_commands(test_io):
+    stdin, stdout = test_io
+    target: str = "tests.classes.lazy_target"
+    sys.modules.pop(target, None)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "commands.json")
+        with open(path, "w") as file:
+            json.dump({"report": f"{target}:report", "documented": {"target": f"{target}:report", "help": "Declared help"}}, file)
+        commands: list[LazyCommand] = LazyCommand.from_manifest(path)
+
+    test_cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout)
+    assert test_cmd.register_lazy_commands(commands) == ["report", "documented"]
+    assert test_cmd.completenames("rep") == ["report"] and "report" in test_cmd._help_listing()
+    test_cmd.onecmd("help documented")
+    assert target not in sys.modules, "Module imported before first use"
+
+    test_cmd.onecmd("help report")
+    assert target in sys.modules and stdout.getvalue() == "Declared helpReport something"
+    test_cmd.onecmd("report x")
+    assert stdout.getvalue().endswith("report x")
+
+    with pytest.raises(ValueError):
+        test_cmd.register_lazy_commands([LazyCommand("report", f"{target}:report")])
+    assert LazyCommand.from_entry_points("asiocmd.tests.nonexistent") == []
+
+def test_base_cmd_lazy_command_missing_module(test_io):
+    stdin, stdout = test_io
+    test_cmd: EchoCmd = EchoCmd(stdin=stdin, stdout=stdout)
+    test_cmd.register_lazy_commands([LazyCommand("bad", "tests.classes.nonexistent:bad"),
+                                     LazyCommand("gone", "tests.classes.lazy_target:gone")])
+
+    assert test_cmd.onecmd("bad x") is None and test_cmd.onecmd("help bad") is None and test_cmd.onecmd("gone") is None
+    assert stdout.getvalue().splitlines() == [
+        "Cannot load command bad from tests.classes.nonexistent:bad: No module named 'tests.classes.nonexistent'"] * 2 + [
+        "Cannot load command gone from tests.classes.lazy_target:gone: module 'tests.classes.lazy_target' has no attribute 'gone'"]
+    assert {"bad", "gone"}.isdisjoint(record.entry.name for record in test_cmd._method_mapping.records()), \
+    "Command that failed to load kept"
+
+def test_base_cmd_import_footprint():
+    # Interactive and asynchronous machinery must not be loaded by importing the package
+    modules: str = subprocess.run([sys.executable, "-c", "import sys, asiocmd; print(' '.join(sys.modules))"],
+                                  capture_output=True, text=True, check=True).stdout
+    eager: set[str] = set(modules.split()) & {"readline", "asyncio", "cProfile", "importlib.metadata", "multiprocessing"}
+    assert not eager, f"Modules imported eagerly: {', '.join(eager)}"
+
+    # Nor modules of optional features by importing AsyncCmd
+    modules = subprocess.run([sys.executable, "-c", "import sys; from asiocmd import AsyncCmd; print(' '.join(sys.modules))"],
+                             capture_output=True, text=True, check=True).stdout
+    features: set[str] = {f"asiocmd.{name}" for name in ("arguments", "batching", "cache", "jobs", "lazy", "readers", "script", "stats")}
+    eager = set(modules.split()) & features
+    assert not eager, f"Modules imported eagerly by AsyncCmd: {', '.join(eager)}"
+
+def test_base_cmd_generator_commands(test_io):
+    class RecordingIO(io.StringIO):
+        def __init__(self) -> None:
+            super().__init__()
+            self.flushed: list[str] = []
+        def flush(self) -> None:
+            self.flushed.append(self.getvalue())
+
+    stdin, _ = test_io
+    stdout = RecordingIO()
+    test_cmd: StreamCmd = StreamCmd(stdin=stdin, stdout=stdout)
+    assert test_cmd._method_mapping["rows"].is_generator
+
+    with test_cmd.stdout:   # As in the command loop
+        assert test_cmd.onecmd("rows 3") is None
+    assert stdout.flushed[:3] == ["0\n", "0\n1\n", "0\n1\n2\n"], "Chunks not written as they are produced"
+    assert test_cmd.onecmd("stop") is True, "Return value of generator not used as the result"
+
+def test_base_cmd_pipelines(test_io):
+    stdin, stdout = test_io
+    test_cmd: PipeCmd = PipeCmd(stdin=stdin, stdout=stdout)
+    assert test_cmd.parseline("rows 3 | grep 1")[0] == "rows"
+
+    test_cmd.onecmd("rows 12 | grep 1 | count")
+    assert stdout.getvalue() == "3\n", "Chunks not passed through the pipeline"
+
+    stdout.truncate(0); stdout.seek(0)
+    test_cmd.onecmd("rows 12 | grep 1")
+    assert stdout.getvalue() == "1\n10\n11\n", "Chunks of the last stage not written"
+
+    stdout.truncate(0); stdout.seek(0)
+    test_cmd.onecmd("count")
+    assert stdout.getvalue() == "0\n", "Pipe command without upstream not given an empty iterator"
+
+    stdout.truncate(0); stdout.seek(0)
+    test_cmd.onecmd("say a | b")
+    test_cmd.onecmd("say 'x | count'")
+    assert stdout.getvalue() == "a | b'x | count'", "'|' not followed by a pipe command split as a pipeline"
+
+    stdout.truncate(0); stdout.seek(0)
+    test_cmd.onecmd("say a | count")
+    assert stdout.getvalue().startswith("Cannot pipe the output of say"), "Non-generator upstream stage accepted"
+
+def test_base_cmd_typed_commands(test_io):
+    stdin, stdout = test_io
+    test_cmd: TypedCmd = TypedCmd(stdin=stdin, stdout=stdout)
+    parser = test_cmd._method_mapping["resize"].parser
+    assert parser is not None and parser is TypedCmd._command_table().commands["resize"].parser, \
+    "Parser not built once per class"
+    assert parser.usage == "Usage: resize <name> <width> [height] [--force] [--unit UNIT]\n"
+
+    assert test_cmd.onecmd("resize disk 10") == ("disk", 10, 0, False, "px")
+    assert test_cmd.onecmd("resize 'big disk' --width=5 7 --force --unit cm") == ("big disk", 5, 7, True, "cm")
+    assert test_cmd.onecmd("resize disk 1 --force --no-force") == ("disk", 1, 0, False, "px")
+    assert test_cmd.onecmd("paint red g --label=x") == ((Color.RED, Color.GREEN), {"label": "x"})
+    assert stdout.getvalue() == ""
+
+    for line, error in (("resize disk", "Missing argument: width"),
+                        ("resize disk ten", "Invalid value for width: 'ten'"),
+                        ("resize disk 1 2 3", "Unexpected argument: 3"),
+                        ("resize disk 1 --unit in", "Invalid value for unit: 'in'"),
+                        ("resize disk 1 --size 2", "Unknown option: --size"),
+                        ("resize 'disk", "No closing quotation")):
+        stdout.truncate(0); stdout.seek(0)
+        assert test_cmd.onecmd(line) is None
+        assert stdout.getvalue() == f"{error}\n{parser.usage}", f"Invalid arguments of {line!r} not reported"
+
+    stdout.truncate(0); stdout.seek(0)
+    test_cmd.onecmd("rows 5 | take 2")
+    assert stdout.getvalue() == "0\n1\n", "Typed pipe command not given its upstream"
+
+def test_base_cmd_cached_commands(test_io):
+    stdin, stdout = test_io
+    test_cmd: CachedCmd = CachedCmd(stdin=stdin, stdout=stdout)
+    assert test_cmd.onecmd("describe a") == "A"
+    assert test_cmd.onecmd("describe   a  ") == "A", "Cached result not returned"
+    assert test_cmd.runs == ["a"] and stdout.getvalue() == "<a><a>", "Output not replayed on a hit"
+    assert test_cmd.cache_info("describe") == (1, 1, 2, 1)
+    assert test_cmd.cache_info("update") is None
+
+    test_cmd.onecmd("describe b")
+    test_cmd.onecmd("describe c")   # Evicts a, least recently used
+    test_cmd.onecmd("describe a")
+    assert test_cmd.runs == ["a", "b", "c", "a"]
+
+    test_cmd.onecmd("update a")
+    test_cmd.onecmd("describe c")
+    test_cmd.onecmd("describe a")
+    assert test_cmd.runs == ["a", "b", "c", "a", "a"], "Invalidated result returned"
+    test_cmd.onecmd("update")
+    test_cmd.onecmd("describe c")
+    assert test_cmd.runs[-1] == "c", "Cache not cleared"
+
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            test_cmd.onecmd("describe missing")
+    assert test_cmd.runs.count("missing") == 2, "Failed invocation cached"
+
+    test_cmd.onecmd("status")
+    test_cmd.onecmd("status")
+    time.sleep(0.06)
+    test_cmd.onecmd("status")
+    assert test_cmd.runs.count("status") == 2, "Expired result returned"
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import pytest
+from asiocmd.server import CmdServer
+from tests.classes.async_ import AsyncTestCmd
+
+async def _session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, lines: list[str]) -> str:
+    writer.write("".join(f"{line}\n" for line in lines).encode())
+    await writer.drain()
+    output: bytes = await asyncio.wait_for(reader.read(), timeout=5)
+    writer.close()
+    await writer.wait_closed()
+    return output.decode()
+
+@pytest.mark.asyncio
+async def test_tcp_sessions() -> None:
+    cmd_server: CmdServer = CmdServer(AsyncTestCmd, max_connections=8)
+    server: asyncio.Server = await cmd_server.start_tcp("127.0.0.1", 0)
+    port: int = server.sockets[0].getsockname()[1]
+
+    try:
+        connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(4)]
+        outputs: list[str] = await asyncio.gather(*(_session(reader, writer, ["foo", "afoo", "help foo", "exit"])
+                                                    for reader, writer in connections))
+    finally:
+        await cmd_server.close()
+
+    for output in outputs:
+        assert output.startswith(AsyncTestCmd(use_raw_input=False).intro), "Session intro not sent"
+        for expected in ("foo", "afoo", "foo_helper", "do_exit"):
+            assert expected in output, f"Output of {expected} missing from session"
+    assert cmd_server.active_sessions == 0, "Sessions not cleaned up"
+
+@pytest.mark.asyncio
+async def test_sessions_leave_sigint_alone() -> None:
+    previous_handler = signal.getsignal(signal.SIGINT)
+    cmd_server: CmdServer = CmdServer(AsyncTestCmd)
+    server: asyncio.Server = await cmd_server.start_tcp("127.0.0.1", 0)
+    port: int = server.sockets[0].getsockname()[1]
+
+    try:
+        first_reader, first_writer = await asyncio.open_connection("127.0.0.1", port)
+        await first_reader.readuntil(b">")
+        second_reader, second_writer = await asyncio.open_connection("127.0.0.1", port)
+        await second_reader.readuntil(b">")
+        assert signal.getsignal(signal.SIGINT) == previous_handler, "Session took over SIGINT"
+        # Overlapping sessions, ending in the order they started
+        await _session(first_reader, first_writer, ["exit"])
+        await _session(second_reader, second_writer, ["exit"])
+    finally:
+        await cmd_server.close()
+    assert signal.getsignal(signal.SIGINT) == previous_handler, "SIGINT handler not restored"
+
+@pytest.mark.asyncio
+async def test_connection_limit_and_disconnect() -> None:
+    cmd_server: CmdServer = CmdServer(AsyncTestCmd, max_connections=1)
+    server: asyncio.Server = await cmd_server.start_tcp("127.0.0.1", 0)
+    port: int = server.sockets[0].getsockname()[1]
+
+    try:
+        held_reader, held_writer = await asyncio.open_connection("127.0.0.1", port)
+        await held_reader.readuntil(b">")  # Session established
+
+        rejected_reader, rejected_writer = await asyncio.open_connection("127.0.0.1", port)
+        assert await _session(rejected_reader, rejected_writer, []) == cmd_server.busy_message
+
+        # Dropping the connection without "exit" ends the session
+        held_writer.close()
+        await held_writer.wait_closed()
+        for _ in range(100):
+            if not cmd_server.active_sessions:
+                break
+            await asyncio.sleep(0.01)
+        assert cmd_server.active_sessions == 0, "Session not ended by disconnection"
+    finally:
+        await cmd_server.close()
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets not available")
+async def test_unix_session() -> None:
+    cmd_server: CmdServer = CmdServer(AsyncTestCmd)
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "asiocmd.sock")
+        await cmd_server.start_unix(path)
+        try:
+            output: str = await _session(*await asyncio.open_unix_connection(path), ["foo", "exit"])
+        finally:
+            await cmd_server.close()
+    assert "foo" in output and "do_exit" in output